@@ -0,0 +1,159 @@
+"""
+Content history
+"""
+
+import streamlit as st
+from datetime import datetime
+from functools import partial
+from marketing_engine import (
+    EXPORT_FORMATS, EXPORT_PART_BYTES, HISTORY_PAGE_SIZE, export_history, get_blob_store, get_history_search,
+    history_content, render_script_exports, script_export_archive, storage_summary
+)
+import time
+
+st.markdown("## 📋 Content History")
+
+if st.session_state.generated_content:
+    history = st.session_state.generated_content
+    blob_store = get_blob_store()
+    st.caption(f"🗜️ Stored bodies: {storage_summary(blob_store.stats())}")
+    search_text = st.text_input(
+        "🔎 Search history",
+        placeholder="e.g., LinkedIn INSZoom migration",
+        key="history_search",
+        help="Searches topics, personas, goals and content. Every word must match; the last one can be partial"
+    )
+    if search_text:
+        searched_platforms = st.session_state.get("search_platforms") or []
+        searched_types = st.session_state.get("search_types") or []
+        search_started = time.perf_counter()
+        found = get_history_search().search(search_text, searched_platforms, searched_types)
+        search_ms = (time.perf_counter() - search_started) * 1000
+        facet_col1, facet_col2 = st.columns(2)
+        # Facet counts are for the query alone; selected values stay listed even when the query no longer matches them
+        for facet_col, label, facet, key, selected in (
+            (facet_col1, "Platform", found["platforms"], "search_platforms", searched_platforms),
+            (facet_col2, "Type", found["types"], "search_types", searched_types)
+        ):
+            with facet_col:
+                st.pills(
+                    label,
+                    list(facet) + [value for value in selected if value not in facet],
+                    format_func=lambda value, facet=facet: f"{value} ({facet.get(value, 0):,})",
+                    selection_mode="multi",
+                    key=key
+                )
+        st.caption(f"{found['total']:,} match(es) in {search_ms:.1f} ms" + (
+            f" · showing the top {len(found['results'])}" if found["total"] > len(found["results"]) else ""
+        ))
+        for result in found["results"]:
+            with st.container(border=True):
+                st.markdown(f"**{result['topic']}** · {result['type']} · {result['platform']} · {result['timestamp']}")
+                st.markdown(result["snippet"])
+                if st.toggle("Full content", key=f"search_open_{result['position']}"):
+                    st.markdown(history_content(history[result["position"]], blob_store))
+        st.divider()
+
+    with st.expander("📤 Bulk export"):
+        st.caption(
+            "Items are streamed to a file one at a time and served from disk, so large exports don't load into memory. "
+            f"Streamlit serves files of up to 200 MB, so an export is split into parts of about {EXPORT_PART_BYTES // 2**20} MB, "
+            "each a complete file of the chosen format"
+        )
+        filter_col1, filter_col2 = st.columns(2)
+        with filter_col1:
+            export_types = st.multiselect("Type", sorted({item['type'] for item in history}), key="export_types")
+            export_platforms = st.multiselect("Platform", sorted({item['platform'] for item in history}), key="export_platforms")
+            export_personas = st.multiselect(
+                "Persona", sorted({item['persona'] for item in history if item.get('persona')}), key="export_personas"
+            )
+        with filter_col2:
+            export_dates = st.date_input("Date range", value=(), key="export_dates", help="Leave empty for all dates")
+            export_format = st.radio("Format", list(EXPORT_FORMATS), key="export_format")
+        if st.button("📤 Export", key="run_history_export"):
+            export_progress = st.empty()
+            st.session_state.history_export = export_history(
+                history,
+                EXPORT_FORMATS[export_format],
+                on_progress=lambda count: export_progress.caption(f"Exported {count:,} items..."),
+                types=export_types,
+                platforms=export_platforms,
+                personas=export_personas,
+                start=export_dates[0] if export_dates else None,
+                end=export_dates[-1] if export_dates else None
+            )
+            export_progress.empty()
+        history_export = st.session_state.get("history_export")
+        if history_export:
+            if history_export["items"]:
+                export_files = history_export["files"]
+                if len(export_files) > 1:
+                    st.caption(f"{history_export['items']:,} items, {history_export['bytes'] / 2**20:,.0f} MB in "
+                               f"{len(export_files)} parts (links expire after an hour)")
+                # The download attribute keeps the file name and bytes whatever content type the static handler sends
+                for export_file in export_files:
+                    st.markdown(
+                        f'<a href="{export_file["url"]}" download="{export_file["file_name"]}">'
+                        f'⬇️ Download {export_file["file_name"]}</a> · '
+                        + (f'{export_file["bytes"] / 1024:,.0f} KB' if len(export_files) > 1 else
+                           f'{history_export["items"]:,} items, {export_file["bytes"] / 1024:,.0f} KB (link expires after an hour)'),
+                        unsafe_allow_html=True
+                    )
+            else:
+                st.warning("No history items match these filters")
+
+    video_items = [item for item in st.session_state.generated_content if item['type'] in ("Video Script", "Full Video Package")]
+    if video_items:
+        st.download_button(
+            label=f"📦 Captions & EDLs for all {len(video_items)} video script(s) (ZIP)",
+            data=partial(script_export_archive, video_items, blob_store),
+            file_name=f"video_captions_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+            mime="application/zip",
+            help="SRT, VTT, manual EDL and HeyGen/Synthesia scene files, parsed locally without API calls"
+        )
+    # Newest first, one page at a time; a body (possibly compressed or spilled to disk) is only read once its
+    # item is opened, so a rerun costs nothing per closed item
+    page_count = -(-len(history) // HISTORY_PAGE_SIZE)
+    if st.session_state.get("history_page", 1) > page_count:
+        st.session_state.history_page = page_count
+    history_page = st.number_input(
+        f"Page (of {page_count}, newest first)", min_value=1, max_value=page_count, key="history_page"
+    ) if page_count > 1 else 1
+    newest = len(history) - 1 - (history_page - 1) * HISTORY_PAGE_SIZE
+    for item_index in range(newest, max(newest - HISTORY_PAGE_SIZE, -1), -1):
+        item = history[item_index]
+        i = len(history) - 1 - item_index
+        duplicate_badge = " 🔁" if item.get('near_duplicates') else ""
+        cache_badge = " ⚡" if item.get('from_cache') else ""
+        draft_badge = " ✏️ Draft (stopped)" if item.get('draft') else ""
+        with st.container(border=True):
+            title_col, open_col = st.columns([5, 1])
+            with title_col:
+                st.markdown(f"📄 {item['type']} - {item['platform']} - {item['topic'][:50]}... ({item['timestamp']}){duplicate_badge}{cache_badge}{draft_badge}")
+            with open_col:
+                item_open = st.toggle("Open", key=f"history_open_{item_index}")
+            if not item_open:
+                continue
+            content = history_content(item, blob_store)
+            st.markdown(content)
+            col1, col2 = st.columns([1, 4])
+            with col1:
+                st.download_button(
+                    label="📥 Download",
+                    data=partial(history_content, item, blob_store),
+                    file_name=f"content_{i}_{datetime.now().strftime('%Y%m%d')}.txt",
+                    mime="text/plain",
+                    key=f"download_{item_index}"
+                )
+            with col2:
+                # High performers steer the ranking of future A/B variants on the same platform
+                item['high_performer'] = st.checkbox(
+                    "⭐ High performer",
+                    value=item.get('high_performer', False),
+                    key=f"high_performer_{item_index}",
+                    help="Mark content that performed well after publishing"
+                )
+            if item['type'] in ("Video Script", "Full Video Package"):
+                render_script_exports(content, f"video_{item_index}", f"history_{item_index}", in_expander=False)
+else:
+    st.info("📭 No content generated yet. Start creating content on the other pages!")
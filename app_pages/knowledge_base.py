@@ -0,0 +1,99 @@
+"""
+Company knowledge base
+"""
+
+import streamlit as st
+
+use_default = st.session_state.get("use_default_profile", True)
+
+st.markdown("## 📚 Company Knowledge Base")
+
+if use_default:
+    st.markdown("### LawTrax - Immigration Case Management Software")
+    
+    # Key Features Section
+    st.markdown("#### 🎯 Key Features")
+    features = [
+        ("Case Management", "Workflow-based platform with multiple stages based on case type"),
+        ("Customer Management", "Secure cloud portal for companies and beneficiaries"),
+        ("Lead Management", "Built-in CRM for converting prospects to customers"),
+        ("Document Management", "Cloud-based, indexable, searchable document system"),
+        ("Dashboard Reporting", "Real-time business-driven dashboards with drill-down"),
+        ("PDF Generation", "Auto-generates USCIS/DoL formatted documents"),
+        ("Client Portal", "Secure uploads and case tracking with notifications"),
+        ("Integrations", "Outlook, QuickBooks, webhooks, and RESTful APIs")
+    ]
+    
+    cols = st.columns(2)
+    for i, (feature, desc) in enumerate(features):
+        with cols[i % 2]:
+            st.markdown(f"""
+                <div class="feature-card">
+                    <strong>{feature}</strong><br>
+                    <small>{desc}</small>
+                </div>
+                """, unsafe_allow_html=True)
+            st.markdown("")
+    
+    # Competitive Advantages
+    st.markdown("#### 💪 Competitive Advantages")
+    advantages = [
+        "✅ No additional API costs (unlike competitors)",
+        "✅ True real-time reporting (no 24-hour batch delays)",
+        "✅ 99.9% uptime on Google Cloud infrastructure",
+        "✅ Built-in USCIS/DoL PDF generator",
+        "✅ Complete audit trail for compliance",
+        "✅ 30%+ revenue increase reported by clients"
+    ]
+    for adv in advantages:
+        st.markdown(adv)
+    
+    # Target Market
+    st.markdown("#### 🎯 Target Market")
+    targets = ["Immigration law firms (solo to enterprise)", "Corporate immigration departments", 
+               "Global mobility teams", "Legal service providers"]
+    st.markdown(" | ".join(targets))
+    
+    # Content Inspiration
+    st.markdown("#### 💡 Content Topic Ideas")
+    topics = {
+        "Educational": [
+            "How to streamline H-1B processing with case management software",
+            "5 signs your law firm needs to upgrade immigration software",
+            "The complete guide to USCIS form automation",
+            "Why real-time reporting matters for immigration law firms"
+        ],
+        "Thought Leadership": [
+            "The future of immigration law technology",
+            "How AI is transforming immigration case management",
+            "Cloud security best practices for law firms",
+            "Building a scalable immigration practice"
+        ],
+        "Client Success": [
+            "How [Client] increased revenue 30% with LawTrax",
+            "Case study: Reducing administrative burden in immigration law",
+            "From manual to automated: A law firm's digital transformation"
+        ],
+        "Product": [
+            "Introducing our new client portal features",
+            "How our document management saves 10+ hours weekly",
+            "Behind the scenes: How we ensure 99.9% uptime"
+        ]
+    }
+    
+    for category, ideas in topics.items():
+        with st.expander(f"📌 {category} Topics"):
+            for idea in ideas:
+                st.markdown(f"• {idea}")
+else:
+    if st.session_state.company_profile:
+        profile = st.session_state.company_profile
+        st.markdown(f"### {profile.get('name', 'Your Company')}")
+        st.markdown(f"**Website:** {profile.get('website', 'Not specified')}")
+        st.markdown(f"**Target Market:** {profile.get('target_market', 'Not specified')}")
+        st.markdown("#### Description")
+        st.markdown(profile.get('description', 'No description provided'))
+        st.markdown("#### Key Features")
+        st.markdown(profile.get('features', 'No features listed'))
+    else:
+        st.warning("⚠️ Please configure your company profile in the sidebar")
@@ -0,0 +1,118 @@
+"""
+LawTrax overview landing page
+"""
+
+import streamlit as st
+from marketing_engine import overview_sections
+
+overview = overview_sections()
+st.markdown(overview["title"], unsafe_allow_html=True)
+
+# Hero Section
+st.markdown(overview["hero"], unsafe_allow_html=True)
+
+# Key Metrics
+st.markdown("### 📊 Platform Impact")
+metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
+with metric_col1:
+    st.metric("Revenue Increase", "30%+", "Client Reported")
+with metric_col2:
+    st.metric("Platform Uptime", "99.9%", "Google Cloud")
+with metric_col3:
+    st.metric("Report Delay", "0 hrs", "vs 24hr industry avg")
+with metric_col4:
+    st.metric("API Cost", "$0", "Included Free")
+
+st.markdown("---")
+
+# Core Platform Features
+st.markdown("### 🎯 Core Platform Features")
+
+feature_col1, feature_col2 = st.columns(2)
+
+with feature_col1:
+    st.markdown(overview["case_management"], unsafe_allow_html=True)
+    
+    st.markdown(overview["customer_management"], unsafe_allow_html=True)
+    
+    st.markdown(overview["lead_management"], unsafe_allow_html=True)
+    
+    st.markdown(overview["document_management"], unsafe_allow_html=True)
+
+with feature_col2:
+    st.markdown(overview["dashboard_reporting"], unsafe_allow_html=True)
+    
+    st.markdown(overview["pdf_generation"], unsafe_allow_html=True)
+    
+    st.markdown(overview["client_portal"], unsafe_allow_html=True)
+    
+    st.markdown(overview["integrations"], unsafe_allow_html=True)
+
+st.markdown("---")
+
+# Security & Compliance
+st.markdown("### 🔒 Enterprise Security & Compliance")
+
+sec_col1, sec_col2, sec_col3 = st.columns(3)
+
+with sec_col1:
+    st.markdown(overview["infrastructure_security"], unsafe_allow_html=True)
+
+with sec_col2:
+    st.markdown(overview["data_protection"], unsafe_allow_html=True)
+
+with sec_col3:
+    st.markdown(overview["compliance_ready"], unsafe_allow_html=True)
+
+st.markdown("---")
+
+# Competitive Advantages
+st.markdown("### 💪 Why Choose LawTrax Over Competitors?")
+
+st.markdown(overview["no_additional_api_costs"], unsafe_allow_html=True)
+
+st.markdown("---")
+
+# Target Market
+st.markdown("### 🎯 Who Uses LawTrax?")
+
+market_col1, market_col2, market_col3, market_col4 = st.columns(4)
+
+with market_col1:
+    st.markdown(overview["immigration_law_firms"], unsafe_allow_html=True)
+
+with market_col2:
+    st.markdown(overview["corporate_immigration"], unsafe_allow_html=True)
+
+with market_col3:
+    st.markdown(overview["global_mobility_teams"], unsafe_allow_html=True)
+
+with market_col4:
+    st.markdown(overview["legal_service_providers"], unsafe_allow_html=True)
+
+st.markdown("---")
+
+# Client Testimonial
+st.markdown("### 💬 Client Success Story")
+st.markdown(overview["testimonial"], unsafe_allow_html=True)
+
+st.markdown("---")
+
+# Contact Information
+st.markdown("### 📞 Get Started with LawTrax")
+
+contact_col1, contact_col2, contact_col3 = st.columns(3)
+
+with contact_col1:
+    st.markdown(overview["email_us"], unsafe_allow_html=True)
+
+with contact_col2:
+    st.markdown(overview["call_us"], unsafe_allow_html=True)
+
+with contact_col3:
+    st.markdown(overview["visit_website"], unsafe_allow_html=True)
+
+st.markdown(overview["address"], unsafe_allow_html=True)
+
+# CTA
+st.markdown(overview["closing_cta"], unsafe_allow_html=True)
@@ -0,0 +1,320 @@
+"""
+SEO content generator
+"""
+
+import streamlit as st
+from datetime import datetime
+from marketing_engine import (
+    TARGET_PERSONAS, active_company, add_to_history, build_refine_prompt, deferred, duplicate_gate,
+    flag_new_duplicates, get_claude_response, history_content, model_tier_selector, render_cache_notice,
+    render_duplicate_review, render_reused_item, restore_form_draft, route_model_tier, save_form_draft,
+    select_company_context, semantic_cache_lookup, semantic_cache_store, seo_output_budget, show_knowledge_savings,
+    show_model_used, stoppable_generation, warn_if_prompt_over_budget
+)
+
+company_info, company_display_name = active_company()
+
+st.markdown("## 🔍 SEO Content Generator")
+st.markdown(f"Creating SEO-optimized marketing content for **{company_display_name}**")
+
+# Check if SEO is enabled
+seo_enabled = st.session_state.get('enable_seo_content', True)
+
+if not seo_enabled:
+    st.warning("⚠️ **SEO Content Generation is DISABLED**. Enable in sidebar → '🔍 Enable SEO Content'")
+
+# Inputs are batched in a form: nothing reruns until Generate, and the draft survives page switches
+restore_form_draft("seo", {"seo:word_count": 2000})
+with st.form("seo_form", border=False):
+    # SEO Goal
+    st.markdown("### 🎯 SEO Content Goal")
+    seo_goal = st.selectbox(
+        "Content Objective",
+        [
+            "Rank for Product Keywords (Bottom Funnel)",
+            "Rank for Problem Keywords (Middle Funnel)",
+            "Build Topical Authority (Top Funnel)",
+            "Capture Competitor Keywords",
+            "Target Long-Tail Questions",
+            "Create Linkable Asset"
+        ],
+        key="seo:goal"
+    )
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        seo_content_type = st.selectbox(
+            "Content Type",
+            [
+                "Blog Post - How To Guide",
+                "Blog Post - Listicle",
+                "Blog Post - Comparison (vs Competitors)",
+                "Blog Post - Ultimate Guide",
+                "Landing Page - Product",
+                "Landing Page - Use Case",
+                "Landing Page - Industry",
+                "Pillar Page - Comprehensive",
+                "Case Study",
+                "FAQ Page",
+                "Glossary/Definition Page"
+            ],
+            key="seo:content_type"
+        )
+    
+        primary_keyword = st.text_input(
+            "Primary Keyword",
+            placeholder="e.g., immigration case management software",
+            help="Main keyword to target",
+            key="seo:primary_keyword"
+        )
+    
+        secondary_keywords = st.text_area(
+            "Secondary Keywords",
+            placeholder="immigration software for law firms\nUSCIS case tracking\nimmigration attorney software\nbest immigration case management",
+            help="Additional keywords (one per line)",
+            height=100,
+            key="seo:secondary_keywords"
+        )
+    
+        # Persona for SEO
+        seo_persona = st.selectbox(
+            "🎯 Target Persona",
+            list(TARGET_PERSONAS.keys()),
+            key="seo:persona"
+        )
+
+    with col2:
+        target_word_count = st.select_slider(
+            "Target Word Count",
+            options=[500, 750, 1000, 1500, 2000, 2500, 3000, 4000, 5000],
+            key="seo:word_count"
+        )
+    
+        search_intent = st.selectbox(
+            "Search Intent",
+            [
+                "Informational (How to, What is, Guide)",
+                "Commercial (Best, Top, Compare, Review)",
+                "Transactional (Buy, Pricing, Demo, Trial)",
+                "Navigational (Brand-specific)"
+            ],
+            key="seo:search_intent"
+        )
+    
+        competitor_keywords = st.multiselect(
+            "Competitor Keywords to Target",
+            [
+                "INSZoom alternative",
+                "Docketwise vs",
+                "LawLogix competitor",
+                "CampLegal alternative",
+                "best immigration software",
+                "immigration case management comparison"
+            ],
+            key="seo:competitor_keywords"
+        )
+    
+        seo_context = st.text_area(
+            "Additional Requirements",
+            placeholder="Specific angle, target audience details, internal links to include...",
+            height=80,
+            key="seo:context"
+        )
+    
+        seo_tier = model_tier_selector("seo:model_tier")
+
+    generate_seo = st.form_submit_button(
+        "🔍 Generate SEO Content", type="primary", use_container_width=True, disabled=not seo_enabled
+    )
+save_form_draft("seo", generate_seo)
+
+# SEO Tips
+persona_seo = TARGET_PERSONAS[seo_persona]
+st.markdown(f"""
+    <div class="info-box">
+        <strong>📌 SEO Best Practices for {seo_persona}:</strong><br>
+        • Content Focus: {persona_seo['content_focus']}<br>
+        • Pain Points to Address: {', '.join(persona_seo['pain_points'][:3])}<br>
+        • Tone: {persona_seo['tone']}
+    </div>
+    """, unsafe_allow_html=True)
+
+if generate_seo or st.session_state.pop("force_generate_seo", False):
+    if not st.session_state.api_key:
+        st.error("⚠️ Please enter your Claude API key in the sidebar")
+    elif not primary_keyword:
+        st.error("⚠️ Please enter a primary keyword")
+    elif duplicate_gate("seo", primary_keyword):
+        refine_source = st.session_state.pop("refine_source_seo", None)
+        seo_cache_settings = {
+            "company": company_info, "goal": seo_goal, "content_type": seo_content_type, "persona": seo_persona,
+            "word_count": target_word_count, "intent": search_intent, "competitors": sorted(competitor_keywords),
+            "tier": seo_tier
+        }
+        seo_cache_text = f"{primary_keyword} {secondary_keywords} {seo_context}"
+        cache_hit = semantic_cache_lookup("seo", seo_cache_settings, seo_cache_text, bypass=refine_source is not None)
+        with st.spinner("📝 Creating SEO-optimized marketing content..."):
+            company_context, knowledge_stats = select_company_context(
+                company_info,
+                " ".join([primary_keyword, secondary_keywords, seo_content_type, seo_goal, search_intent,
+                          persona_seo['content_focus'], " ".join(competitor_keywords), seo_context])
+            )
+            seo_prompt = f"""You are an expert SEO content strategist specializing in B2B SaaS marketing for legal technology, 
+specifically immigration case management software. You understand search intent, keyword optimization, and conversion-focused content.
+
+COMPANY INFORMATION:
+{company_context}
+
+SEO CONTENT GOAL: {seo_goal}
+CONTENT TYPE: {seo_content_type}
+PRIMARY KEYWORD: {primary_keyword}
+SECONDARY KEYWORDS: {secondary_keywords}
+TARGET WORD COUNT: {target_word_count}
+SEARCH INTENT: {search_intent}
+
+TARGET PERSONA: {seo_persona}
+- Description: {persona_seo['description']}
+- Pain Points: {', '.join(persona_seo['pain_points'])}
+- Motivators: {', '.join(persona_seo['motivators'])}
+- Content Focus: {persona_seo['content_focus']}
+
+COMPETITOR KEYWORDS TO TARGET: {', '.join(competitor_keywords) if competitor_keywords else 'Focus on primary keyword'}
+
+ADDITIONAL CONTEXT: {seo_context if seo_context else 'None'}
+
+TASK:
+Create comprehensive SEO-optimized content that:
+1. Ranks for "{primary_keyword}" and related terms
+2. Speaks directly to {seo_persona}'s needs and pain points
+3. Positions LawTrax as the ideal solution
+4. Includes natural calls-to-action throughout
+5. Is structured for featured snippets where applicable
+6. Builds topical authority in immigration law technology
+
+OUTPUT FORMAT:
+
+## 📊 SEO METADATA
+
+**Meta Title (50-60 chars):**
+[Title optimized for CTR and keywords]
+
+**Meta Description (150-160 chars):**
+[Compelling description with keyword and CTA]
+
+**URL Slug:**
+[SEO-friendly URL]
+
+**Target Featured Snippet:**
+[Optimized answer for position zero]
+
+---
+
+## 📝 FULL CONTENT
+
+[Complete {target_word_count}-word article with:]
+- H1, H2, H3 heading structure
+- Primary keyword in first 100 words
+- Secondary keywords naturally distributed
+- Internal linking opportunities marked as [INTERNAL LINK: anchor text -> page]
+- External linking opportunities marked as [EXTERNAL LINK: anchor text]
+- Image alt text suggestions marked as [IMAGE: description, alt text]
+- CTAs integrated naturally throughout
+
+---
+
+## 📈 SEO ANALYSIS
+
+**Keyword Usage:**
+- Primary keyword density
+- Secondary keyword coverage
+- LSI keywords included
+
+**On-Page Optimization:**
+- Heading structure analysis
+- Internal linking suggestions
+- Schema markup recommendations
+
+**Content Enhancement:**
+- FAQ section for additional keywords
+- Table of contents
+- Key takeaways box
+
+---
+
+## 🎯 CONVERSION OPTIMIZATION
+
+**CTA Placements:**
+[Strategic CTA locations and copy]
+
+**Lead Magnets:**
+[Related downloadable content ideas]
+
+**Next Steps:**
+[Reader journey recommendations]
+
+Make the content authoritative, comprehensive, and designed to rank AND convert for LawTrax."""
+
+            model_tier = route_model_tier("seo", "Website/Blog", target_word_count * 6, seo_tier)
+            if refine_source is not None:
+                seo_prompt = build_refine_prompt(
+                    history_content(st.session_state.generated_content[refine_source]),
+                    {
+                        "Content type": seo_content_type,
+                        "Primary keyword": primary_keyword,
+                        "Secondary keywords": ", ".join(secondary_keywords.splitlines()),
+                        "Target word count": target_word_count,
+                        "Search intent": search_intent,
+                        "Target persona": seo_persona,
+                        "Additional context": seo_context
+                    }
+                )
+            if cache_hit:
+                result = cache_hit["result"]
+            else:
+                warn_if_prompt_over_budget(seo_prompt)
+                with stoppable_generation({"type": "SEO Content", "platform": "Website/Blog", "topic": primary_keyword,
+                                           "persona": seo_persona, "goal": seo_goal}) as generation:
+                    result = get_claude_response(
+                        seo_prompt,
+                        st.session_state.api_key,
+                        model_tier,
+                        max_tokens=seo_output_budget(target_word_count)
+                    )
+                if refine_source is None:
+                    semantic_cache_store("seo", seo_cache_settings, seo_cache_text, result, generation["truncated"])
+            
+            if not result.startswith("ERROR"):
+                new_item = {
+                    "type": "SEO Content",
+                    "platform": "Website/Blog",
+                    "topic": primary_keyword,
+                    "persona": seo_persona,
+                    "goal": seo_goal,
+                    "content": result,
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
+                }
+                if cache_hit:
+                    new_item["from_cache"] = True
+                add_to_history(new_item, base=refine_source)
+                
+                st.markdown('<div class="success-banner">✅ SEO Content Generated!</div>', unsafe_allow_html=True)
+                st.markdown("### 📝 Generated SEO Content")
+                st.markdown(result)
+                if not cache_hit:
+                    show_knowledge_savings(knowledge_stats)
+                show_model_used(model_tier)
+                flag_new_duplicates(new_item)
+                
+                st.download_button(
+                    label="📥 Download Content",
+                    data=deferred(result),
+                    file_name=f"seo_{seo_content_type.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                    mime="text/markdown"
+                )
+            else:
+                st.error(result)
+
+render_duplicate_review("seo")
+render_reused_item("seo")
+render_cache_notice("seo")
@@ -0,0 +1,418 @@
+"""
+Social media content generator
+"""
+
+import streamlit as st
+from datetime import datetime
+from marketing_engine import (
+    CONTENT_TYPES, OUTPUT_STOP_SEQUENCES, PLATFORM_GUIDELINES, TARGET_PERSONAS, VARIANT_COUNTS, active_company,
+    add_to_history, build_refine_prompt, build_social_prompt_sections, build_variant_output_section, deferred,
+    duplicate_gate, flag_new_duplicates, get_blob_store, get_claude_response, history_content, join_prompt_sections,
+    model_tier_selector, parse_variants, rank_variants, render_cache_notice, render_duplicate_review,
+    render_reused_item, restore_form_draft, route_model_tier, save_form_draft, select_company_context,
+    semantic_cache_lookup, semantic_cache_store, show_knowledge_savings, show_model_used, social_output_budget,
+    stoppable_generation, variant_output_budget, warn_if_prompt_over_budget
+)
+
+company_info, company_display_name = active_company()
+
+st.markdown("## 📱 Social Media Content Generator")
+st.markdown(f"Creating **marketing content** for **{company_display_name}** to reach immigration law professionals")
+
+# Check if social media is enabled
+social_media_enabled = st.session_state.get('enable_social_media', True)
+
+if not social_media_enabled:
+    st.warning("⚠️ **Social Media Content Generation is DISABLED**. Enable in sidebar → '📱 Enable Social Media'")
+
+# Inputs are batched in a form: nothing reruns until Generate, and the draft survives page switches
+restore_form_draft("social")
+with st.form("social_form", border=False):
+    # Marketing Goal Selection
+    st.markdown("### 🎯 Marketing Objective")
+    marketing_goal = st.selectbox(
+        "What's your primary goal?",
+        [
+            "Generate Leads & Demo Requests",
+            "Build Brand Awareness",
+            "Showcase Product Features",
+            "Share Client Success Stories",
+            "Establish Thought Leadership",
+            "Drive Website Traffic",
+            "Promote Special Offers/Trials",
+            "Compete Against Alternatives"
+        ],
+        help="Select your primary marketing objective for this content",
+        key="social:goal"
+    )
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        platform = st.selectbox(
+            "Select Platform",
+            list(PLATFORM_GUIDELINES.keys()),
+            help="Choose the social media platform",
+            key="social:platform"
+        )
+    
+        content_type = st.selectbox(
+            "Content Type",
+            list(CONTENT_TYPES.keys()),
+            help="Select the type of content to create",
+            key="social:content_type"
+        )
+    
+        topic = st.text_input(
+            "Topic/Theme",
+            placeholder="e.g., How LawTrax reduces H-1B processing time by 50%",
+            help="What should the post be about?",
+            key="social:topic"
+        )
+
+    with col2:
+        # Persona Selection
+        target_persona = st.selectbox(
+            "🎯 Target Persona",
+            list(TARGET_PERSONAS.keys()),
+            help="Select who you're targeting with this content",
+            key="social:persona"
+        )
+    
+        tone = st.selectbox(
+            "Tone",
+            ["Professional & Authoritative", "Conversational & Relatable", "Educational & Helpful", 
+             "Urgent & Action-Oriented", "Inspiring & Visionary", "Data-Driven & ROI-Focused",
+             "Friendly & Approachable", "Technical & Detailed"],
+            help="Select the desired tone",
+            key="social:tone"
+        )
+
+    # Additional targeting options
+    st.markdown("### 📝 Content Details")
+    detail_col1, detail_col2 = st.columns(2)
+
+    with detail_col1:
+        include_cta = st.selectbox(
+            "Call-to-Action Type",
+            [
+                "Book a Demo",
+                "Start Free Trial",
+                "Learn More (Website)",
+                "Download Resource",
+                "Contact Sales",
+                "Watch Video Demo",
+                "Read Case Study",
+                "Get Pricing",
+                "Join Webinar",
+                "Comment Below (Engagement)",
+                "No CTA (Awareness Only)"
+            ],
+            key="social:cta"
+        )
+    
+        # LinkedIn-specific hook selector (always shown: the form doesn't rerun when the platform changes)
+        hook_style = st.selectbox(
+            "🎣 Hook Style (LinkedIn)",
+            [
+                "Auto-Generate Best Hook",
+                "Lessons Learned: 'I spent X years doing Y. Here's what I learned:'",
+                "Contrarian: 'Stop doing X. Do this instead:'",
+                "Hot Take: '[Unpopular opinion]. Here's why:'",
+                "Mistake Alert: 'The biggest mistake I see [persona] make:'",
+                "Listicle: '[Number] things that will [benefit]:'",
+                "Story: 'I was wrong about X. Here's the truth:'",
+                "Direct Address: '[Persona], you need to hear this:'",
+                "Curiosity Gap: 'Most people don't know this about [topic]...'",
+                "Results: 'This changed everything for our clients:'"
+            ],
+            help="Select a proven hook format for higher engagement. Only used for LinkedIn posts",
+            key="social:hook_style"
+        )
+    
+        competitor_mention = st.multiselect(
+            "Competitors to Position Against (Optional)",
+            ["INSZoom", "Docketwise", "LawLogix Edge", "CampLegal", "Clio", "MyCase", "Generic Spreadsheets"],
+            help="Select if you want to subtly position against competitors",
+            key="social:competitors"
+        )
+    
+        variant_count = st.selectbox(
+            "🧪 Variants (A/B Testing)",
+            VARIANT_COUNTS,
+            format_func=lambda n: "Single post" if n == 1 else f"{n} variants in one call",
+            help="Generate several variants in a single API call, ranked locally",
+            key="social:variant_count"
+        )
+        variant_kind = st.radio(
+            "Variant Type",
+            ["Full posts", "Hooks only"],
+            horizontal=True,
+            help="Used when generating more than one variant",
+            key="social:variant_kind"
+        )
+
+    with detail_col2:
+        key_features = st.multiselect(
+            "Key Features to Highlight",
+            [
+                "Real-Time Reporting (No 24hr Delays)",
+                "Zero Additional API Costs",
+                "99.9% Uptime Guarantee",
+                "Built-in USCIS/DoL PDF Generator",
+                "Secure Client Portal",
+                "Complete Audit Trail",
+                "QuickBooks Integration",
+                "Outlook Calendar Sync",
+                "Lead Management CRM",
+                "Document Management System",
+                "Automated Notifications",
+                "Custom Workflows",
+                "30%+ Revenue Increase Results"
+            ],
+            help="Select features to emphasize in the content",
+            key="social:features"
+        )
+    
+        additional_context = st.text_area(
+            "Additional Context (Optional)",
+            placeholder="Any specific points, current promotions, or requirements...",
+            height=80,
+            key="social:context"
+        )
+    
+        social_tier = model_tier_selector("social:model_tier")
+
+    generate_social = st.form_submit_button(
+        "✨ Generate Marketing Content", type="primary", use_container_width=True, disabled=not social_media_enabled
+    )
+save_form_draft("social", generate_social)
+
+if platform != "LinkedIn":
+    hook_style = "Auto-Generate Best Hook"
+
+# Selected content type and persona
+st.caption(f"💡 {content_type}: {CONTENT_TYPES[content_type]}")
+persona_info = TARGET_PERSONAS[target_persona]
+st.markdown(f"""
+    <div style="background: #f0f4f8; padding: 1rem; border-radius: 8px; font-size: 0.85rem; margin-bottom: 1rem;">
+        <strong>Persona Profile ({target_persona}):</strong><br>
+        {persona_info['description']}<br><br>
+        <strong>Key Pain Points:</strong> {', '.join(persona_info['pain_points'][:2])}<br>
+        <strong>Recommended Tone:</strong> {persona_info['tone']}
+    </div>
+    """, unsafe_allow_html=True)
+
+# Platform-specific info
+guidelines = PLATFORM_GUIDELINES.get(platform, {})
+
+# Special LinkedIn tips section
+if platform == "LinkedIn":
+    st.markdown("""
+        <div style="background: linear-gradient(135deg, #0077B5 0%, #00A0DC 100%); 
+                    padding: 1.5rem; border-radius: 12px; color: white; margin-bottom: 1rem;">
+            <h4 style="margin: 0 0 1rem 0;">🔥 LinkedIn Viral Post Formula</h4>
+            <p style="margin: 0; font-size: 0.95rem; line-height: 1.6;">
+                <strong>Hook Examples That Work:</strong><br>
+                • "I've helped 50+ immigration firms. Here's what the top 1% do differently:"<br>
+                • "Stop using spreadsheets for case management. Here's why:"<br>
+                • "Most immigration attorneys waste 10+ hours/week on admin. The solution?"<br>
+                • "Unpopular opinion: Your case management software is killing your revenue."<br><br>
+                <strong>Format Rules:</strong> One sentence per line → Blank lines between → Hook first → Question at end → Hashtags last
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+else:
+    st.markdown(f"""
+        <div class="info-box">
+            <strong>📌 {platform} Guidelines:</strong><br>
+            • Max Characters: {guidelines.get('max_chars', 'N/A')} | Hashtags: {guidelines.get('hashtags', 'N/A')}<br>
+            • Tone: {guidelines.get('tone', 'N/A')}<br>
+            • Best Formats: {guidelines.get('format', 'N/A')}
+        </div>
+        """, unsafe_allow_html=True)
+
+if generate_social or st.session_state.pop("force_generate_social", False):
+    if not st.session_state.api_key:
+        st.error("⚠️ Please enter your Claude API key in the sidebar")
+    elif not topic:
+        st.error("⚠️ Please enter a topic")
+    elif duplicate_gate("social", topic):
+        refine_source = st.session_state.pop("refine_source_social", None)
+        if refine_source is not None:
+            variant_count = 1
+        spinner_text = (f"🧪 Writing {variant_count} {platform} variants in one call..." if variant_count > 1
+                        else f"🎨 Creating {platform} marketing content...")
+        with st.spinner(spinner_text):
+            model_tier = route_model_tier("social", platform, guidelines['max_chars'], social_tier)
+            cache_settings = {
+                "company": company_info, "platform": platform, "content_type": content_type,
+                "goal": marketing_goal, "persona": target_persona, "tone": tone, "cta": include_cta,
+                "hook": hook_style, "features": sorted(key_features), "competitors": sorted(competitor_mention),
+                "variants": variant_count, "variant_kind": variant_kind if variant_count > 1 else None,
+                "tier": model_tier
+            }
+            cache_text = f"{topic} {additional_context}"
+            cache_hit = semantic_cache_lookup("social", cache_settings, cache_text, bypass=refine_source is not None)
+            knowledge_stats = None
+
+            if cache_hit:
+                result = cache_hit["result"]
+            else:
+                # Build enhanced marketing prompt
+                persona_details = TARGET_PERSONAS[target_persona]
+                company_context, knowledge_stats = select_company_context(
+                    company_info,
+                    " ".join([topic, content_type, marketing_goal, persona_details['content_focus'], include_cta,
+                              " ".join(key_features), " ".join(competitor_mention), additional_context])
+                )
+
+                prompt_sections = build_social_prompt_sections(
+                    company_context, platform, marketing_goal, target_persona, content_type, topic, tone,
+                    include_cta, hook_style, key_features, competitor_mention, additional_context
+                )
+                if variant_count > 1:
+                    # Ask for every variant in one structured response instead of N full calls
+                    prompt_sections = [
+                        build_variant_output_section(variant_count, variant_kind, platform) if name == "Output format" else (name, text)
+                        for name, text in prompt_sections
+                    ]
+                if refine_source is not None:
+                    # Adapt the chosen history item instead of generating from scratch
+                    prompt_sections = [("Refine", build_refine_prompt(
+                        history_content(st.session_state.generated_content[refine_source]),
+                        {
+                            "Platform": platform,
+                            "Content type": content_type,
+                            "Topic": topic,
+                            "Target persona": target_persona,
+                            "Tone": tone,
+                            "Call-to-action": include_cta,
+                            "Key features": ", ".join(key_features),
+                            "Additional context": additional_context
+                        }
+                    ))]
+                enhanced_prompt = join_prompt_sections(prompt_sections)
+                warn_if_prompt_over_budget(enhanced_prompt, prompt_sections)
+
+                social_draft = {"type": "Social Media Marketing", "platform": platform, "topic": topic,
+                                "persona": target_persona, "goal": marketing_goal}
+                with stoppable_generation(social_draft) as generation:
+                    if variant_count > 1:
+                        result = get_claude_response(
+                            enhanced_prompt,
+                            st.session_state.api_key,
+                            model_tier,
+                            max_tokens=variant_output_budget(platform, variant_count, variant_kind)
+                        )
+                    else:
+                        result = get_claude_response(
+                            enhanced_prompt,
+                            st.session_state.api_key,
+                            model_tier,
+                            max_tokens=social_output_budget(platform),
+                            stop_sequences=OUTPUT_STOP_SEQUENCES["linkedin" if platform == "LinkedIn" else "social"]
+                        )
+                if refine_source is None:
+                    semantic_cache_store("social", cache_settings, cache_text, result, generation["truncated"])
+
+            if variant_count > 1:
+                if not result.startswith("ERROR"):
+                    high_performers = [
+                        history_content(item) for item in st.session_state.generated_content
+                        if item.get('high_performer') and item.get('platform') == platform
+                    ]
+                    st.session_state.social_variants = {
+                        "id": datetime.now().strftime("%Y%m%d%H%M%S"),
+                        "platform": platform,
+                        "topic": topic,
+                        "persona": target_persona,
+                        "goal": marketing_goal,
+                        "kind": variant_kind,
+                        "high_performers": len(high_performers),
+                        "variants": rank_variants(parse_variants(result), platform, variant_kind, high_performers)
+                    }
+                    # Variant bodies live in the blob store; saving one to history reuses the same blob
+                    for variant in st.session_state.social_variants["variants"]:
+                        variant["content_blob"] = get_blob_store().put(variant.pop("content"))
+                    if knowledge_stats:
+                        show_knowledge_savings(knowledge_stats)
+                    show_model_used(model_tier)
+                else:
+                    st.error(result)
+            else:
+                if not result.startswith("ERROR"):
+                    new_item = {
+                        "type": "Social Media Marketing",
+                        "platform": platform,
+                        "topic": topic,
+                        "persona": target_persona,
+                        "goal": marketing_goal,
+                        "content": result,
+                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
+                    }
+                    if cache_hit:
+                        new_item["from_cache"] = True
+                    add_to_history(new_item, base=refine_source)
+                    
+                    st.markdown('<div class="success-banner">✅ Marketing Content Generated!</div>', unsafe_allow_html=True)
+                    st.markdown("### 📝 Generated Marketing Content")
+                    st.markdown(result)
+                    if knowledge_stats:
+                        show_knowledge_savings(knowledge_stats)
+                    show_model_used(model_tier)
+                    flag_new_duplicates(new_item)
+                    
+                    # Copy button
+                    st.download_button(
+                        label="📥 Download Content",
+                        data=deferred(result),
+                        file_name=f"{platform.lower()}_marketing_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
+                        mime="text/plain"
+                    )
+                else:
+                    st.error(result)
+
+render_duplicate_review("social")
+render_reused_item("social")
+render_cache_notice("social")
+
+# Ranked variants stay on screen so each one can be saved with one click
+if st.session_state.get("social_variants"):
+    variant_set = st.session_state.social_variants
+    st.markdown(f"### 🧪 Ranked Variants - {variant_set['platform']} ({variant_set['kind'].lower()})")
+    st.caption(
+        f"Generated in one API call and ranked locally by validator checks, length fit and similarity to "
+        f"{variant_set['high_performers']} ⭐ high performer(s) on {variant_set['platform']}"
+    )
+    variant_cols = st.columns(len(variant_set["variants"]))
+    for rank, (variant_col, variant) in enumerate(zip(variant_cols, variant_set["variants"]), start=1):
+        with variant_col:
+            st.markdown(f"**#{rank} · Variant {variant['variant']}** · Score {variant['score']:.2f}")
+            st.caption(
+                f"✅ Validator {variant['validator']:.0%} · 📏 Length fit {variant['length_fit']:.0%} · "
+                f"⭐ Similarity {variant['similarity']:.0%}"
+            )
+            if variant["issues"]:
+                st.caption("⚠️ " + ", ".join(variant["issues"]))
+            st.markdown(history_content(variant))
+            if st.button(
+                "✔️ Saved" if variant.get("saved") else "💾 Save to History",
+                key=f"save_variant_{variant_set['id']}_{variant['variant']}",
+                disabled=variant.get("saved", False),
+                use_container_width=True
+            ):
+                add_to_history({
+                    "type": "Social Media Marketing" if variant_set["kind"] == "Full posts" else "Social Media Hook",
+                    "platform": variant_set["platform"],
+                    "topic": variant_set["topic"],
+                    "persona": variant_set["persona"],
+                    "goal": variant_set["goal"],
+                    "content": history_content(variant),
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
+                })
+                variant["saved"] = True
+                st.rerun()
+    if st.button("✖️ Dismiss Variants", key="dismiss_variants"):
+        del st.session_state.social_variants
+        st.rerun()
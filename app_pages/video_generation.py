@@ -0,0 +1,540 @@
+"""
+Video generation packages for HeyGen, Runway, Pika, Synthesia and manual editing
+"""
+
+import streamlit as st
+from datetime import datetime
+import time
+from marketing_engine import (
+    RUNWAY_CAMERA_MOVES, RUNWAY_STYLE_LOOKS, active_company, build_heygen_package, build_manual_export_package,
+    build_pika_package, build_provider_packages, build_runway_package, build_synthesia_package, cache_warming_lead,
+    creative_extras_error, deferred, finish_video_package, get_blob_store, model_tier_selector, queued_status,
+    render_script_exports, route_model_tier, run_concurrently
+)
+
+company_info, company_display_name = active_company()
+
+st.markdown("## 🎥 AI Video Generator")
+st.markdown("Transform your scripts into **actual videos** using AI video generation services")
+
+# Check if feature is enabled
+video_gen_enabled = st.session_state.get('enable_video_generation', False)
+
+if not video_gen_enabled:
+    st.warning("⚠️ **Video Generation is DISABLED** to save API tokens. Enable in sidebar → '🎥 Enable Video Generation'")
+
+# Video Generation Method Selection
+st.markdown("### 🎬 Choose Video Generation Method")
+
+video_method = st.selectbox(
+    "Select AI Video Platform",
+    [
+        "🎭 HeyGen - AI Avatar Videos (Best for Talking Head/Presenter)",
+        "🎨 Runway Gen-3 - Cinematic AI Videos",
+        "⚡ Pika Labs - Fast Stylized Videos", 
+        "🎬 Synthesia - Corporate Training Videos",
+        "🌟 Luma Dream Machine - Creative Videos",
+        "📱 InVideo AI - Social Media Videos",
+        "🎯 Manual Export - Get production-ready assets",
+        "🧩 Multiple Providers - HeyGen, Runway & Pika from one script"
+    ]
+)
+
+video_gen_tier = model_tier_selector("video_generation_model_tier")
+video_gen_model_tier = route_model_tier("video_generation", override=video_gen_tier)
+# Synthesia packages are built entirely locally and the other platforms only link out - no extras to offer there
+if any(provider in video_method for provider in ("HeyGen", "Runway", "Pika", "Manual Export")):
+    creative_extras = st.checkbox(
+        "✨ Add creative extras (1 short API call per provider, run in parallel)" if "Multiple Providers" in video_method
+        else "✨ Add creative extras (1 short API call)",
+        value=True,
+        key="creative_extras",
+        help="Alternative prompts, B-roll and thumbnail ideas. Scene splits, settings, formats and file names are built locally."
+    )
+else:
+    creative_extras = False
+
+st.markdown("---")
+
+# Several providers from one script - packages built locally, creative calls run concurrently
+if "Multiple Providers" in video_method:
+    st.markdown("""
+        <div style="background: linear-gradient(135deg, #4B0082 0%, #00C9FF 100%); 
+                    padding: 1.5rem; border-radius: 15px; color: white; margin-bottom: 1rem;">
+            <h3 style="margin: 0 0 0.5rem 0;">🧩 Generate for Multiple Providers</h3>
+            <p style="margin: 0;">One script, every package at once: HeyGen for the presenter, Runway and Pika for B-roll 
+            and social clips. Creative extras for all providers run in parallel.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    multi_providers = st.multiselect("Generate for providers", ["HeyGen", "Runway", "Pika"], default=["HeyGen", "Runway", "Pika"])
+    multi_script = st.text_area(
+        "Video script",
+        height=200,
+        placeholder="Paste a script from the Video Scripts page - [VISUAL: ...] cues become the Runway and Pika scenes",
+        key="multi_provider_script"
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        multi_avatar = st.selectbox("HeyGen Avatar", ["Professional Female (Business)", "Professional Male (Business)",
+                                                      "Diverse Female Presenter", "Diverse Male Presenter"])
+        multi_voice = st.selectbox("HeyGen Voice", ["Professional American Female", "Professional American Male",
+                                                    "Friendly Conversational", "Authoritative Executive"])
+    with col2:
+        multi_length = st.selectbox("Target Length", ["30 seconds", "60 seconds", "90 seconds", "2 minutes", "3 minutes"], index=1)
+        multi_style = st.selectbox("Runway Style", list(RUNWAY_STYLE_LOOKS))
+    with col3:
+        multi_aspect = st.selectbox("Pika Aspect Ratio", ["9:16", "16:9", "1:1", "4:5"])
+        multi_motion = st.select_slider("Runway Camera Motion", options=list(RUNWAY_CAMERA_MOVES), value="Subtle")
+    
+    if st.button("🧩 Generate All Packages", type="primary", use_container_width=True,
+                 disabled=not video_gen_enabled or not multi_providers):
+        if multi_script:
+            packages = build_provider_packages(multi_providers, multi_script, {
+                "avatar": multi_avatar, "voice": multi_voice, "length": multi_length, "background": "Modern Office",
+                "clip_duration": "8 seconds", "style": multi_style, "motion": multi_motion, "aspect": multi_aspect
+            }, company_display_name)
+            provider_progress = st.empty()
+            progress_rows = {provider: {"Provider": provider, "Status": "🔄 Running", "Seconds": None} for provider in packages}
+            provider_progress.dataframe(list(progress_rows.values()), hide_index=True, use_container_width=True)
+            results = {}
+            api_key = st.session_state.api_key
+            jobs = {
+                provider: (lambda package=package, creative=creative: finish_video_package(
+                    package, creative, api_key, video_gen_model_tier, creative_extras
+                ))
+                for provider, (package, creative) in packages.items()
+            }
+            def show_queue_place(provider, position, eta):
+                progress_rows[provider]["Status"] = f"⏳ Queued: {queued_status(position, eta)}" if position else "🔄 Running"
+                provider_progress.dataframe(list(progress_rows.values()), hide_index=True, use_container_width=True)
+
+            # With a script long enough to cache, one provider's call writes it and the rest read it
+            lead = cache_warming_lead({provider: creative and creative[0] for provider, (package, creative) in packages.items()},
+                                      video_gen_model_tier) if creative_extras and api_key else None
+            started = time.perf_counter()
+            for provider, result, seconds in run_concurrently(jobs, show_queue_place, lead):
+                results[provider] = result
+                extras_error = creative_extras_error(result)
+                progress_rows[provider].update({
+                    "Status": f"⚠️ Extras failed: {extras_error}" if extras_error else "✅ Done",
+                    "Seconds": round(seconds, 2)
+                })
+                provider_progress.dataframe(list(progress_rows.values()), hide_index=True, use_container_width=True)
+            # The script is stored once and every package is compressed against it
+            blob_store = get_blob_store()
+            script_blob = blob_store.put(multi_script)
+            st.session_state.provider_packages = {
+                "script": script_blob,
+                "results": {provider: blob_store.put(results[provider], base=script_blob) for provider in multi_providers},
+                "seconds": round(time.perf_counter() - started, 2)
+            }
+        else:
+            st.error("Please enter a script")
+    
+    if st.session_state.get("provider_packages"):
+        provider_packages = st.session_state.provider_packages
+        blob_store = get_blob_store()
+        package_texts = {provider: blob_store.get(blob) for provider, blob in provider_packages["results"].items()}
+        st.markdown('<div class="success-banner">✅ Provider Packages Ready!</div>', unsafe_allow_html=True)
+        st.caption(f"{len(provider_packages['results'])} package(s) in {provider_packages['seconds']}s wall clock")
+        provider_tabs = st.tabs(list(package_texts))
+        for provider_tab, (provider, result) in zip(provider_tabs, package_texts.items()):
+            with provider_tab:
+                st.markdown(result)
+        st.download_button(
+            "📥 Download All Packages",
+            deferred("\n\n---\n\n".join(package_texts.values())),
+            file_name=f"video_packages_{'_'.join(p.lower() for p in provider_packages['results'])}_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+            mime="text/markdown",
+            use_container_width=True
+        )
+
+# HeyGen Integration (Best for LawTrax - talking head marketing videos)
+elif "HeyGen" in video_method:
+    st.markdown("""
+        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                    padding: 1.5rem; border-radius: 15px; color: white; margin-bottom: 1rem;">
+            <h3 style="margin: 0 0 0.5rem 0;">🎭 HeyGen - AI Avatar Videos</h3>
+            <p style="margin: 0; opacity: 0.9;">Perfect for LawTrax marketing: Create professional talking-head videos with AI avatars. 
+            Ideal for product demos, testimonials, and explainer videos.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        heygen_api_key = st.text_input(
+            "HeyGen API Key (Optional)",
+            type="password",
+            help="Get your API key from heygen.com/api"
+        )
+        
+        avatar_type = st.selectbox(
+            "Avatar Type",
+            [
+                "Professional Male (Business)",
+                "Professional Female (Business)", 
+                "Diverse Male Presenter",
+                "Diverse Female Presenter",
+                "Custom Avatar (Upload Your Own)",
+                "Use Stock Avatar"
+            ]
+        )
+        
+        video_voice = st.selectbox(
+            "Voice Style",
+            [
+                "Professional American Male",
+                "Professional American Female",
+                "British Male",
+                "British Female",
+                "Friendly Conversational",
+                "Authoritative Executive"
+            ]
+        )
+    
+    with col2:
+        heygen_video_length = st.selectbox(
+            "Video Length",
+            ["30 seconds", "60 seconds", "90 seconds", "2 minutes", "3 minutes", "5 minutes"]
+        )
+        
+        background_style = st.selectbox(
+            "Background",
+            [
+                "Modern Office",
+                "Law Firm Setting",
+                "Clean White/Minimal",
+                "Tech Gradient",
+                "Custom Background",
+                "Green Screen"
+            ]
+        )
+        
+        include_captions = st.checkbox("Include Auto-Captions", value=True)
+        include_logo = st.checkbox("Include LawTrax Logo", value=True)
+    
+    # Script Input
+    st.markdown("### 📝 Video Script")
+    heygen_script = st.text_area(
+        "Enter or paste your video script",
+        height=200,
+        placeholder="""Hi, I'm here to show you how LawTrax can transform your immigration law practice.
+
+Are you spending hours on paperwork instead of serving clients?
+
+With LawTrax, our clients have seen a 30% increase in revenue by automating case management.
+
+Our platform offers real-time reporting, automated USCIS form generation, and a secure client portal.
+
+Book a free demo today at lawtrax.com.
+
+Let's grow your practice together.""",
+        help="Paste your script from the Video Scripts page or write a new one"
+    )
+    
+    # Generate Video Button
+    if st.button("🎬 Generate HeyGen Video", type="primary", use_container_width=True, disabled=not video_gen_enabled):
+        if heygen_script:
+            # Formatting, scenes and settings are built locally; only the creative extras use the API
+            with st.spinner("Preparing your video package..."):
+                package, creative = build_heygen_package(
+                    heygen_script, avatar_type, video_voice, heygen_video_length, background_style,
+                    include_captions, include_logo, company_display_name
+                )
+                result = finish_video_package(package, creative, st.session_state.api_key, video_gen_model_tier, creative_extras)
+                
+                st.markdown('<div class="success-banner">✅ HeyGen Video Package Ready!</div>', unsafe_allow_html=True)
+                
+                # Display results
+                st.markdown("### 📦 Your HeyGen Video Package")
+                st.markdown(result)
+                
+                # Quick Links
+                st.markdown("### 🔗 Quick Actions")
+                link_col1, link_col2, link_col3 = st.columns(3)
+                with link_col1:
+                    st.link_button("🎭 Open HeyGen", "https://www.heygen.com/", use_container_width=True)
+                with link_col2:
+                    st.link_button("📚 HeyGen Tutorial", "https://www.heygen.com/article/getting-started", use_container_width=True)
+                with link_col3:
+                    st.download_button(
+                        "📥 Download Package",
+                        deferred(result if result else heygen_script),
+                        file_name=f"heygen_video_package_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                        mime="text/markdown",
+                        use_container_width=True
+                    )
+        else:
+            st.error("Please enter a script")
+
+# Runway Gen-3 Integration
+elif "Runway" in video_method:
+    st.markdown("""
+        <div style="background: linear-gradient(135deg, #00C9FF 0%, #92FE9D 100%); 
+                    padding: 1.5rem; border-radius: 15px; color: #333; margin-bottom: 1rem;">
+            <h3 style="margin: 0 0 0.5rem 0;">🎨 Runway Gen-3 Alpha</h3>
+            <p style="margin: 0;">Create cinematic AI-generated videos from text prompts. Perfect for B-roll, 
+            product visualizations, and creative marketing content.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        runway_prompt = st.text_area(
+            "Video Prompt",
+            height=150,
+            placeholder="A modern law office with sunlight streaming through windows, showing a lawyer confidently using a tablet, professional atmosphere, cinematic lighting, 4K quality",
+            help="Describe the video scene you want to create"
+        )
+        
+        runway_duration = st.selectbox(
+            "Duration",
+            ["4 seconds", "8 seconds", "12 seconds", "16 seconds"]
+        )
+    
+    with col2:
+        runway_style = st.selectbox(
+            "Style",
+            [
+                "Cinematic / Film",
+                "Corporate / Professional",
+                "Modern / Tech",
+                "Documentary",
+                "Commercial / Ad",
+                "Abstract / Artistic"
+            ]
+        )
+        
+        runway_motion = st.select_slider(
+            "Camera Motion",
+            options=["Static", "Subtle", "Moderate", "Dynamic", "Dramatic"]
+        )
+    
+    if st.button("🎨 Generate Runway Prompt Package", type="primary", use_container_width=True, disabled=not video_gen_enabled):
+        if not runway_prompt:
+            st.error("Please describe the video scene")
+        else:
+            with st.spinner("Creating optimized Runway prompts..."):
+                package, creative = build_runway_package(runway_prompt, runway_duration, runway_style, runway_motion, company_display_name)
+                result = finish_video_package(package, creative, st.session_state.api_key, video_gen_model_tier, creative_extras)
+            
+                st.markdown('<div class="success-banner">✅ Runway Package Ready!</div>', unsafe_allow_html=True)
+                st.markdown(result)
+            
+                st.markdown("### 🔗 Quick Actions")
+                link_col1, link_col2 = st.columns(2)
+                with link_col1:
+                    st.link_button("🎨 Open Runway", "https://app.runwayml.com/", use_container_width=True)
+                with link_col2:
+                    st.download_button(
+                        "📥 Download Prompts",
+                        deferred(result if result else runway_prompt),
+                        file_name=f"runway_prompts_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                        mime="text/markdown",
+                        use_container_width=True
+                    )
+
+# Pika Labs Integration
+elif "Pika" in video_method:
+    st.markdown("""
+        <div style="background: linear-gradient(135deg, #FF6B6B 0%, #FFE66D 100%); 
+                    padding: 1.5rem; border-radius: 15px; color: #333; margin-bottom: 1rem;">
+            <h3 style="margin: 0 0 0.5rem 0;">⚡ Pika Labs</h3>
+            <p style="margin: 0;">Fast, stylized AI video generation. Great for social media content, 
+            quick iterations, and creative experimentation.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    pika_prompt = st.text_area(
+        "Pika Video Prompt",
+        height=150,
+        placeholder="Immigration attorney reviewing documents on tablet, modern office, warm lighting, professional"
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        pika_aspect = st.selectbox("Aspect Ratio", ["16:9", "9:16", "1:1", "4:5"])
+    with col2:
+        pika_motion = st.slider("Motion Level", 1, 5, 3)
+    with col3:
+        pika_guidance = st.slider("Prompt Guidance", 1, 20, 12)
+    
+    if st.button("⚡ Generate Pika Package", type="primary", use_container_width=True, disabled=not video_gen_enabled):
+        if not pika_prompt:
+            st.error("Please describe the video scene")
+        else:
+            with st.spinner("Creating Pika prompts..."):
+                package, creative = build_pika_package(pika_prompt, pika_aspect, pika_motion, pika_guidance)
+                result = finish_video_package(package, creative, st.session_state.api_key, video_gen_model_tier, creative_extras)
+            
+                st.markdown('<div class="success-banner">✅ Pika Package Ready!</div>', unsafe_allow_html=True)
+                st.markdown(result)
+            
+                link_col1, link_col2 = st.columns(2)
+                with link_col1:
+                    st.link_button("⚡ Open Pika Labs", "https://pika.art/", use_container_width=True)
+                with link_col2:
+                    st.download_button(
+                        "📥 Download Package",
+                        deferred(result),
+                        file_name=f"pika_package_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                        mime="text/markdown",
+                        use_container_width=True
+                    )
+
+# Synthesia Integration
+elif "Synthesia" in video_method:
+    st.markdown("""
+        <div style="background: linear-gradient(135deg, #4B0082 0%, #9370DB 100%); 
+                    padding: 1.5rem; border-radius: 15px; color: white; margin-bottom: 1rem;">
+            <h3 style="margin: 0 0 0.5rem 0;">🎬 Synthesia</h3>
+            <p style="margin: 0;">Enterprise-grade AI video platform. Perfect for training videos, 
+            corporate communications, and professional presentations.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    synthesia_script = st.text_area(
+        "Synthesia Script",
+        height=200,
+        placeholder="Enter your professional script here..."
+    )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        synthesia_avatar = st.selectbox("Avatar", ["Professional Male", "Professional Female", "Diverse Options"])
+        synthesia_lang = st.selectbox("Language", ["English (US)", "English (UK)", "Spanish", "French", "German"])
+    with col2:
+        synthesia_template = st.selectbox("Template", ["Corporate", "Training", "Marketing", "Minimal"])
+        synthesia_brand = st.checkbox("Include LawTrax Branding", value=True)
+    
+    if st.button("🎬 Generate Synthesia Package", type="primary", use_container_width=True, disabled=not video_gen_enabled):
+        if synthesia_script:
+            package, _ = build_synthesia_package(
+                synthesia_script, synthesia_avatar, synthesia_lang, synthesia_template, synthesia_brand, company_display_name
+            )
+            result = finish_video_package(package, None, st.session_state.api_key, video_gen_model_tier, creative_extras)
+            st.markdown('<div class="success-banner">✅ Ready for Synthesia!</div>', unsafe_allow_html=True)
+            st.markdown(result)
+            link_col1, link_col2 = st.columns(2)
+            with link_col1:
+                st.link_button("🎬 Open Synthesia", "https://www.synthesia.io/", use_container_width=True)
+            with link_col2:
+                st.download_button(
+                    "📥 Download Package",
+                    deferred(result),
+                    file_name=f"synthesia_package_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                    mime="text/markdown",
+                    use_container_width=True
+                )
+        else:
+            st.error("Please enter a script")
+
+# Manual Export Option
+elif "Manual" in video_method:
+    st.markdown("""
+        <div style="background: linear-gradient(135deg, #2C3E50 0%, #3498DB 100%); 
+                    padding: 1.5rem; border-radius: 15px; color: white; margin-bottom: 1rem;">
+            <h3 style="margin: 0 0 0.5rem 0;">🎯 Production-Ready Export</h3>
+            <p style="margin: 0;">Get all assets needed to produce your video with any tool or 
+            send to a video production team.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    export_script = st.text_area(
+        "Your Video Script",
+        height=200,
+        placeholder="Paste your script here to generate a complete production package..."
+    )
+    
+    export_format = st.selectbox(
+        "Export Format",
+        [
+            "Complete Production Brief (PDF-ready)",
+            "Storyboard Document",
+            "Shot List + Script",
+            "Social Media Package (All Platforms)",
+            "Agency Brief"
+        ]
+    )
+    
+    if st.button("📦 Generate Production Package", type="primary", use_container_width=True, disabled=not video_gen_enabled):
+        if export_script:
+            with st.spinner("Creating production package..."):
+                package, creative = build_manual_export_package(export_script, export_format, company_display_name)
+                result = finish_video_package(package, creative, st.session_state.api_key, video_gen_model_tier, creative_extras)
+                
+                st.markdown('<div class="success-banner">✅ Production Package Complete!</div>', unsafe_allow_html=True)
+                st.markdown(result)
+                
+                st.download_button(
+                    "📥 Download Production Package",
+                    deferred(result),
+                    file_name=f"video_production_package_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                    mime="text/markdown",
+                    use_container_width=True
+                )
+                render_script_exports(export_script, "video_production", "manual_export")
+        else:
+            st.error("Please enter a script")
+
+# Other platforms - show quick links
+else:
+    st.markdown("### 🔗 Quick Access to Video Platforms")
+    
+    platform_col1, platform_col2, platform_col3 = st.columns(3)
+    
+    with platform_col1:
+        st.link_button("🎭 HeyGen", "https://www.heygen.com/", use_container_width=True)
+        st.link_button("🎨 Runway", "https://app.runwayml.com/", use_container_width=True)
+    
+    with platform_col2:
+        st.link_button("⚡ Pika Labs", "https://pika.art/", use_container_width=True)
+        st.link_button("🎬 Synthesia", "https://www.synthesia.io/", use_container_width=True)
+    
+    with platform_col3:
+        st.link_button("🌟 Luma AI", "https://lumalabs.ai/", use_container_width=True)
+        st.link_button("📱 InVideo", "https://invideo.io/", use_container_width=True)
+
+# Tips Section
+st.markdown("---")
+st.markdown("### 💡 AI Video Generation Tips for LawTrax Marketing")
+
+tips_col1, tips_col2 = st.columns(2)
+
+with tips_col1:
+    st.markdown("""
+        **Best Platforms by Use Case:**
+        
+        🎭 **HeyGen** - Talking head videos, demos, testimonials
+        - Best for: Product explainers, founder messages
+        - Cost: ~$2.40 per 10-second video
+        
+        🎨 **Runway** - Cinematic B-roll, visualizations
+        - Best for: Background footage, transitions
+        - Cost: ~$0.50 per 5-second clip
+        
+        ⚡ **Pika** - Quick social content
+        - Best for: TikTok, Reels, fast iterations
+        - Cost: Free tier available
+        """)
+
+with tips_col2:
+    st.markdown("""
+        **LawTrax Video Ideas:**
+        
+        📹 **Product Demo** (HeyGen + Screen Recording)
+        - AI avatar introduces, screen shows platform
+        
+        🎬 **Client Testimonial** (HeyGen)
+        - Professional avatar shares success story
+        
+        🎥 **Explainer Video** (Synthesia)
+        - How LawTrax solves immigration firm pain points
+        
+        📱 **Social Clips** (Pika/Runway)
+        - Quick tips, stats, feature highlights
+        """)
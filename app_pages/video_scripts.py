@@ -0,0 +1,483 @@
+"""
+Video scripts and full video packages
+"""
+
+import streamlit as st
+from datetime import datetime
+from marketing_engine import (
+    OUTPUT_STOP_SEQUENCES, SPOKEN_CHARS_PER_SECOND, TARGET_PERSONAS, active_company, add_to_history,
+    build_refine_prompt, deferred, duplicate_gate, duration_to_seconds, flag_new_duplicates, generate_video_package,
+    get_claude_response, history_content, model_tier_selector, render_cache_notice, render_duplicate_review,
+    render_reused_item, render_script_exports, render_script_fit, restore_form_draft, route_model_tier,
+    save_form_draft, select_company_context, semantic_cache_lookup, semantic_cache_store, show_knowledge_savings,
+    show_model_used, stoppable_generation, video_output_budget, warn_if_prompt_over_budget
+)
+
+company_info, company_display_name = active_company()
+
+st.markdown("## 🎬 Video Marketing Generator")
+st.markdown(f"Creating **video marketing content** for **{company_display_name}** to drive leads and conversions")
+
+# Check if feature is enabled - show banner if disabled
+if not st.session_state.get('enable_video_scripts', False):
+    st.warning("⚠️ **Video Script Generation is DISABLED** to save API tokens. Enable in sidebar → '🎬 Enable Video Scripts'")
+
+# Inputs are batched in a form: nothing reruns until Generate, and the draft survives page switches
+restore_form_draft("video")
+with st.form("video_form", border=False):
+    # Video Marketing Goal
+    st.markdown("### 🎯 Video Marketing Objective")
+    video_goal = st.selectbox(
+        "What's your video goal?",
+        [
+            "Generate Demo Requests",
+            "Explain Product Benefits",
+            "Share Client Success Story",
+            "Compare Against Competitors",
+            "Address Common Objections",
+            "Showcase Specific Feature",
+            "Build Brand Awareness",
+            "Educate on Immigration Tech",
+            "Promote Webinar/Event",
+            "Retarget Website Visitors"
+        ],
+        key="video:goal"
+    )
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        video_platform = st.selectbox(
+            "Platform",
+            ["TikTok", "YouTube", "Instagram Reels", "LinkedIn Video", "Facebook Video", "YouTube Shorts", "Website/Landing Page"],
+            key="video:platform"
+        )
+    
+        video_type = st.selectbox(
+            "Video Type",
+            [
+                "🎯 Marketing - Product Demo",
+                "🎯 Marketing - Explainer Video",
+                "🎯 Marketing - Customer Testimonial",
+                "🎯 Marketing - Problem/Solution",
+                "🎯 Marketing - Competitor Comparison",
+                "🎯 Marketing - Feature Highlight",
+                "🎯 Marketing - ROI/Results Showcase",
+                "🎯 Marketing - Objection Handler",
+                "📚 Educational - How-To Tutorial",
+                "📚 Educational - Industry Tips",
+                "📚 Educational - USCIS Updates",
+                "🎭 Engagement - Day-in-the-Life",
+                "🎭 Engagement - Behind-the-Scenes",
+                "🎭 Engagement - Team Introduction",
+                "🎭 Engagement - FAQ Response",
+                "🎭 Engagement - Trending Challenge",
+                "📢 Announcement - New Feature",
+                "📢 Announcement - Company News",
+                "📢 Announcement - Event Promotion"
+            ],
+            key="video:type"
+        )
+    
+        video_topic = st.text_input(
+            "Video Topic",
+            placeholder="e.g., Why immigration firms are switching from spreadsheets to LawTrax",
+            key="video:topic"
+        )
+    
+        # Target Persona for Video
+        video_persona = st.selectbox(
+            "🎯 Target Persona",
+            list(TARGET_PERSONAS.keys()),
+            key="video:persona"
+        )
+
+    with col2:
+        duration = st.selectbox(
+            "Target Duration",
+            [
+                "15 seconds (TikTok/Reels Hook)",
+                "30 seconds (Social Ad)",
+                "60 seconds (Explainer)",
+                "90 seconds (Product Demo)",
+                "2-3 minutes (Deep Dive)",
+                "5-7 minutes (Tutorial)",
+                "10+ minutes (Comprehensive)"
+            ],
+            key="video:duration"
+        )
+    
+        video_style = st.selectbox(
+            "Style",
+            [
+                "Talking Head (Founder/Expert)",
+                "Screen Recording + Voiceover",
+                "Animated Explainer",
+                "Customer Interview",
+                "Problem/Solution Drama",
+                "Side-by-Side Comparison",
+                "Text Overlay + B-Roll",
+                "Mixed Media",
+                "Documentary Style"
+            ],
+            key="video:style"
+        )
+    
+        video_cta = st.selectbox(
+            "Call-to-Action",
+            [
+                "Book a Free Demo",
+                "Start Your Free Trial",
+                "Visit lawtrax.com",
+                "Link in Bio",
+                "Comment for More Info",
+                "Download Our Guide",
+                "Call 972-200-1030",
+                "See Pricing"
+            ],
+            key="video:cta"
+        )
+    
+        key_message = st.text_input(
+            "Key Message/Hook",
+            placeholder="e.g., Stop losing clients to paperwork chaos",
+            help="The one thing you want viewers to remember",
+            key="video:key_message"
+        )
+
+    # Additional video options
+    st.markdown("### 🎥 Video Details")
+    vid_detail_col1, vid_detail_col2 = st.columns(2)
+
+    with vid_detail_col1:
+        pain_points_video = st.multiselect(
+            "Pain Points to Address",
+            [
+                "Manual data entry taking too long",
+                "Missing deadlines",
+                "Lost documents",
+                "No real-time case visibility",
+                "Expensive software with hidden fees",
+                "Complex, hard-to-use systems",
+                "Poor client communication",
+                "Compliance concerns",
+                "Can't scale with growth",
+                "24-hour reporting delays"
+            ],
+            key="video:pain_points"
+        )
+    
+        proof_points = st.multiselect(
+            "Proof Points to Include",
+            [
+                "30%+ revenue increase",
+                "99.9% uptime guarantee",
+                "Zero additional API costs",
+                "Real-time reporting",
+                "25+ years industry experience",
+                "Google Cloud security",
+                "SOC 2 Type II compliant",
+                "Trusted by leading firms"
+            ],
+            key="video:proof_points"
+        )
+
+    with vid_detail_col2:
+        competitor_video = st.multiselect(
+            "Competitors to Address (Subtle)",
+            ["INSZoom", "Docketwise", "LawLogix", "CampLegal", "Spreadsheets/Manual", "Other Legacy Systems"],
+            key="video:competitors"
+        )
+    
+        video_context = st.text_area(
+            "Additional Requirements",
+            placeholder="Specific scenes, testimonial quotes, features to show...",
+            height=80,
+            key="video:context"
+        )
+    
+        video_tier = model_tier_selector("video:model_tier")
+
+    # Generate buttons
+    st.markdown("---")
+    gen_col1, gen_col2 = st.columns(2)
+
+    # Check if video scripts feature is enabled
+    video_scripts_enabled = st.session_state.get('enable_video_scripts', False)
+
+    with gen_col1:
+        generate_script = st.form_submit_button(
+            "📝 Generate Video Script", 
+            type="primary", 
+            use_container_width=True,
+            disabled=not video_scripts_enabled
+        )
+
+    with gen_col2:
+        generate_full_video = st.form_submit_button(
+            "🎬 Generate Full Video Package", 
+            type="secondary", 
+            use_container_width=True,
+            disabled=not video_scripts_enabled
+        )
+
+save_form_draft("video", generate_script or generate_full_video)
+
+# Show warning if disabled
+if not video_scripts_enabled:
+    st.warning("⚠️ **Video Script Generation is DISABLED** to save API tokens. Enable in sidebar → '🎬 Enable Video Scripts'")
+
+forced_video_mode = st.session_state.pop("force_generate_video", None)
+generate_script = generate_script or forced_video_mode == "script"
+generate_full_video = generate_full_video or forced_video_mode == "full"
+
+if generate_script or generate_full_video:
+    if not st.session_state.api_key:
+        st.error("⚠️ Please enter your Claude API key in the sidebar")
+    elif not video_topic:
+        st.error("⚠️ Please enter a video topic")
+    elif duplicate_gate("video", video_topic, "full" if generate_full_video else "script"):
+        persona_info = TARGET_PERSONAS[video_persona]
+        company_context, knowledge_stats = select_company_context(
+            company_info,
+            " ".join([video_topic, video_type, video_goal, persona_info['content_focus'], key_message, video_cta,
+                      " ".join(pain_points_video), " ".join(proof_points), " ".join(competitor_video), video_context])
+        )
+        refine_source = st.session_state.pop("refine_source_video", None)
+        video_refine_details = {
+            "Deliverable": "Full video marketing package" if generate_full_video else "Video script",
+            "Platform": video_platform,
+            "Video type": video_type,
+            "Topic": video_topic,
+            "Duration": duration,
+            "Style": video_style,
+            "Target persona": video_persona,
+            "Call-to-action": video_cta,
+            "Key message": key_message,
+            "Additional context": video_context
+        }
+        video_mode = "full" if generate_full_video else "script"
+        video_cache_settings = {
+            "company": company_info, "mode": video_mode, "platform": video_platform, "type": video_type,
+            "goal": video_goal, "persona": video_persona, "duration": duration, "style": video_style,
+            "cta": video_cta, "key_message": key_message, "pain_points": sorted(pain_points_video),
+            "proof_points": sorted(proof_points), "competitors": sorted(competitor_video), "tier": video_tier
+        }
+        video_cache_text = f"{video_topic} {video_context}"
+        cache_hit = semantic_cache_lookup(
+            "video", video_cache_settings, video_cache_text, video_mode, bypass=refine_source is not None
+        )
+        
+        if generate_full_video:
+            with st.spinner("🎬 Creating comprehensive video marketing package..."):
+                video_brief = f"""You are an expert video marketing strategist and producer specializing in B2B SaaS marketing 
+for the legal technology industry, specifically immigration case management software.
+
+COMPANY INFORMATION:
+{company_context}
+
+VIDEO MARKETING OBJECTIVE: {video_goal}
+
+TARGET PERSONA: {video_persona}
+- Description: {persona_info['description']}
+- Pain Points: {', '.join(persona_info['pain_points'])}
+- Motivators: {', '.join(persona_info['motivators'])}
+
+PLATFORM: {video_platform}
+VIDEO TYPE: {video_type}
+TOPIC: {video_topic}
+TARGET DURATION: {duration}
+STYLE: {video_style}
+CALL-TO-ACTION: {video_cta}
+KEY MESSAGE/HOOK: {key_message if key_message else 'Create a compelling hook'}
+
+PAIN POINTS TO ADDRESS: {', '.join(pain_points_video) if pain_points_video else 'General industry pain points'}
+PROOF POINTS: {', '.join(proof_points) if proof_points else 'Use available metrics'}
+COMPETITORS TO SUBTLY ADDRESS: {', '.join(competitor_video) if competitor_video else 'Focus on LawTrax strengths'}
+
+ADDITIONAL CONTEXT: {video_context if video_context else 'None'}"""
+
+                model_tier = route_model_tier("video_scripts", video_platform, None, video_tier)
+                package_draft = {"type": "Full Video Package", "platform": video_platform, "topic": video_topic,
+                                 "persona": video_persona, "goal": video_goal}
+                if cache_hit:
+                    result = cache_hit["result"]
+                elif refine_source is not None:
+                    refine_prompt = build_refine_prompt(
+                        history_content(st.session_state.generated_content[refine_source]), video_refine_details
+                    )
+                    warn_if_prompt_over_budget(refine_prompt)
+                    with stoppable_generation(package_draft):
+                        result = get_claude_response(
+                            refine_prompt,
+                            st.session_state.api_key,
+                            model_tier,
+                            max_tokens=video_output_budget(duration, full_package=True),
+                            stop_sequences=OUTPUT_STOP_SEQUENCES["video_package"]
+                        )
+                else:
+                    warn_if_prompt_over_budget(video_brief)
+                    stage_progress = st.empty()
+                    with stoppable_generation(package_draft) as generation:
+                        result, stage_rows, failed_stages = generate_video_package(
+                            video_brief, video_platform, video_persona, video_cta, duration,
+                            st.session_state.api_key, model_tier,
+                            on_progress=lambda rows: stage_progress.dataframe(rows, hide_index=True, use_container_width=True)
+                        )
+                    if not failed_stages:
+                        semantic_cache_store("video", video_cache_settings, video_cache_text, result, generation["truncated"])
+                    elif not result.startswith("ERROR"):
+                        st.warning(f"⚠️ {', '.join(failed_stages)} failed - this package was not cached. Generate again to retry.")
+                
+                if not result.startswith("ERROR"):
+                    new_item = {
+                        "type": "Full Video Package",
+                        "platform": video_platform,
+                        "topic": video_topic,
+                        "persona": video_persona,
+                        "goal": video_goal,
+                        "content": result,
+                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
+                    }
+                    if cache_hit:
+                        new_item["from_cache"] = True
+                    add_to_history(new_item, base=refine_source)
+                    st.session_state.script_fit_video = {
+                        "position": len(st.session_state.generated_content) - 1, "duration": duration
+                    }
+                    
+                    st.markdown('<div class="success-banner">✅ Complete Video Package Generated!</div>', unsafe_allow_html=True)
+                    st.markdown("### 🎬 Your Video Marketing Package")
+                    st.markdown(result)
+                    if not cache_hit:
+                        show_knowledge_savings(knowledge_stats)
+                    show_model_used(model_tier)
+                    flag_new_duplicates(new_item)
+                    
+                    st.download_button(
+                        label="📥 Download Full Video Package",
+                        data=deferred(result),
+                        file_name=f"video_package_{video_platform.lower()}_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                        mime="text/markdown"
+                    )
+                    render_script_exports(result, f"video_package_{video_platform.lower()}", "video_package")
+                else:
+                    st.error(result)
+        
+        else:  # generate_script only
+            with st.spinner("📝 Creating video script..."):
+                script_prompt = f"""You are an expert video scriptwriter for B2B SaaS marketing in the legal technology space.
+
+COMPANY: LawTrax - Immigration Case Management Software
+{company_context}
+
+VIDEO DETAILS:
+- Platform: {video_platform}
+- Type: {video_type}
+- Topic: {video_topic}
+- Duration: {duration}
+- Style: {video_style}
+- Target Persona: {video_persona} - {persona_info['description']}
+- CTA: {video_cta}
+- Key Message: {key_message if key_message else 'Create compelling hook'}
+
+Pain Points: {', '.join(pain_points_video) if pain_points_video else 'Industry standard'}
+Proof Points: {', '.join(proof_points) if proof_points else 'Available metrics'}
+
+Create a complete video script with:
+
+## 🎬 VIDEO SCRIPT
+
+**HOOK (0-3 seconds):**
+[Scroll-stopping opening]
+
+**PROBLEM (4-15 seconds):**
+[Relate to viewer's pain]
+
+**SOLUTION (Main body):**
+[Introduce LawTrax as the answer]
+[Include timestamps and visual cues]
+
+**PROOF (Social proof section):**
+[Metrics, testimonials, credibility]
+
+**CTA (Final seconds):**
+[Clear call-to-action: {video_cta}]
+
+---
+
+## 📋 PRODUCTION NOTES
+- B-roll suggestions
+- On-screen text
+- Music/sound recommendations
+- Thumbnail concept
+
+---
+
+## 📝 POST COPY
+Caption/description for {video_platform} with hashtags"""
+
+                if refine_source is not None:
+                    script_prompt = build_refine_prompt(
+                        history_content(st.session_state.generated_content[refine_source]), video_refine_details
+                    )
+                target_seconds = duration_to_seconds(duration)
+                model_tier = route_model_tier(
+                    "video_scripts",
+                    video_platform,
+                    target_seconds * SPOKEN_CHARS_PER_SECOND if target_seconds else None,
+                    video_tier
+                )
+                if cache_hit:
+                    result = cache_hit["result"]
+                else:
+                    warn_if_prompt_over_budget(script_prompt)
+                    with stoppable_generation({"type": "Video Script", "platform": video_platform, "topic": video_topic,
+                                               "persona": video_persona}) as generation:
+                        result = get_claude_response(
+                            script_prompt,
+                            st.session_state.api_key,
+                            model_tier,
+                            max_tokens=video_output_budget(duration)
+                        )
+                    if refine_source is None:
+                        semantic_cache_store("video", video_cache_settings, video_cache_text, result, generation["truncated"])
+                
+                if not result.startswith("ERROR"):
+                    new_item = {
+                        "type": "Video Script",
+                        "platform": video_platform,
+                        "topic": video_topic,
+                        "persona": video_persona,
+                        "content": result,
+                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
+                    }
+                    if cache_hit:
+                        new_item["from_cache"] = True
+                    add_to_history(new_item, base=refine_source)
+                    st.session_state.script_fit_video = {
+                        "position": len(st.session_state.generated_content) - 1, "duration": duration
+                    }
+                    
+                    st.markdown('<div class="success-banner">✅ Video Script Generated!</div>', unsafe_allow_html=True)
+                    st.markdown("### 📝 Your Video Script")
+                    st.markdown(result)
+                    if not cache_hit:
+                        show_knowledge_savings(knowledge_stats)
+                    show_model_used(model_tier)
+                    flag_new_duplicates(new_item)
+                    
+                    st.download_button(
+                        label="📥 Download Script",
+                        data=deferred(result),
+                        file_name=f"video_script_{video_platform.lower()}_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                        mime="text/markdown"
+                    )
+                    render_script_exports(result, f"video_script_{video_platform.lower()}", "video_script")
+                else:
+                    st.error(result)
+
+render_duplicate_review("video")
+render_reused_item("video")
+render_cache_notice("video")
+render_script_fit("video")
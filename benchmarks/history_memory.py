@@ -0,0 +1,101 @@
+"""
+History page memory benchmark: eager vs on-demand download payloads
+
+Loads N synthetic history items (social posts and timestamped video scripts) into
+session state, opens the Content History page in Streamlit's AppTest harness and
+measures, with tracemalloc, the memory still held after a rerun and the peak during
+it. Each layout runs in a fresh interpreter. The baseline is the commit before
+download payloads became callables (or --baseline REF).
+
+Usage: python benchmarks/history_memory.py [--items 500] [--reruns 5] [--baseline REF]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from reruns import APP, ROOT, checkout, default_baseline
+
+MEASURE_SNIPPET = """
+import gc, json, sys, time, tracemalloc
+from streamlit.testing.v1 import AppTest
+
+SCRIPT = '''**[0:00-0:05] HOOK**
+[VISUAL: Attorney buried in paper files]
+Still tracking H-1B cases in spreadsheets? {{n}}
+**[0:05-0:20] PROBLEM**
+[TEXT ON SCREEN: 10+ hours a week on admin]
+Every deadline lives in a different tab, and every status update means another email.
+**[0:20-0:45] SOLUTION**
+[VISUAL: LawTrax dashboard]
+LawTrax puts every case, form and deadline in one real-time dashboard with a secure client portal.
+**[0:45-0:60] CTA**
+[TRANSITION: Fade to logo]
+Book a free demo at lawtrax.com.
+'''
+POST = ("Immigration teams lose hours every week to manual status updates. {{n}} " * 12).strip()
+
+items = []
+for n in range({items}):
+    video = n % 5 < 2
+    items.append({{
+        "type": "Video Script" if video else "Social Media Post",
+        "platform": "YouTube" if video else "LinkedIn",
+        "topic": f"Synthetic history item {{n}} about H-1B case management",
+        "content": (SCRIPT if video else POST).format(n=n),
+        "timestamp": "2026-01-01 09:00"
+    }})
+
+app = AppTest.from_file({app!r}, default_timeout=300)
+app.session_state["generated_content"] = items
+app.switch_page("app_pages/history.py")
+app.run()  # warm: imports, cached resources and the knowledge index
+gc.collect()
+tracemalloc.start()
+started = time.perf_counter()
+for _ in range({reruns}):
+    app.run()
+seconds = (time.perf_counter() - started) / {reruns}
+gc.collect()
+retained, peak = tracemalloc.get_traced_memory()
+print(json.dumps({{"retained": retained, "peak": peak, "seconds": seconds,
+                   "exceptions": [str(e.value) for e in app.exception]}}))
+"""
+
+
+def measure(app_path, items, reruns):
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE_SNIPPET.format(app=str(app_path), items=items, reruns=reruns)],
+        capture_output=True, text=True, check=True, cwd=app_path.parent
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500, help="synthetic history items")
+    parser.add_argument("--reruns", type=int, default=5, help="measured reruns of the history page")
+    parser.add_argument("--baseline", help="git ref with eager download payloads")
+    args = parser.parse_args()
+
+    ref = args.baseline or default_baseline("benchmarks/history_memory.py")
+    with tempfile.TemporaryDirectory() as baseline_dir:
+        checkout(ref, baseline_dir)
+        before = measure(Path(baseline_dir) / APP, args.items, args.reruns)
+    after = measure(ROOT / APP, args.items, args.reruns)
+
+    print(f"Content History page with {args.items} items, {args.reruns} reruns (baseline: {ref})")
+    print(f"  {'':<22} {'retained':>12} {'peak':>12} {'per rerun':>12}")
+    for name, run in (("eager payloads", before), ("on-demand payloads", after)):
+        print(f"  {name:<22} {run['retained'] / 2**20:10.1f}MB {run['peak'] / 2**20:10.1f}MB {run['seconds'] * 1000:10.0f}ms")
+        for error in run["exceptions"][:1]:
+            print("    script raised:", error)
+    saved = before["retained"] - after["retained"]
+    print(f"  retained memory saved: {saved / 2**20:.1f}MB ({saved / max(before['retained'], 1):.0%})")
+
+
+if __name__ == "__main__":
+    main()
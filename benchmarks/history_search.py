@@ -0,0 +1,88 @@
+"""
+History search benchmark: FTS5 index build, incremental insert and query latency
+
+Builds N synthetic history items (topics and content drawn from a Zipf-like vocabulary
+around the product's own terms), indexes them with HistorySearchIndex, then times
+appending one item and a set of queries: selective terms, phrases, prefixes, filtered
+queries and a term that matches almost everything.
+
+Usage: python benchmarks/history_search.py [--items 100000] [--repeats 5]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from marketing_engine import TARGET_PERSONAS, HistorySearchIndex  # noqa: E402
+
+TERMS = (
+    "immigration case management h-1b uscis petition deadline client portal spreadsheet workflow "
+    "attorney firm paralegal reporting compliance document automation visa green card employer "
+    "onboarding billing outlook dashboard migration inszoom docketwise lawlogix"
+).split()
+PLATFORMS = ["LinkedIn", "Twitter/X", "YouTube", "Instagram", "Website/Blog", "TikTok"]
+TYPES = ["Social Media Post", "Video Script", "SEO Content", "Full Video Package"]
+QUERIES = [
+    ("rare term", "w15000", {}),
+    ("two terms", "inszoom migration", {}),
+    ("prefix", "docket", {}),
+    ("filtered", "inszoom migration", {"platforms": ["LinkedIn"], "types": ["Video Script"]}),
+    ("no match", "zzzz", {}),
+    ("matches most items", "immigration", {}),
+]
+
+
+def synthetic_history(count, seed=1):
+    rng = random.Random(seed)
+    vocabulary = TERMS + [f"w{n}" for n in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    personas = list(TARGET_PERSONAS)
+
+    def text(words):
+        return " ".join(rng.choices(vocabulary, weights=weights, k=words))
+
+    return [{
+        "type": rng.choice(TYPES),
+        "platform": rng.choice(PLATFORMS),
+        "topic": text(8),
+        "persona": rng.choice(personas),
+        "goal": "Generate Leads",
+        "content": text(200),
+        "timestamp": "2026-01-01 09:00"
+    } for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100000, help="synthetic history items")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per query")
+    args = parser.parse_args()
+
+    history = synthetic_history(args.items)
+    index = HistorySearchIndex()
+    started = time.perf_counter()
+    index.sync(history)
+    print(f"Indexed {args.items:,} items in {time.perf_counter() - started:.1f}s")
+
+    history.append(dict(history[0], topic="LinkedIn post about INSZoom migration"))
+    started = time.perf_counter()
+    index.sync(history)
+    print(f"Incremental insert of 1 item: {(time.perf_counter() - started) * 1000:.2f}ms")
+
+    print(f"  {'Query':<22} {'matches':>9} {'median':>10}")
+    for name, text, filters in QUERIES:
+        seconds = []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            found = index.search(text, **filters)
+            seconds.append(time.perf_counter() - started)
+        print(f"  {name:<22} {found['total']:>9,} {statistics.median(seconds) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
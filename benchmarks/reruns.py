@@ -0,0 +1,94 @@
+"""
+Rerun benchmark: multipage layout vs the old single-script layout
+
+Every widget interaction reruns the script. With st.navigation only the selected
+page's script runs; the single-script layout ran every tab on every rerun. This
+times warm reruns of each page in Streamlit's AppTest harness and compares them
+with warm reruns of the single-script app taken from git (the commit before the
+multipage split, or --baseline REF).
+
+Usage: python benchmarks/reruns.py [--reruns 20] [--baseline REF]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = "lawtrax_marketing_platform.py"
+PAGES = [
+    "app_pages/overview.py",
+    "app_pages/social.py",
+    "app_pages/video_scripts.py",
+    "app_pages/video_generation.py",
+    "app_pages/seo.py",
+    "app_pages/knowledge_base.py",
+    "app_pages/history.py",
+]
+
+
+def default_baseline(path="marketing_engine.py"):
+    """The last commit before path existed"""
+    first = subprocess.run(
+        ["git", "rev-list", "--reverse", "HEAD", "--", path],
+        capture_output=True, text=True, check=True, cwd=ROOT
+    ).stdout.split()[0]
+    return f"{first}~1"
+
+
+def checkout(ref, target):
+    archive = subprocess.run(["git", "archive", ref], capture_output=True, check=True, cwd=ROOT).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(target)
+
+
+def time_reruns(app_test, reruns):
+    app_test.run()  # warm: imports, cached resources and the knowledge index are built here
+    seconds = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app_test.run()
+        seconds.append(time.perf_counter() - started)
+    if app_test.exception:
+        print("  script raised:", app_test.exception[0].value)
+    return seconds
+
+
+def summary(seconds):
+    ordered = sorted(seconds)
+    return statistics.median(ordered), ordered[max(0, round(len(ordered) * 0.95) - 1)]
+
+
+def main():
+    from streamlit.testing.v1 import AppTest
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=20, help="timed reruns per page")
+    parser.add_argument("--baseline", help="git ref of the single-script layout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as baseline_dir:
+        ref = args.baseline or default_baseline()
+        checkout(ref, baseline_dir)
+        single_p50, single_p95 = summary(time_reruns(
+            AppTest.from_file(str(Path(baseline_dir) / APP), default_timeout=120), args.reruns
+        ))
+
+    print(f"Warm rerun time, {args.reruns} reruns each (single-script baseline: {ref})")
+    print(f"  {'Page':<34} {'p50':>9} {'p95':>9} {'vs single script':>18}")
+    print(f"  {'single script (all tabs)':<34} {single_p50 * 1000:7.1f}ms {single_p95 * 1000:7.1f}ms")
+    for page in PAGES:
+        app_test = AppTest.from_file(str(ROOT / APP), default_timeout=120)
+        app_test.switch_page(page)
+        p50, p95 = summary(time_reruns(app_test, args.reruns))
+        print(f"  {page:<34} {p50 * 1000:7.1f}ms {p95 * 1000:7.1f}ms {single_p50 / p50:16.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Startup benchmark for the Marketing Command Center
+
+Measures, in fresh interpreters so nothing is already imported:
+  * import time by top-level module (python -X importtime of the app's imports)
+  * time to first render (one full script run through Streamlit's AppTest harness)
+  * whether the Anthropic SDK was imported before any API call
+
+Usage: python benchmarks/startup.py [--runs 5] [--top 15]
+"""
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+APP = Path(__file__).resolve().parent.parent / "lawtrax_marketing_platform.py"
+
+FIRST_RENDER_SNIPPET = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+app = AppTest.from_file({app!r}, default_timeout=120).run()
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "exceptions": [str(e.value) for e in app.exception],
+    "anthropic_imported": "anthropic" in sys.modules
+}}))
+"""
+
+
+def app_imports():
+    """Top-level import statements of the app, as source lines"""
+    tree = ast.parse(APP.read_text(encoding="utf-8"))
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def import_times(imports):
+    """Cumulative import microseconds per top-level package from one -X importtime run"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "\n".join(imports)],
+        capture_output=True, text=True, check=True, cwd=APP.parent
+    )
+    totals = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that pulled them in
+        name = name[1:]
+        if not name.startswith(" "):
+            totals[name.split(".")[0]] += int(cumulative)
+    # Interpreter startup (site, encodings) is not the app's cost
+    roots = {statement.split()[1].split(".")[0] for statement in imports}
+    return {module: micros for module, micros in totals.items() if module in roots}
+
+
+def first_render():
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_RENDER_SNIPPET.format(app=str(APP))],
+        capture_output=True, text=True, check=True, cwd=APP.parent
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="modules to list in the import table")
+    args = parser.parse_args()
+
+    imports = app_imports()
+    samples = defaultdict(list)
+    for _ in range(args.runs):
+        for module, micros in import_times(imports).items():
+            samples[module].append(micros / 1000)
+    rows = sorted(((statistics.median(ms), module) for module, ms in samples.items()), reverse=True)
+    print(f"Import time by top-level module (median of {args.runs} runs)")
+    for ms, module in rows[:args.top]:
+        print(f"  {module:<28} {ms:9.1f} ms")
+    print(f"  {'total':<28} {sum(ms for ms, _ in rows):9.1f} ms")
+    if "anthropic" in samples:
+        print("  anthropic imported at startup: yes")
+    else:
+        deferred = statistics.median(import_times(["import anthropic"])["anthropic"] / 1000 for _ in range(args.runs))
+        print(f"  anthropic imported at startup: no ({deferred:.1f} ms deferred to the first API call)")
+
+    renders = [first_render() for _ in range(args.runs)]
+    errors = [error for render in renders for error in render["exceptions"]]
+    seconds = sorted(render["seconds"] for render in renders)
+    print(f"\nTime to first render (median of {args.runs} fresh processes): {statistics.median(seconds):.2f}s "
+          f"(min {seconds[0]:.2f}s, max {seconds[-1]:.2f}s)")
+    print("  anthropic in sys.modules after first render:",
+          "yes" if any(render["anthropic_imported"] for render in renders) else "no")
+    if errors:
+        print("  script raised:", errors[0])
+
+
+if __name__ == "__main__":
+    main()
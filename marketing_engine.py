@@ -0,0 +1,4097 @@
+"""
+Marketing engine shared by every page of the Marketing Command Center
+Company knowledge, prompt builders, model calls, caches, telemetry and the video/script tooling
+"""
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+import csv
+import email.utils
+import hashlib
+import hmac
+import io
+import itertools
+import json
+import math
+import random
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+import zipfile
+import zlib
+
+ASSETS_DIR = Path(__file__).parent / "assets"
+OVERVIEW_SECTION_PATTERN = re.compile(r"<!-- section: (\w+) -->\n")
+
+@st.cache_resource(show_spinner=False)
+def app_styles():
+    """Stylesheet from assets/styles.css, comments and indentation stripped, read once per process"""
+    css = (ASSETS_DIR / "styles.css").read_text(encoding="utf-8")
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s*\n\s*", "\n", css).strip()
+    return f"<style>\n{css}\n</style>"
+
+@st.cache_resource(show_spinner=False)
+def overview_sections():
+    """Overview tab HTML blocks from assets/overview.html keyed by section name, read once per process"""
+    parts = OVERVIEW_SECTION_PATTERN.split((ASSETS_DIR / "overview.html").read_text(encoding="utf-8"))
+    return {name: html.strip() for name, html in zip(parts[1::2], parts[2::2])}
+
+# Company Knowledge Base (Default: LawTrax)
+LAWTRAX_KNOWLEDGE = """
+COMPANY: LawTrax
+TAGLINE: "Immigration Software for the Modern Attorney"
+WEBSITE: lawtrax.com
+
+CORE VALUE PROPOSITION:
+LawTrax is a secure, cloud-based immigration case management platform that empowers attorney firms to manage leads, clients, and cases effortlessly. The platform enables customizable workflows, seamless carrier label generation, and integrated invoice management.
+
+KEY FEATURES:
+1. Case Management - Workflow-based platform with multiple stages based on case type, enabling end-to-end management, tracking, and stakeholder notifications
+2. Customer Management - Secure cloud portal for companies/beneficiaries to manage information and initiate cases with single-click automation
+3. Lead Management - Built-in CRM for converting prospects to customers with lead categorization and tracking
+4. Document Management - Cloud-based, indexable, searchable system with three stages: identification, generation, and delivery
+5. Dashboard Reporting - Real-time business-driven dashboards with drill-down capabilities and configurable KPIs
+6. PDF Generation - Auto-generates USCIS/DoL formatted documents based on case type rules
+7. Client Portal - Secure document uploads and case status tracking with automated notifications
+8. Integration Capabilities - Outlook calendar, QuickBooks billing, webhooks, and RESTful APIs
+
+SECURITY & COMPLIANCE:
+- Multi-tenant architecture on Google Cloud Platform with Firebase
+- SOC 2 Type II certification (in pipeline)
+- GDPR compliance (in pipeline)
+- HIPAA compliant architecture
+- End-to-end encryption for data at rest and in transit
+- Role-based access control with SSO support
+- California Consumer Privacy Act (CCPA) compliance
+- PCI compliance with digital tokens for authentication
+
+TECHNICAL SPECIFICATIONS:
+- Cloud-hosted on Google Cloud Platform
+- Multi-tenant SaaS with broker patterns for tenant isolation
+- RESTful APIs with no additional costs
+- Real-time reporting (no batch delays)
+- 99.9% uptime guarantee on Google infrastructure
+- Automatic OCR capabilities
+- Real-time form updates from USCIS
+
+KEY DIFFERENTIATORS:
+1. No additional API costs (unlike competitors)
+2. True real-time reporting without 24-hour batch delays
+3. Guaranteed uptime on Google's enterprise infrastructure
+4. Built-in PDF generator for USCIS/DoL formatted submissions
+5. Comprehensive audit trail for all document actions
+6. Customizable email templates and notification engine
+
+CLIENT SUCCESS METRICS:
+- Clients report 30%+ revenue increase
+- Reduced administrative burden
+- Faster case completion through digital automation
+- Increased capacity for new clients
+
+TARGET MARKET:
+- Immigration law firms (solo to enterprise)
+- Corporate immigration departments
+- Global mobility teams
+- Legal service providers
+
+CONTACT:
+- Email: info@lawtrax.com
+- Phone: 972-200-1030
+- Address: 17400 Dallas Parkway, Suite 121, Dallas, Texas 75287
+"""
+
+# Platform-specific content guidelines
+PLATFORM_GUIDELINES = {
+    "LinkedIn": {
+        "max_chars": 3000,
+        "hashtags": 5,
+        "tone": "Professional, thought leadership focused, storytelling",
+        "format": "Long-form posts, carousel documents, polls, articles",
+        "best_practices": [
+            "Start with a HOOK - first line must stop the scroll (use pattern interrupts, bold claims, or curiosity gaps)",
+            "One sentence per line - creates white space and readability",
+            "Use line breaks after EVERY sentence for mobile readability",
+            "Keep paragraphs to 1-2 lines maximum",
+            "Include a 'pattern interrupt' halfway through (→, •, ↓, or emoji)",
+            "Tell a story or share a personal insight - LinkedIn rewards authenticity",
+            "End with a question or call-to-engagement to boost comments",
+            "Add 3-5 relevant hashtags at the VERY END (not mixed in)",
+            "Use 'I' statements and first-person narrative",
+            "Best posting times: Tue-Thu, 8-10am or 12-1pm user's timezone",
+            "Optimal length: 1,200-1,500 characters for maximum engagement",
+            "NO external links in post body (kills reach) - put in comments",
+            "Use emojis sparingly (1-3 max) for visual breaks"
+        ],
+        "content_types": ["Thought leadership", "Industry insights", "Case studies", "Company updates", "Employee spotlights", "How-to guides", "Hot takes", "Lessons learned", "Behind-the-scenes"],
+        "viral_hooks": [
+            "I spent [X years/hours] doing [thing]. Here's what I learned:",
+            "Stop doing [common practice]. Do this instead:",
+            "[Controversial opinion]. Here's why:",
+            "Most [persona] get this wrong about [topic].",
+            "The biggest mistake I see [persona] make:",
+            "[Number] [things] that will [benefit] in [timeframe]:",
+            "Unpopular opinion: [statement]",
+            "I was wrong about [thing]. Here's the truth:",
+            "This changed everything for our [clients/business]:",
+            "[Persona], you need to hear this:"
+        ]
+    },
+    "Instagram": {
+        "max_chars": 2200,
+        "hashtags": 20,
+        "tone": "Visual, engaging, authentic",
+        "format": "Carousel posts, Reels, Stories, Feed posts",
+        "best_practices": [
+            "Lead with value in the first line",
+            "Use emojis strategically",
+            "Include save-worthy content",
+            "Create shareable graphics",
+            "Use Instagram-specific features (polls, questions)",
+            "Post 1-2 times daily for optimal reach"
+        ],
+        "content_types": ["Educational carousels", "Behind-the-scenes", "Client testimonials", "Quick tips", "Infographics", "Day-in-the-life"]
+    },
+    "TikTok": {
+        "max_chars": 300,
+        "hashtags": 5,
+        "tone": "Casual, entertaining, educational",
+        "format": "Short-form video (15-60 seconds optimal)",
+        "best_practices": [
+            "Hook viewers in the first 3 seconds",
+            "Use trending sounds and effects",
+            "Keep it authentic and relatable",
+            "Add captions for accessibility",
+            "End with a question or CTA",
+            "Post 1-3 times daily"
+        ],
+        "content_types": ["Quick tips", "Myth-busting", "Day-in-the-life", "Trending challenges", "Educational content", "Q&A responses"]
+    },
+    "YouTube": {
+        "max_chars": 5000,
+        "hashtags": 3,
+        "tone": "Educational, authoritative, engaging",
+        "format": "Long-form videos, Shorts, tutorials",
+        "best_practices": [
+            "Optimize title with keywords",
+            "Create compelling thumbnails",
+            "Include timestamps for long videos",
+            "Add end screens and cards",
+            "Write detailed descriptions with keywords",
+            "Engage with comments"
+        ],
+        "content_types": ["Tutorials", "Case studies", "Webinars", "Product demos", "Expert interviews", "Industry updates"]
+    },
+    "Twitter/X": {
+        "max_chars": 280,
+        "hashtags": 2,
+        "tone": "Conversational, timely, engaging",
+        "format": "Threads, single tweets, polls",
+        "best_practices": [
+            "Keep tweets concise and punchy",
+            "Use threads for longer content",
+            "Engage with trending topics",
+            "Reply to relevant conversations",
+            "Use polls for engagement",
+            "Post multiple times daily"
+        ],
+        "content_types": ["Quick insights", "Industry news commentary", "Threads", "Polls", "Quotes", "Live event coverage"]
+    },
+    "Facebook": {
+        "max_chars": 63206,
+        "hashtags": 3,
+        "tone": "Community-focused, informative, personable",
+        "format": "Posts, videos, events, groups",
+        "best_practices": [
+            "Create shareable content",
+            "Use Facebook Live for engagement",
+            "Build and engage with groups",
+            "Post native video content",
+            "Use Facebook Events for webinars",
+            "Respond to comments promptly"
+        ],
+        "content_types": ["Community updates", "Live videos", "Event promotions", "Educational posts", "Client stories", "Behind-the-scenes"]
+    }
+}
+
+# Content types and templates - Marketing focused for LawTrax
+CONTENT_TYPES = {
+    "Marketing - Product Launch": "Announce new features, updates, or capabilities to generate excitement and leads",
+    "Marketing - Lead Generation": "Create compelling content designed to capture leads and drive demo requests",
+    "Marketing - Brand Awareness": "Build recognition and trust for LawTrax in the immigration law market",
+    "Marketing - Competitive Positioning": "Highlight advantages over competitors like INSZoom, Docketwise, LawLogix",
+    "Marketing - Case Study/ROI": "Share client success stories with specific metrics (30%+ revenue increase)",
+    "Marketing - Demo/Trial Promotion": "Drive sign-ups for demos and free trials",
+    "Educational Post": "Create informative content about immigration processes and software benefits",
+    "Success Story": "Share client success stories and testimonials that demonstrate value",
+    "Product Feature Spotlight": "Highlight specific features like real-time reporting, PDF generation, API access",
+    "Industry News Commentary": "Provide expert commentary on USCIS updates, immigration law changes",
+    "Tips & Best Practices": "Share actionable tips for immigration professionals",
+    "Behind-the-Scenes": "Show company culture, team, and development process",
+    "Comparison Post": "Compare LawTrax vs competitors (INSZoom, Docketwise, CampLegal)",
+    "FAQ Content": "Address common questions about immigration case management software",
+    "Announcement": "Share company news, updates, or launches",
+    "Engagement Post": "Create interactive content to boost engagement",
+    "Thought Leadership": "Position LawTrax as industry experts in immigration technology",
+    "Pain Point Solution": "Address specific challenges law firms face and how LawTrax solves them"
+}
+
+# Target Personas for Immigration Law Marketing
+TARGET_PERSONAS = {
+    "Managing Partner - Large Law Firm": {
+        "description": "Decision maker at firms with 50+ attorneys, focuses on ROI, scalability, enterprise features",
+        "pain_points": ["Scalability concerns", "Integration with existing systems", "Compliance requirements", "Staff productivity"],
+        "motivators": ["Revenue growth", "Competitive advantage", "Risk mitigation", "Operational efficiency"],
+        "tone": "Executive, data-driven, ROI-focused",
+        "content_focus": "Enterprise features, security, compliance, client success metrics"
+    },
+    "Immigration Practice Lead": {
+        "description": "Heads immigration department, concerned with team efficiency and case outcomes",
+        "pain_points": ["Case tracking complexity", "Document management chaos", "Deadline management", "Team coordination"],
+        "motivators": ["Streamlined workflows", "Better client service", "Reduced errors", "Team productivity"],
+        "tone": "Professional, solution-oriented, practical",
+        "content_focus": "Workflow automation, case management, reporting capabilities"
+    },
+    "Solo Immigration Attorney": {
+        "description": "Independent practitioner handling all aspects, needs affordable all-in-one solution",
+        "pain_points": ["Limited time", "Wearing multiple hats", "Budget constraints", "Keeping up with forms"],
+        "motivators": ["Time savings", "Affordable pricing", "Easy to use", "All-in-one solution"],
+        "tone": "Relatable, practical, cost-conscious",
+        "content_focus": "Ease of use, time savings, affordable pricing, USCIS form automation"
+    },
+    "Paralegal/Legal Assistant": {
+        "description": "Day-to-day user handling case preparation, document collection, client communication",
+        "pain_points": ["Manual data entry", "Chasing documents", "Status update requests", "Form errors"],
+        "motivators": ["Automation", "Client portal", "Document management", "Error reduction"],
+        "tone": "Practical, feature-focused, user-friendly",
+        "content_focus": "Daily workflow features, client portal, document management, automation"
+    },
+    "Corporate Immigration Manager": {
+        "description": "In-house immigration lead at corporations managing employee visas",
+        "pain_points": ["Vendor management", "Compliance tracking", "Reporting to leadership", "Employee experience"],
+        "motivators": ["Visibility", "Compliance", "Employee satisfaction", "Cost control"],
+        "tone": "Corporate, compliance-focused, metrics-driven",
+        "content_focus": "Employer portal, reporting, compliance tracking, API integrations"
+    },
+    "Law Firm IT/Operations": {
+        "description": "Technical decision maker concerned with security, integrations, and implementation",
+        "pain_points": ["Security concerns", "Integration complexity", "Data migration", "User adoption"],
+        "motivators": ["Security certifications", "Easy integration", "Reliable uptime", "Support quality"],
+        "tone": "Technical, security-focused, detail-oriented",
+        "content_focus": "Security features, API capabilities, cloud infrastructure, compliance certifications"
+    }
+}
+
+# Knowledge injection settings - only the most relevant company chunks go into each prompt
+KNOWLEDGE_TOP_K = 6
+KNOWLEDGE_TOKEN_BUDGET = 400
+# Sections that identify the company and are always included
+KNOWLEDGE_PINNED_SECTIONS = ("COMPANY", "TAGLINE", "WEBSITE", "CORE VALUE PROPOSITION", "DESCRIPTION")
+# Sections with more list items than this are split into one chunk per item
+KNOWLEDGE_SPLIT_THRESHOLD = 4
+
+KNOWLEDGE_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "its",
+    "of", "on", "or", "our", "that", "the", "this", "to", "with", "your", "you", "we", "why", "what",
+    "none", "based", "all"
+}
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    """Approximate token count (~4 characters per token for English prose)"""
+    if not text:
+        return 0
+    return max(1, chars_to_tokens(len(text)))
+
+def chars_to_tokens(char_count):
+    """Approximate tokens for a given number of characters"""
+    return math.ceil(char_count / CHARS_PER_TOKEN)
+
+def tokenize_for_search(text):
+    """Lowercase word tokens with stopwords removed, used by the local search indexes"""
+    words = re.findall(r"[a-z0-9][a-z0-9\-]*", (text or "").lower())
+    # Light plural folding so "forms" matches "form"
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+            for w in words if w not in KNOWLEDGE_STOPWORDS and len(w) > 1]
+
+def chunk_company_knowledge(knowledge_text):
+    """Split a company profile into headed sections, breaking long lists into one chunk per item"""
+    sections = []
+    current = None
+    for line in knowledge_text.strip().splitlines():
+        header = re.match(r"^([A-Z][A-Z0-9 &/()\-]*):\s*(.*)$", line.strip())
+        if header:
+            current = {"heading": header.group(1).strip(), "inline": header.group(2).strip(), "lines": []}
+            sections.append(current)
+        elif line.strip():
+            if current is None:
+                current = {"heading": "", "inline": "", "lines": []}
+                sections.append(current)
+            current["lines"].append(line.strip())
+
+    chunks = []
+    for order, section in enumerate(sections):
+        pinned = section["heading"] in KNOWLEDGE_PINNED_SECTIONS or not section["heading"]
+        if not pinned and len(section["lines"]) > KNOWLEDGE_SPLIT_THRESHOLD:
+            bodies = [[item] for item in section["lines"]]
+        else:
+            bodies = [section["lines"]]
+        for body in bodies:
+            chunks.append({
+                "heading": section["heading"],
+                "inline": section["inline"],
+                "lines": body,
+                "order": order,
+                "pinned": pinned
+            })
+    return chunks
+
+def render_knowledge_chunks(chunks):
+    """Reassemble selected chunks in their original section order"""
+    grouped = {}
+    for chunk in sorted(chunks, key=lambda c: c["order"]):
+        grouped.setdefault(chunk["order"], {"heading": chunk["heading"], "inline": chunk["inline"], "lines": []})
+        grouped[chunk["order"]]["lines"].extend(chunk["lines"])
+
+    blocks = []
+    for section in grouped.values():
+        if section["heading"]:
+            first_line = f"{section['heading']}: {section['inline']}".rstrip()
+            blocks.append("\n".join([first_line] + section["lines"]))
+        else:
+            blocks.append("\n".join(section["lines"]))
+    return "\n\n".join(blocks)
+
+@st.cache_resource(show_spinner=False)
+def build_knowledge_index(knowledge_text):
+    """Build a BM25 index over the chunks of a company profile (cached per profile text)"""
+    chunks = chunk_company_knowledge(knowledge_text)
+    documents = [tokenize_for_search(f"{c['heading']} {c['inline']} {' '.join(c['lines'])}") for c in chunks]
+    doc_freq = Counter()
+    for doc in documents:
+        doc_freq.update(set(doc))
+    total_docs = max(len(documents), 1)
+    return {
+        "chunks": chunks,
+        "term_freqs": [Counter(doc) for doc in documents],
+        "doc_lengths": [len(doc) for doc in documents],
+        "avg_length": (sum(len(doc) for doc in documents) / total_docs) or 1,
+        "idf": {term: math.log(1 + (total_docs - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()},
+        "full_tokens": estimate_tokens(knowledge_text)
+    }
+
+def score_knowledge_chunks(index, query, k1=1.5, b=0.75):
+    """BM25 score of every chunk in the index against the query"""
+    query_terms = tokenize_for_search(query)
+    scores = []
+    for term_freq, length in zip(index["term_freqs"], index["doc_lengths"]):
+        score = 0.0
+        for term in query_terms:
+            tf = term_freq.get(term, 0)
+            if tf:
+                norm = tf + k1 * (1 - b + b * length / index["avg_length"])
+                score += index["idf"].get(term, 0) * tf * (k1 + 1) / norm
+        scores.append(score)
+    return scores
+
+def select_company_context(knowledge_text, query, top_k=None, token_budget=None):
+    """Pick the pinned chunks plus the top-k relevant chunks that fit the token budget.
+
+    Returns the context string to inject into the prompt and a stats dict with
+    the input tokens saved compared to sending the whole profile.
+    """
+    top_k = top_k if top_k is not None else st.session_state.get("knowledge_top_k", KNOWLEDGE_TOP_K)
+    token_budget = token_budget if token_budget is not None else st.session_state.get("knowledge_token_budget", KNOWLEDGE_TOKEN_BUDGET)
+
+    index = build_knowledge_index(knowledge_text)
+    chunks = index["chunks"]
+    selected = [c for c in chunks if c["pinned"]]
+    used_tokens = estimate_tokens(render_knowledge_chunks(selected))
+
+    scores = score_knowledge_chunks(index, query)
+    ranked = sorted(
+        (i for i, c in enumerate(chunks) if not c["pinned"] and scores[i] > 0),
+        key=lambda i: scores[i],
+        reverse=True
+    )
+    for i in ranked[:top_k]:
+        candidate = selected + [chunks[i]]
+        candidate_tokens = estimate_tokens(render_knowledge_chunks(candidate))
+        if candidate_tokens > token_budget:
+            continue
+        selected = candidate
+        used_tokens = candidate_tokens
+
+    context = render_knowledge_chunks(selected)
+    return context, {
+        "chunks_used": len(selected),
+        "chunks_total": len(chunks),
+        "full_tokens": index["full_tokens"],
+        "used_tokens": used_tokens,
+        "saved_tokens": max(index["full_tokens"] - used_tokens, 0)
+    }
+
+def show_knowledge_savings(stats):
+    """Report how much of the company profile was injected into the prompt"""
+    st.caption(
+        f"🧠 Company knowledge: {stats['chunks_used']} of {stats['chunks_total']} chunks injected "
+        f"(~{stats['used_tokens']} tokens) · saved ~{stats['saved_tokens']} input tokens this call"
+    )
+
+# Model tiers - costs are USD per million tokens
+MODEL_TIERS = {
+    "fast": {
+        "label": "⚡ Fast",
+        "model": "claude-3-5-haiku-20241022",
+        "input_cost": 0.80,
+        "output_cost": 4.00,
+        "min_cache_tokens": 2048
+    },
+    "balanced": {
+        "label": "⚖️ Balanced",
+        "model": "claude-sonnet-4-20250514",
+        "input_cost": 3.00,
+        "output_cost": 15.00,
+        "min_cache_tokens": 1024
+    },
+    "premium": {
+        "label": "💎 Premium",
+        "model": "claude-opus-4-20250514",
+        "input_cost": 15.00,
+        "output_cost": 75.00,
+        "min_cache_tokens": 1024
+    }
+}
+DEFAULT_MODEL_TIER = "balanced"
+
+# Routing table - first matching rule wins. "max_length" is the expected output length in characters.
+MODEL_ROUTES = [
+    {"tab": "social", "max_length": 600, "tier": "fast"},               # Tweets, TikTok captions
+    {"tab": "video_generation", "tier": "fast"},                       # HeyGen/Runway/Pika/export prompt packages
+    {"tab": "video_scripts", "max_length": 1000, "tier": "fast"},      # 15-30 second hooks and ads
+    {"tab": "social", "tier": "balanced"},
+    {"tab": "video_scripts", "tier": "balanced"},
+    {"tab": "seo", "tier": "balanced"}
+]
+
+def route_model_tier(tab, platform=None, content_length=None, override=None):
+    """Pick the model tier for a request from the routing table (or the user's override)"""
+    if override in MODEL_TIERS:
+        return override
+    for rule in MODEL_ROUTES:
+        if rule["tab"] != tab:
+            continue
+        if "platforms" in rule and platform not in rule["platforms"]:
+            continue
+        if "max_length" in rule and (content_length is None or content_length > rule["max_length"]):
+            continue
+        return rule["tier"]
+    return DEFAULT_MODEL_TIER
+
+def duration_to_seconds(duration):
+    """Upper bound in seconds of a duration label like "2-3 minutes (Deep Dive)" """
+    match = re.match(r"\s*(?:\d+-)?(\d+)\+?\s*(second|minute)", duration or "")
+    if not match:
+        return None
+    value = int(match.group(1))
+    return value * 60 if match.group(2) == "minute" else value
+
+# Spoken script length: ~150 words per minute at ~6 characters per word
+SPOKEN_CHARS_PER_SECOND = 15
+
+# Output budget sizing - replaces the old hard-coded max_tokens=4096
+BASELINE_MAX_OUTPUT_TOKENS = 4096
+MIN_OUTPUT_TOKENS = 400
+MAX_OUTPUT_TOKENS = 8192
+OUTPUT_SAFETY_MARGIN = 1.25
+TOKENS_PER_WORD = 1.35
+# Social bodies are capped here even when the platform allows more (Facebook allows 63K characters)
+SOCIAL_BODY_CHAR_CAP = 3000
+# Extra tokens for the non-body sections each output format asks for
+OUTPUT_SECTION_OVERHEAD = {
+    "social": 450,
+    "video_script": 600,
+    "video_package": 1800,
+    "seo": 900,
+    "variants": 100,
+    "trim": 150
+}
+# Trailing sections we don't use - generation stops as soon as the model starts one
+OUTPUT_STOP_SEQUENCES = {
+    "linkedin": ["**📊 EXPECTED PERFORMANCE"],
+    "social": ["**📈 SUCCESS METRICS"],
+    "video_package": ["## 📈 SUCCESS METRICS", "## 🔄 REPURPOSING IDEAS"]
+}
+
+def size_output_budget(content_tokens, task):
+    """Output token budget: expected body tokens plus safety margin plus section overhead"""
+    budget = math.ceil(content_tokens * OUTPUT_SAFETY_MARGIN) + OUTPUT_SECTION_OVERHEAD.get(task, 0)
+    return max(MIN_OUTPUT_TOKENS, min(budget, MAX_OUTPUT_TOKENS))
+
+def social_output_budget(platform):
+    """Budget from the platform's character limit"""
+    max_chars = PLATFORM_GUIDELINES.get(platform, PLATFORM_GUIDELINES["LinkedIn"])["max_chars"]
+    return size_output_budget(chars_to_tokens(min(max_chars, SOCIAL_BODY_CHAR_CAP)), "social")
+
+def video_output_budget(duration, full_package=False):
+    """Budget from the selected duration; cue lines roughly double the spoken text"""
+    seconds = duration_to_seconds(duration) or 120
+    spoken_tokens = chars_to_tokens(seconds * SPOKEN_CHARS_PER_SECOND)
+    return size_output_budget(spoken_tokens * 2, "video_package" if full_package else "video_script")
+
+def seo_output_budget(target_word_count):
+    """Budget from the SEO target word count"""
+    return size_output_budget(target_word_count * TOKENS_PER_WORD, "seo")
+
+def output_budget_report():
+    """Output budgets across every platform, duration and word count vs. the old fixed 4096"""
+    rows = [{"Request": f"Social - {p}", "Budget": social_output_budget(p)} for p in PLATFORM_GUIDELINES]
+    for duration in ["15 seconds", "30 seconds", "60 seconds", "90 seconds", "2-3 minutes", "5-7 minutes", "10+ minutes"]:
+        rows.append({"Request": f"Video script - {duration}", "Budget": video_output_budget(duration)})
+        rows.append({"Request": f"Video package - {duration}", "Budget": video_output_budget(duration, True)})
+    for words in [500, 750, 1000, 1500, 2000, 2500, 3000, 4000, 5000]:
+        rows.append({"Request": f"SEO - {words} words", "Budget": seo_output_budget(words)})
+    rows.append({"Request": "Video generation creative extras", "Budget": CREATIVE_EXTRAS_MAX_TOKENS})
+    for row in rows:
+        row["vs 4096"] = row["Budget"] - BASELINE_MAX_OUTPUT_TOKENS
+    return rows
+
+def model_tier_selector(key):
+    """Per-request model tier override; returns None when routing should decide"""
+    choice = st.selectbox(
+        "🤖 Model Tier",
+        ["Auto (routed)"] + list(MODEL_TIERS.keys()),
+        format_func=lambda t: t if t not in MODEL_TIERS else f"{MODEL_TIERS[t]['label']} - {MODEL_TIERS[t]['model']}",
+        key=key,
+        help="Auto picks a faster, cheaper model for short posts and prompt packages"
+    )
+    return None if choice not in MODEL_TIERS else choice
+
+def form_fields(form):
+    """Current values of a generator form's widgets (keys are "<form>:<field>")"""
+    return {key: value for key, value in st.session_state.items() if isinstance(key, str) and key.startswith(f"{form}:")}
+
+def restore_form_draft(form, defaults=None):
+    """Put a form's saved inputs back into widget state; Streamlit drops it when the page isn't shown"""
+    draft = st.session_state.get("form_drafts", {}).get(form) or defaults or {}
+    for key, value in draft.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+
+def save_form_draft(form, submitted):
+    """Keep the form's inputs as its draft; on submit, count the fields changed since the last one
+
+    Outside a form every changed field was a rerun of its own, so the count is the reruns the form saved.
+    """
+    fields = form_fields(form)
+    drafts = st.session_state.setdefault("form_drafts", {})
+    previous = drafts.get(form)
+    if submitted and previous is not None:
+        telemetry = get_telemetry()
+        telemetry.increment("form_submits")
+        telemetry.increment("form_field_changes", sum(1 for key, value in fields.items() if previous.get(key) != value))
+    drafts[form] = fields
+    return submitted
+
+class Telemetry:
+    """Process-wide record of API calls and events, shared by all sessions"""
+
+    def __init__(self, max_calls=2000, max_events=500):
+        self._lock = threading.Lock()
+        self.calls = deque(maxlen=max_calls)
+        self.events = deque(maxlen=max_events)
+        self.counters = Counter()
+
+    def record_call(self, **call):
+        call.setdefault("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        with self._lock:
+            self.calls.append(call)
+
+    def record_event(self, kind, **fields):
+        with self._lock:
+            self.events.append({"kind": kind, "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **fields})
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def counter_snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def events_of(self, kind):
+        with self._lock:
+            return [event for event in self.events if event["kind"] == kind]
+
+    def tier_summary(self):
+        """Per-tier call count, latency percentiles, tokens and cost"""
+        with self._lock:
+            calls = list(self.calls)
+        rows = []
+        for tier in MODEL_TIERS:
+            tier_calls = [c for c in calls if c.get("tier") == tier]
+            if not tier_calls:
+                continue
+            latencies = sorted(c["latency"] for c in tier_calls)
+            rows.append({
+                "Tier": tier,
+                "Calls": len(tier_calls),
+                "Errors": sum(1 for c in tier_calls if c.get("status") not in ("ok", "stopped")),
+                "Stopped": sum(1 for c in tier_calls if c.get("status") == "stopped"),
+                "p50 latency (s)": round(percentile(latencies, 50), 2),
+                "p95 latency (s)": round(percentile(latencies, 95), 2),
+                "Input tokens": sum(c.get("input_tokens", 0) for c in tier_calls),
+                "Output tokens": sum(c.get("output_tokens", 0) for c in tier_calls),
+                "Cache read tokens": sum(c.get("cache_read_tokens", 0) for c in tier_calls),
+                "Cost ($)": round(sum(c.get("cost", 0.0) for c in tier_calls), 4)
+            })
+        return rows
+
+    def hedge_summary(self):
+        """Streamed short interactive calls with hedging on vs off: latency percentiles, hedges and their cost"""
+        with self._lock:
+            calls = [c for c in self.calls if c.get("status") == "ok" and "first_token" in c]
+        rows = []
+        for hedging in (False, True):
+            group = [c for c in calls if c.get("hedging", False) == hedging]
+            if not group:
+                continue
+            latencies = sorted(c["latency"] for c in group)
+            first_tokens = sorted(c["first_token"] for c in group)
+            hedged = [c for c in group if "hedge_won" in c]
+            rows.append({
+                "Hedging": "on" if hedging else "off",
+                "Calls": len(group),
+                "p50 latency (s)": round(percentile(latencies, 50), 2),
+                "p99 latency (s)": round(percentile(latencies, 99), 2),
+                "p99 first token (s)": round(percentile(first_tokens, 99), 2),
+                "Hedged": len(hedged),
+                "Hedge won": sum(1 for c in hedged if c["hedge_won"]),
+                "Added cost ($)": round(sum(c.get("hedge_cost", 0.0) for c in hedged), 4)
+            })
+        return rows
+
+    def output_summary(self):
+        """How much of the output budget calls used, and how often they stopped early or truncated"""
+        with self._lock:
+            calls = [c for c in self.calls if c.get("status") == "ok" and c.get("max_tokens")]
+        if not calls:
+            return None
+        return {
+            "calls": len(calls),
+            "output_tokens": sum(c["output_tokens"] for c in calls),
+            "budget_tokens": sum(c["max_tokens"] for c in calls),
+            "baseline_tokens": BASELINE_MAX_OUTPUT_TOKENS * len(calls),
+            "stopped_early": sum(1 for c in calls if c.get("stop_reason") == "stop_sequence"),
+            "truncated": sum(1 for c in calls if c.get("stop_reason") == "max_tokens")
+        }
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+@st.cache_resource(show_spinner=False)
+def get_telemetry():
+    """Shared telemetry store for this server process"""
+    return Telemetry()
+
+# Prompt caching price multipliers on the input rate
+CACHE_WRITE_COST_MULTIPLIER = 1.25
+CACHE_READ_COST_MULTIPLIER = 0.10
+
+@st.cache_resource(show_spinner=False)
+def anthropic_sdk():
+    """Import the Anthropic SDK on the first API call instead of on every script run"""
+    started = time.perf_counter()
+    import anthropic
+    get_telemetry().record_event("sdk_import", seconds=time.perf_counter() - started)
+    return anthropic
+
+def call_cost(tier, input_tokens, output_tokens, cache_write_tokens=0, cache_read_tokens=0):
+    """USD cost of a call at the tier's list prices"""
+    pricing = MODEL_TIERS[tier]
+    input_units = (input_tokens + cache_write_tokens * CACHE_WRITE_COST_MULTIPLIER
+                   + cache_read_tokens * CACHE_READ_COST_MULTIPLIER)
+    return (input_units * pricing["input_cost"] + output_tokens * pricing["output_cost"]) / 1_000_000
+
+# Process-wide request scheduler - caps in-flight API calls and tokens per minute across all sessions. Waiting
+# calls are admitted by priority class, and round-robin across sessions within a class, so one user's fan-out
+# can't crowd out everyone else's single generations.
+SCHEDULER_MAX_IN_FLIGHT = 8
+SCHEDULER_TOKENS_PER_MINUTE = 400_000
+SCHEDULER_POLL_SECONDS = 0.5
+SCHEDULER_DEFAULT_CALL_SECONDS = 10.0
+# Admitted in this order: single generations, then parallel stage/provider calls, then background jobs
+REQUEST_PRIORITIES = ("interactive", "fanout", "bulk")
+_request_context = threading.local()
+
+def request_priority():
+    """Priority class for a call made from this thread (worker threads of a fan-out set their own)"""
+    return getattr(_request_context, "priority", "interactive")
+
+class RequestScheduler:
+    """Admission control for API calls: an in-flight cap, a rolling tokens-per-minute budget and a fair queue"""
+
+    def __init__(self, max_in_flight=SCHEDULER_MAX_IN_FLIGHT, tokens_per_minute=SCHEDULER_TOKENS_PER_MINUTE):
+        self._condition = threading.Condition()
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self.waiting = []
+        self.in_flight = {}
+        self.admitted = deque()  # [admitted at, tokens] of calls admitted in the last minute
+        self.turns = {}  # waiting session -> its place in the round-robin; sessions go to the back when admitted
+        self.call_seconds = deque(maxlen=50)
+        self.changes = 0  # bumped whenever a slot or the queue changes, so waiters don't miss a wake-up
+        self._ids = itertools.count()
+
+    def _prune(self, now):
+        while self.admitted and now - self.admitted[0][0] >= 60:
+            self.admitted.popleft()
+
+    def _queue(self):
+        """Waiting tickets in admission order"""
+        return sorted(self.waiting, key=lambda t: (REQUEST_PRIORITIES.index(t["priority"]), self.turns[t["session"]], t["id"]))
+
+    def _enqueue(self, ticket):
+        # A session joins the round-robin at the back; one with nothing else waiting leaves it, so turns
+        # reflect only the sessions waiting now, not lifetime usage
+        self.turns.setdefault(ticket["session"], next(self._ids))
+        self.waiting.append(ticket)
+
+    def _dequeue(self, ticket, admitted):
+        self.waiting.remove(ticket)
+        if not any(t["session"] == ticket["session"] for t in self.waiting):
+            self.turns.pop(ticket["session"], None)
+        elif admitted:
+            self.turns[ticket["session"]] = next(self._ids)
+
+    def _tokens_in_window(self):
+        return sum(tokens for _, tokens in self.admitted)
+
+    def _fits(self, ticket):
+        if len(self.in_flight) >= self.max_in_flight:
+            return False
+        # A call larger than the whole budget still runs once nothing else is using the window
+        return not self.admitted or self._tokens_in_window() + ticket["tokens"] <= self.tokens_per_minute
+
+    def _wait_estimate(self, ticket, now):
+        """(queue position, estimated seconds until admission)"""
+        position = self._queue().index(ticket) + 1
+        call_seconds = (sum(self.call_seconds) / len(self.call_seconds)) if self.call_seconds else SCHEDULER_DEFAULT_CALL_SECONDS
+        # Slots free up about max_in_flight at a time per average call
+        eta = ((position - 1) // self.max_in_flight + (len(self.in_flight) >= self.max_in_flight)) * call_seconds
+        # Tokens ahead of this call, plus its own, must fit in the window as older admissions age out of it
+        needed = self._tokens_in_window() + sum(t["tokens"] for t in self._queue()[:position]) - self.tokens_per_minute
+        for admitted_at, tokens in self.admitted:
+            if needed <= 0:
+                break
+            needed -= tokens
+            eta = max(eta, admitted_at + 60 - now)
+        return position, eta
+
+    def acquire(self, priority, tokens, session, on_wait=None, cancel=None):
+        """Block until the call may start; on_wait(position, eta_seconds) is called while it waits
+
+        Returns None if the cancel event is set before a slot frees up.
+        """
+        ticket = {"id": next(self._ids), "priority": priority, "tokens": tokens, "session": session,
+                  "enqueued": time.perf_counter()}
+        try:
+            while True:
+                with self._condition:
+                    if cancel is not None and cancel.is_set():
+                        return None
+                    if ticket not in self.waiting:
+                        self._enqueue(ticket)
+                    now = time.time()
+                    self._prune(now)
+                    if self._queue()[0] is ticket and self._fits(ticket):
+                        self._dequeue(ticket, admitted=True)
+                        ticket["window"] = [now, tokens]
+                        self.admitted.append(ticket["window"])
+                        self.in_flight[ticket["id"]] = ticket
+                        ticket["waited"] = time.perf_counter() - ticket["enqueued"]
+                        ticket["started"] = time.perf_counter()
+                        # The next ticket in line may fit too
+                        self.changes += 1
+                        self._condition.notify_all()
+                        return ticket
+                    position, eta = self._wait_estimate(ticket, now)
+                    seen = self.changes
+                if on_wait:
+                    on_wait(position, eta)  # Streamlit stops a script run by raising from here
+                with self._condition:
+                    if self.changes == seen:
+                        self._condition.wait(timeout=SCHEDULER_POLL_SECONDS)
+        finally:
+            # A cancelled or interrupted wait must not hold its place at the head of the queue
+            with self._condition:
+                if ticket in self.waiting:
+                    self._dequeue(ticket, admitted=False)
+                    self.changes += 1
+                    self._condition.notify_all()
+
+    def try_acquire(self, priority, tokens, session):
+        """A slot right now, or None - used for optional extra calls that must never queue"""
+        with self._condition:
+            self._prune(time.time())
+            ticket = {"id": next(self._ids), "priority": priority, "tokens": tokens, "session": session,
+                      "waited": 0.0, "started": time.perf_counter()}
+            if self.waiting or not self._fits(ticket):
+                return None
+            ticket["window"] = [time.time(), tokens]
+            self.admitted.append(ticket["window"])
+            self.in_flight[ticket["id"]] = ticket
+            self.changes += 1
+            return ticket
+
+    def release(self, ticket, tokens_used=None):
+        """Free the slot; tokens_used replaces the estimate counted against the budget"""
+        with self._condition:
+            self.in_flight.pop(ticket["id"], None)
+            if tokens_used is not None:
+                ticket["window"][1] = tokens_used
+            self.call_seconds.append(time.perf_counter() - ticket["started"])
+            self.changes += 1
+            self._condition.notify_all()
+
+    def snapshot(self):
+        with self._condition:
+            self._prune(time.time())
+            return {
+                "in_flight": len(self.in_flight),
+                "waiting": Counter(t["priority"] for t in self.waiting),
+                "tokens_in_window": self._tokens_in_window(),
+                "sessions_waiting": len({t["session"] for t in self.waiting})
+            }
+
+@st.cache_resource(show_spinner=False)
+def get_scheduler():
+    """Shared request scheduler for this server process"""
+    return RequestScheduler()
+
+def queued_status(position, eta):
+    """Queue position and wait estimate as shown to users"""
+    return f"position {position} in the queue, about {math.ceil(eta)}s"
+
+def schedule_call(tokens, priority=None, cancel=None):
+    """Wait for a scheduler slot, showing queue position and wait estimate
+
+    Interactive calls show a notice; calls on fan-out workers pass (position, eta) to the reporter
+    run_concurrently installed for them. Returns None instead of a ticket if cancel is set while the call waits.
+    """
+    priority = priority or request_priority()
+    ctx = get_script_run_ctx()
+    notice = []
+    # Only the script thread draws; fan-out workers report to their caller's progress rows
+    report = getattr(_request_context, "report_wait", None) if priority != "interactive" else None
+
+    def on_wait(position, eta):
+        if report:
+            report(position, eta)
+        if priority != "interactive":
+            return
+        if not notice:
+            notice.append(st.empty())
+        notice[0].info(f"⏳ Waiting for an API slot: {queued_status(position, eta)}")
+
+    ticket = get_scheduler().acquire(priority, tokens, ctx.session_id if ctx else "", on_wait, cancel)
+    if report:
+        report(None, None)
+    if notice:
+        notice[0].empty()
+    if ticket and ticket["waited"] >= SCHEDULER_POLL_SECONDS:
+        get_telemetry().record_event("scheduler_wait", priority=priority, seconds=ticket["waited"])
+    return ticket
+
+# Hedged requests - a short interactive call that has not streamed its first token by the threshold (a
+# percentile of recent time-to-first-token) gets a duplicate request; whichever streams first wins and the
+# other is closed. Duplicates only go out when the scheduler has a free slot and the hedge budget allows.
+HEDGE_PERCENTILE = 95
+HEDGE_BUDGET = 0.10               # at most this share of eligible calls may be hedged
+HEDGE_MAX_OUTPUT_TOKENS = 1024    # only short generations are eligible
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+
+class HedgePolicy:
+    """Process-wide hedging settings, and the first-token times the threshold is taken from"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.percentile = HEDGE_PERCENTILE
+        self.budget = HEDGE_BUDGET
+        self.first_token_seconds = deque(maxlen=HEDGE_WINDOW)
+        self.hedged = deque(maxlen=HEDGE_WINDOW)  # one bool per eligible call
+
+    @staticmethod
+    def eligible(priority, max_tokens):
+        """Short interactive calls are streamed and timed whether or not hedging is on"""
+        return priority == "interactive" and max_tokens <= HEDGE_MAX_OUTPUT_TOKENS
+
+    def threshold(self):
+        """Seconds to wait for a first token before hedging, or None while hedging is off or still warming up"""
+        with self._lock:
+            if not self.enabled or len(self.first_token_seconds) < HEDGE_MIN_SAMPLES:
+                return None
+            return percentile(sorted(self.first_token_seconds), self.percentile)
+
+    def within_budget(self):
+        with self._lock:
+            return sum(self.hedged) < self.budget * max(len(self.hedged), 1)
+
+    def record(self, first_token_seconds, hedged):
+        with self._lock:
+            if first_token_seconds is not None and not hedged:
+                # Hedged calls would pull the percentile down towards the threshold itself
+                self.first_token_seconds.append(first_token_seconds)
+            self.hedged.append(hedged)
+
+@st.cache_resource(show_spinner=False)
+def get_hedge_policy():
+    """Shared hedging policy for this server process"""
+    return HedgePolicy()
+
+def stream_first_wins(client, request, hedge_after=None, start_hedge=None):
+    """Open a streamed request; with hedge_after set, race a duplicate if no text has arrived by then
+
+    start_hedge() is asked before the duplicate is sent and returns a release callable, or None to skip.
+    Returns (winning stream, seconds to first token, hedge) where the stream is still open just past its
+    first text and must be read to the end (see finish_stream) and closed by the caller, and hedge is None or
+    {"won": bool, "output_tokens": tokens the losing attempt streamed before it was closed}.
+    """
+    started = time.perf_counter()
+    lock = threading.Lock()
+    decided = threading.Event()
+    state = {"winner": None, "first_token": None, "streams": {}, "errors": {}, "loser_tokens": 0}
+    threads = []
+
+    def attempt(number):
+        stream = None
+        try:
+            stream = client.messages.stream(**request).__enter__()
+            with lock:
+                state["streams"][number] = stream
+            for event in stream:
+                if event.type == "content_block_delta":
+                    break
+            with lock:
+                if state["winner"] is None:
+                    state["winner"], state["first_token"] = number, time.perf_counter() - started
+                won = state["winner"] == number
+            decided.set()
+            if not won:
+                # Lost to a request that was still connecting when the race was decided
+                stream.close()
+        except Exception as error:
+            if stream is not None:
+                stream.close()
+            with lock:
+                state["errors"][number] = error
+            decided.set()
+
+    def launch(number):
+        thread = threading.Thread(target=attempt, args=(number,), daemon=True)
+        threads.append(thread)
+        thread.start()
+
+    launch(0)
+    release_hedge = None
+    if hedge_after is not None and not decided.wait(hedge_after):
+        release_hedge = start_hedge() if start_hedge else None
+        if release_hedge:
+            launch(1)
+    try:
+        while True:
+            decided.wait()
+            with lock:
+                # An attempt failed but another is still running - keep waiting for it
+                if state["winner"] is None and len(state["errors"]) < len(threads):
+                    decided.clear()
+                    continue
+                winner = state["winner"]
+                losers = [stream for number, stream in state["streams"].items() if number != winner]
+            break
+        for stream in losers:
+            state["loser_tokens"] += stream_progress(stream)[2]
+            stream.close()
+        if winner is None:
+            raise state["errors"][0]
+        threads[winner].join()
+        if winner in state["errors"]:
+            raise state["errors"][winner]
+    finally:
+        if release_hedge:
+            release_hedge()
+    hedge = {"won": winner == 1, "output_tokens": state["loser_tokens"]} if len(threads) > 1 else None
+    return state["streams"][winner], state["first_token"], hedge
+
+# Stopping generations - every call streams, so Stop can close the connection mid-answer and free the
+# scheduler slot. Streamlit stops a script run by raising from the next element update, so the script thread
+# refreshes a progress line while it streams; fan-out workers watch the run's cancel event instead.
+STREAM_PROGRESS_SECONDS = 0.5
+
+class GenerationStopped(Exception):
+    """The script run that started this call was stopped while the call was waiting or streaming"""
+
+def new_stop_state():
+    """Shared by the calls of one generation: the cancel event, partial output, output tokens saved and
+    whether any call was cut off at its max_tokens limit"""
+    return {"cancel": threading.Event(), "partials": [], "saved_tokens": 0, "truncated": False}
+
+def stream_progress(stream):
+    """(text, input tokens, output tokens) a stream has delivered so far"""
+    try:
+        snapshot = stream.current_message_snapshot
+    except AssertionError:  # no message_start yet
+        return "", 0, 0
+    text = "".join(block.text for block in snapshot.content if block.type == "text")
+    return text, snapshot.usage.input_tokens, max(snapshot.usage.output_tokens, estimate_tokens(text) if text else 0)
+
+def finish_stream(stream, cancel, on_text=None):
+    """Read a stream to its final message, raising GenerationStopped as soon as cancel is set
+
+    on_text(text so far) is called at most every STREAM_PROGRESS_SECONDS as text arrives.
+    """
+    shown = 0.0
+    for event in stream:
+        if cancel.is_set():
+            raise GenerationStopped()
+        if on_text and event.type == "content_block_delta" and time.perf_counter() - shown >= STREAM_PROGRESS_SECONDS:
+            shown = time.perf_counter()
+            on_text(stream_progress(stream)[0])
+    return stream.get_final_message()
+
+@contextmanager
+def stoppable_generation(draft):
+    """Show a Stop button while the block generates; output cut short by Stop is kept as a history draft
+
+    draft holds the history fields (type, platform, topic, ...) of the item being generated.
+    """
+    button = st.empty()
+    button.button("⏹ Stop generating", key=f"stop_{draft['type']}", help="Cancel the request; any text written so far is saved to Content History as a draft")
+    stop = _request_context.stop = new_stop_state()
+    try:
+        yield stop
+    except BaseException as interrupt:
+        # Streamlit's rerun and stop exceptions are not Exceptions; genuine errors propagate untouched
+        if not isinstance(interrupt, Exception):
+            stop["cancel"].set()
+            partial_text = "\n\n".join(text for text in stop["partials"] if text.strip())
+            if partial_text:
+                add_to_history({**draft, "content": partial_text, "draft": True,
+                                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")})
+            st.session_state.stopped_generation = {"type": draft["type"], "draft": bool(partial_text),
+                                                   "saved_tokens": stop["saved_tokens"]}
+        raise
+    else:
+        button.empty()
+    finally:
+        _request_context.stop = None
+
+def render_stopped_notice():
+    """Confirm a stopped generation on the run that follows it"""
+    stopped = st.session_state.pop("stopped_generation", None)
+    if stopped:
+        kept = "Partial output saved to Content History as a draft" if stopped["draft"] else "Nothing had been written yet"
+        st.toast(f"⏹ {stopped['type']} stopped. {kept}; about {stopped['saved_tokens']:,} output tokens not spent.")
+
+# Circuit breakers - one per model. A breaker opens when too many recent calls to its model failed with
+# 5xx/529 or connection errors; calls then go to the tier's fallback, or get the last good response to the
+# same request. After the cool-down one probe call is let through (half-open); it closes or re-opens the breaker.
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 5
+BREAKER_ERROR_RATE = 0.5
+BREAKER_OPEN_SECONDS = 30
+FALLBACK_TIERS = {"premium": "balanced", "balanced": "fast", "fast": "balanced"}
+RECENT_RESPONSES_MAX = 200
+
+class CircuitBreakers:
+    """Process-wide breaker state per model, the fallback tier of each tier and recent good responses"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.error_rate = BREAKER_ERROR_RATE
+        self.open_seconds = BREAKER_OPEN_SECONDS
+        self.fallbacks = dict(FALLBACK_TIERS)  # tier -> fallback tier, or None for cached results only
+        self.models = {}
+        self.responses = OrderedDict()
+
+    def _breaker(self, model):
+        return self.models.setdefault(model, {"state": "closed", "outcomes": deque(maxlen=BREAKER_WINDOW),
+                                              "opened_at": 0.0, "probing": False})
+
+    def _change(self, model, breaker, state, reason):
+        previous, breaker["state"] = breaker["state"], state
+        if state == "open":
+            breaker["opened_at"] = time.time()
+        if state == "closed":
+            breaker["outcomes"].clear()
+        get_telemetry().record_event("breaker_state", model=model, previous=previous, state=state, reason=reason)
+
+    def allow(self, model):
+        """Whether a call to model may go ahead; every allowed call must be followed by record()"""
+        with self._lock:
+            breaker = self._breaker(model)
+            if breaker["state"] == "open" and time.time() - breaker["opened_at"] >= self.open_seconds:
+                self._change(model, breaker, "half_open", f"{self.open_seconds}s cool-down over")
+            if breaker["state"] == "half_open":
+                if breaker["probing"]:
+                    return False
+                breaker["probing"] = True
+            return breaker["state"] != "open"
+
+    def record(self, model, failed):
+        """Outcome of an allowed call; failed is None for a call that was stopped before it finished"""
+        with self._lock:
+            breaker = self._breaker(model)
+            if failed is None:
+                breaker["probing"] = False
+                return
+            if breaker["state"] == "half_open" and breaker["probing"]:
+                breaker["probing"] = False
+                self._change(model, breaker, "open" if failed else "closed", "probe failed" if failed else "probe succeeded")
+                return
+            breaker["outcomes"].append(failed)
+            failures = sum(breaker["outcomes"])
+            if (breaker["state"] == "closed" and len(breaker["outcomes"]) >= BREAKER_MIN_CALLS
+                    and failures >= self.error_rate * len(breaker["outcomes"])):
+                self._change(model, breaker, "open", f"{failures}/{len(breaker['outcomes'])} recent calls failed")
+
+    def route(self, tier):
+        """The tier itself, then its fallbacks in order, each tier at most once"""
+        chain = []
+        while tier and tier not in chain:
+            chain.append(tier)
+            tier = self.fallbacks.get(tier)
+        return chain
+
+    def remember(self, key, text):
+        with self._lock:
+            self.responses[key] = text
+            self.responses.move_to_end(key)
+            while len(self.responses) > RECENT_RESPONSES_MAX:
+                self.responses.popitem(last=False)
+
+    def recall(self, key):
+        with self._lock:
+            return self.responses.get(key)
+
+    def snapshot(self):
+        with self._lock:
+            return [{
+                "Model": model,
+                "State": breaker["state"],
+                "Recent calls": len(breaker["outcomes"]),
+                "Failures": sum(breaker["outcomes"]),
+                "Open for (s)": round(max(0.0, self.open_seconds - (time.time() - breaker["opened_at"])))
+                if breaker["state"] == "open" else None
+            } for model, breaker in self.models.items()]
+
+@st.cache_resource(show_spinner=False)
+def get_circuit_breakers():
+    """Shared circuit breakers for this server process"""
+    return CircuitBreakers()
+
+# Admin access - process-wide settings apply to every session, so only a session unlocked with ADMIN_PASSWORD
+# from secrets may change them; every other session sees them read-only
+def admin_password():
+    """ADMIN_PASSWORD from secrets, or "" when none is configured"""
+    try:
+        return st.secrets.get("ADMIN_PASSWORD", "")
+    except Exception:
+        return ""
+
+def is_admin():
+    """Whether this session entered the admin password (never, when no password is configured)"""
+    password = admin_password()
+    entered = st.session_state.get("admin_password_entered", "")
+    return bool(password) and hmac.compare_digest(entered.encode("utf-8"), password.encode("utf-8"))
+
+# API key pool - admins list several keys (one per team or workspace) under CLAUDE_API_KEYS in secrets. Each call
+# takes a key by weight or by least load, skipping keys that are cooling down after a rate limit or whose reported
+# remaining quota is exhausted. Rejected keys, and keys that keep failing, are removed from the pool.
+KEY_POOL = "key-pool"  # st.session_state.api_key value meaning "take a key from the pool for each call"
+KEY_POOL_STRATEGIES = {"least_loaded": "Least loaded", "weighted": "Weighted random"}
+KEY_POOL_ATTEMPTS = 3                 # pooled keys tried per call when one is rate limited or rejected
+KEY_MAX_CONSECUTIVE_FAILURES = 3
+KEY_RATE_LIMIT_COOLDOWN_SECONDS = 30  # when a 429 carries no retry-after
+
+def header_reset_time(value):
+    """Epoch seconds from an RFC 3339 rate-limit reset header, or None"""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+def header_count(value):
+    """A remaining-quota header as an int, or None when absent or malformed"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header - delay-seconds or an HTTP-date (RFC 9110) - with a default"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return KEY_RATE_LIMIT_COOLDOWN_SECONDS
+
+class ApiKeyPool:
+    """Process-wide pool of API keys, with per-key load, rate-limit state and usage"""
+
+    def __init__(self, entries=(), strategy="least_loaded"):
+        self._lock = threading.Lock()
+        self.strategy = strategy if strategy in KEY_POOL_STRATEGIES else "least_loaded"
+        self.keys = []
+        for number, entry in enumerate(entries, 1):
+            entry = {"key": entry} if isinstance(entry, str) else entry
+            if not entry.get("key"):
+                continue
+            self.keys.append({
+                "name": entry.get("name") or f"Key {number}", "key": entry["key"], "weight": float(entry.get("weight", 1)),
+                "in_flight": 0, "calls": 0, "errors": 0, "rate_limited": 0, "input_tokens": 0, "output_tokens": 0,
+                "cost": 0.0, "requests_left": None, "tokens_left": None, "cooldown_until": 0.0, "failures": 0,
+                "removed": None
+            })
+
+    def _available(self, tokens, now):
+        return [k for k in self.keys if not k["removed"] and k["weight"] > 0 and k["cooldown_until"] <= now
+                and k["requests_left"] != 0 and (k["tokens_left"] is None or k["tokens_left"] >= tokens)]
+
+    def checkout(self, tokens=0, reserve=True):
+        """A key entry for a call of about this many tokens, or None when every key is removed or rate limited"""
+        with self._lock:
+            now = time.time()
+            candidates = self._available(tokens, now)
+            if not candidates:
+                # Reported quotas may be stale; let keys whose reset time has passed try again
+                for key in self.keys:
+                    if key["cooldown_until"] <= now:
+                        key["requests_left"] = key["tokens_left"] = None
+                candidates = self._available(tokens, now)
+            if not candidates:
+                return None
+            if self.strategy == "weighted":
+                key = random.choices(candidates, weights=[k["weight"] for k in candidates])[0]
+            else:
+                key = min(candidates, key=lambda k: (k["in_flight"] / k["weight"], -(k["tokens_left"] or 0)))
+            if reserve:
+                key["in_flight"] += 1
+            return key
+
+    def checkin(self, key, call, headers=None):
+        """Record a finished call's outcome and rate-limit headers against its key"""
+        headers = headers or {}
+        with self._lock:
+            key["in_flight"] -= 1
+            key["calls"] += 1
+            key["input_tokens"] += call["input_tokens"]
+            key["output_tokens"] += call["output_tokens"]
+            key["cost"] += call["cost"]
+            remaining = header_count(headers.get("anthropic-ratelimit-requests-remaining"))
+            if remaining is not None:
+                key["requests_left"] = remaining
+            remaining = header_count(headers.get("anthropic-ratelimit-tokens-remaining"))
+            if remaining is not None:
+                key["tokens_left"] = remaining
+            if key["requests_left"] == 0 or key["tokens_left"] == 0:
+                reset = header_reset_time(headers.get("anthropic-ratelimit-requests-reset")
+                                          or headers.get("anthropic-ratelimit-tokens-reset"))
+                key["cooldown_until"] = reset or time.time() + KEY_RATE_LIMIT_COOLDOWN_SECONDS
+            if call["status"] == "rate_limited":
+                key["rate_limited"] += 1
+                key["cooldown_until"] = time.time() + retry_after_seconds(headers.get("retry-after"))
+            elif call["status"] in ("auth_error", "error"):
+                key["errors"] += 1
+                key["failures"] += 1
+                if call["status"] == "auth_error":
+                    self._remove(key, "rejected (invalid or revoked key)")
+                elif key["failures"] >= KEY_MAX_CONSECUTIVE_FAILURES:
+                    self._remove(key, f"{key['failures']} failed calls in a row")
+            elif call["status"] == "ok":
+                key["failures"] = 0
+
+    def _remove(self, key, reason):
+        key["removed"] = reason
+        get_telemetry().record_event("key_removed", key=key["name"], reason=reason)
+
+    def restore(self):
+        """Put every removed key back in the pool"""
+        with self._lock:
+            for key in self.keys:
+                key["removed"], key["failures"], key["cooldown_until"] = None, 0, 0.0
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for k in self.keys if not k["removed"])
+
+    def snapshot(self):
+        with self._lock:
+            now = time.time()
+            return [{
+                "Key": key["name"],
+                "Status": (f"Removed: {key['removed']}" if key["removed"] else
+                           f"Cooling down ({math.ceil(key['cooldown_until'] - now)}s)" if key["cooldown_until"] > now else "Active"),
+                "Weight": key["weight"],
+                "In flight": key["in_flight"],
+                "Calls": key["calls"],
+                "Errors": key["errors"],
+                "Rate limited": key["rate_limited"],
+                "Input tokens": key["input_tokens"],
+                "Output tokens": key["output_tokens"],
+                "Cost ($)": round(key["cost"], 4),
+                "Requests left": key["requests_left"],
+                "Tokens left": key["tokens_left"]
+            } for key in self.keys]
+
+@st.cache_resource(show_spinner=False)
+def get_key_pool():
+    """Shared API key pool for this server process, from CLAUDE_API_KEYS (and CLAUDE_KEY_POOL_STRATEGY) in secrets"""
+    try:
+        entries = st.secrets.get("CLAUDE_API_KEYS", [])
+        strategy = st.secrets.get("CLAUDE_KEY_POOL_STRATEGY", "least_loaded")
+    except Exception:
+        entries, strategy = [], "least_loaded"
+    return ApiKeyPool(entries, strategy)
+
+def get_claude_response(prompt, api_key, tier=DEFAULT_MODEL_TIER, max_tokens=BASELINE_MAX_OUTPUT_TOKENS, stop_sequences=None,
+                        cached_prefix=None, priority=None):
+    """Generate content using Claude API, skipping models whose circuit breaker is open
+
+    A call that fails because its model is overloaded or unavailable is retried on the tier's fallback; when
+    no tier is available the last good response to the same request is returned instead of an error.
+    """
+    breakers = get_circuit_breakers()
+    key = hashlib.sha256(json.dumps([prompt, cached_prefix, max_tokens, stop_sequences]).encode("utf-8")).hexdigest()
+    result = None
+    for candidate in breakers.route(tier):
+        model = MODEL_TIERS[candidate]["model"]
+        if not breakers.allow(model):
+            continue
+        if candidate != tier:
+            get_telemetry().increment("breaker_fallback_calls")
+        status = "stopped"
+        try:
+            for _ in range(KEY_POOL_ATTEMPTS if api_key == KEY_POOL else 1):
+                result, status = claude_call(prompt, api_key, candidate, max_tokens, stop_sequences, cached_prefix, priority)
+                # A pooled key that was rate limited or rejected is benched; the retry picks another key
+                if status not in ("rate_limited", "auth_error") or get_key_pool().checkout(reserve=False) is None:
+                    break
+        finally:
+            breakers.record(model, None if status == "stopped" else status == "unavailable")
+        if status == "ok":
+            breakers.remember(key, result)
+        if status != "unavailable":
+            return result
+    cached = breakers.recall(key)
+    if cached is not None:
+        get_telemetry().increment("breaker_cached_results")
+        return cached
+    return result or (f"ERROR: {MODEL_TIERS[tier]['label']} and its fallbacks are temporarily unavailable "
+                      f"(circuit open). Please try again in {breakers.open_seconds} seconds.")
+
+def claude_call(prompt, api_key, tier, max_tokens, stop_sequences=None, cached_prefix=None, priority=None):
+    """One Claude API call on one tier; returns (text or "ERROR: ..." message, call status)
+
+    cached_prefix is a string (or list of strings) sent ahead of the prompt with cache breakpoints,
+    so calls that share it only pay full price for it once. The call waits for a slot from the process-wide
+    scheduler first; priority defaults to the calling thread's class (see request_priority). Calls stream, and
+    stop (status "stopped") when the generation they belong to is stopped - see stoppable_generation. With
+    api_key set to KEY_POOL the call runs on a key taken from the shared pool.
+    """
+    model = MODEL_TIERS[tier]["model"]
+    prefixes = [cached_prefix] if isinstance(cached_prefix, str) else (cached_prefix or [])
+    priority = priority or request_priority()
+    stop = getattr(_request_context, "stop", None) or new_stop_state()
+    anthropic = anthropic_sdk()
+    ticket = schedule_call(estimate_tokens(prompt) + sum(map(estimate_tokens, prefixes)) + max_tokens, priority,
+                           stop["cancel"])
+    started = time.perf_counter()
+    call = {"tier": tier, "model": model, "status": "ok", "input_tokens": 0, "output_tokens": 0, "cost": 0.0,
+            "max_tokens": max_tokens, "stop_reason": None, "queued": ticket["waited"] if ticket else 0.0}
+    stream = None
+    progress = []
+    pooled_key = None
+    headers = None
+    try:
+        if ticket is None:
+            raise GenerationStopped()
+        if api_key == KEY_POOL:
+            pooled_key = get_key_pool().checkout(ticket["tokens"])
+            if pooled_key is None:
+                call["status"] = "rate_limited"
+                return "ERROR: Every key in the API key pool is rate limited or removed. Please try again shortly.", call["status"]
+            call["key"] = pooled_key["name"]
+            api_key = pooled_key["key"]
+        client = anthropic.Anthropic(api_key=api_key)
+        content = prompt
+        if prefixes:
+            content = [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}} for text in prefixes]
+            content.append({"type": "text", "text": prompt})
+        request = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": [
+                {"role": "user", "content": content}
+            ]
+        }
+        if stop_sequences:
+            request["stop_sequences"] = stop_sequences
+        hedge = None
+        policy = get_hedge_policy()
+        if policy.eligible(priority, max_tokens):
+            ctx = get_script_run_ctx()
+
+            def start_hedge():
+                if not policy.within_budget():
+                    return None
+                hedge_ticket = get_scheduler().try_acquire(ticket["priority"], ticket["tokens"], ctx.session_id if ctx else "")
+                return hedge_ticket and partial(get_scheduler().release, hedge_ticket)
+
+            hedge_after = policy.threshold()
+            call["hedging"] = hedge_after is not None
+            stream, call["first_token"], hedge = stream_first_wins(client, request, hedge_after, start_hedge)
+            policy.record(call["first_token"], hedge is not None)
+        else:
+            stream = client.messages.stream(**request).__enter__()
+        # The response has started, so the prompt-cache entries this request writes can now be read
+        responding = getattr(_request_context, "responding", None)
+        if responding is not None:
+            responding.set()
+
+        def on_text(text):
+            # Only the script thread draws; a Stop press surfaces here as Streamlit's rerun exception
+            if not progress:
+                progress.append(st.empty())
+            progress[0].caption(f"✍️ {len(text.split()):,} words written so far")
+
+        message = finish_stream(stream, stop["cancel"], on_text if priority == "interactive" else None)
+        headers = getattr(getattr(stream, "response", None), "headers", None)
+        if progress:
+            progress[0].empty()
+        cache_write = getattr(message.usage, "cache_creation_input_tokens", 0) or 0
+        cache_read = getattr(message.usage, "cache_read_input_tokens", 0) or 0
+        call["input_tokens"] = message.usage.input_tokens
+        call["output_tokens"] = message.usage.output_tokens
+        call["cache_write_tokens"] = cache_write
+        call["cache_read_tokens"] = cache_read
+        call["cost"] = call_cost(tier, message.usage.input_tokens, message.usage.output_tokens, cache_write, cache_read)
+        call["stop_reason"] = message.stop_reason
+        if message.stop_reason == "max_tokens":
+            stop["truncated"] = True
+        if hedge:
+            # The losing attempt is billed for its input and whatever it streamed before being closed
+            call["hedge_won"] = hedge["won"]
+            call["hedge_cost"] = call_cost(tier, message.usage.input_tokens, hedge["output_tokens"], cache_write, cache_read)
+            call["cost"] += call["hedge_cost"]
+        return message.content[0].text, call["status"]
+    except GenerationStopped:
+        call["status"] = "stopped"
+        return stream_progress(stream)[0] if stream else "", call["status"]
+    except anthropic.AuthenticationError:
+        call["status"] = "auth_error"
+        return "ERROR: Invalid API key. Please check your Claude API key.", call["status"]
+    except anthropic.RateLimitError as e:
+        call["status"] = "rate_limited"
+        headers = e.response.headers
+        return "ERROR: Rate limit exceeded. Please wait a moment and try again.", call["status"]
+    except (anthropic.APIStatusError, anthropic.APIConnectionError) as e:
+        # 5xx and 529 (overloaded) responses and connection failures count against the model's breaker
+        headers = getattr(getattr(e, "response", None), "headers", None)
+        server_side = getattr(e, "status_code", 500) >= 500
+        call["status"] = "unavailable" if server_side else "error"
+        return f"ERROR: {str(e)}", call["status"]
+    except Exception as e:
+        call["status"] = "error"
+        return f"ERROR: {str(e)}", call["status"]
+    except BaseException:
+        # Streamlit is stopping this script run (Stop, or another widget changed): end the whole generation
+        stop["cancel"].set()
+        call["status"] = "stopped"
+        raise
+    finally:
+        if stream is not None:
+            stream.close()
+        if call["status"] == "stopped":
+            # Whatever streamed before the stop is billed; the rest of the output budget is saved
+            text, input_tokens, output_tokens = stream_progress(stream) if stream else ("", 0, 0)
+            stop["partials"].append(text)
+            call["input_tokens"], call["output_tokens"] = input_tokens, output_tokens
+            call["cost"] = call_cost(tier, input_tokens, output_tokens)
+            call["saved_tokens"] = max(0, max_tokens - output_tokens)
+            stop["saved_tokens"] += call["saved_tokens"]
+            get_telemetry().increment("stopped_calls")
+            get_telemetry().increment("stop_saved_tokens", call["saved_tokens"])
+        call["latency"] = time.perf_counter() - started
+        if ticket is not None:
+            get_scheduler().release(ticket, call["input_tokens"] + call["output_tokens"] + call.get("cache_write_tokens", 0)
+                                    if call["status"] in ("ok", "stopped") else None)
+        if pooled_key is not None:
+            get_key_pool().checkin(pooled_key, call, headers)
+        get_telemetry().record_call(**call)
+
+def prefix_cacheable(cached_prefix, tier):
+    """Whether a cached_prefix is long enough for the tier's model to cache it at all"""
+    prefixes = [cached_prefix] if isinstance(cached_prefix, str) else (cached_prefix or [])
+    return sum(map(estimate_tokens, prefixes)) >= MODEL_TIERS[tier]["min_cache_tokens"]
+
+def cache_warming_lead(prefixes, tier):
+    """Job to run ahead of the others (run_concurrently's lead) so they read the prefix it caches, or None
+
+    prefixes maps job name -> the cached_prefix its call sends (or None). Only a cacheable prefix that more than
+    one job sends is worth the wait; otherwise every job can start at once.
+    """
+    shared = Counter(prefix for prefix in prefixes.values() if isinstance(prefix, str) and prefix_cacheable(prefix, tier))
+    return next((name for name, prefix in prefixes.items() if shared[prefix] > 1), None)
+
+def run_concurrently(jobs, on_queue=None, lead=None):
+    """Run {name: zero-argument callable} on worker threads; yields (name, result, seconds) as each finishes
+
+    While a job's API call waits for a scheduler slot, on_queue(name, position, eta_seconds) is called on the
+    script thread as its place changes, and on_queue(name, None, None) once the call is admitted. With lead
+    set to a job name, the other jobs start once that job's API call has started responding (or the job has
+    ended): a prompt-cache entry can only be read after the request writing it responds, so jobs sharing a
+    cached_prefix then read the lead's entry instead of each paying to write their own.
+    """
+    ctx = get_script_run_ctx()
+    stop = getattr(_request_context, "stop", None) or new_stop_state()
+    queue_places = {name: (None, None) for name in jobs}  # written by the workers, drawn by the script thread
+    shown_places = dict(queue_places)
+    lead_responding = threading.Event()
+    if lead is None:
+        lead_responding.set()
+
+    def run(name, job):
+        # Workers share this script run's context so cached resources and session state resolve
+        add_script_run_ctx(threading.current_thread(), ctx)
+        _request_context.priority = "fanout"
+        _request_context.stop = stop
+        _request_context.report_wait = lambda position, eta: queue_places.__setitem__(name, (position, eta))
+        _request_context.responding = lead_responding if name == lead else None
+        if name != lead:
+            lead_responding.wait()
+        started = time.perf_counter()
+        try:
+            return name, job(), time.perf_counter() - started
+        finally:
+            if name == lead:
+                lead_responding.set()
+
+    heartbeat = st.empty()
+    with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as pool:
+        pending = {pool.submit(run, name, job) for name, job in jobs.items()}
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=STREAM_PROGRESS_SECONDS, return_when=FIRST_COMPLETED)
+                finished = [future.result() for future in done]
+                for name, _, _ in finished:
+                    shown_places.pop(name)  # a finished job's row shows its result, not its queue place
+                if on_queue:
+                    for name, shown in list(shown_places.items()):
+                        if queue_places[name] != shown:
+                            shown_places[name] = queue_places[name]
+                            on_queue(name, *shown_places[name])
+                yield from finished
+                # An element update is where Streamlit can stop the script run while workers stream
+                heartbeat.empty()
+        except BaseException as interrupt:
+            if not isinstance(interrupt, Exception):
+                # Stopped (or the caller's loop was abandoned): cancel the workers before the pool waits for them
+                stop["cancel"].set()
+            raise
+
+def show_model_used(tier):
+    """Caption naming the model tier that handled the request"""
+    st.caption(f"🤖 Generated with {MODEL_TIERS[tier]['label']} tier ({MODEL_TIERS[tier]['model']})")
+
+def build_content_prompt(company_info, platform, content_type, topic, additional_context, tone, target_audience):
+    """Build a comprehensive prompt for content generation"""
+    guidelines = PLATFORM_GUIDELINES.get(platform, PLATFORM_GUIDELINES["LinkedIn"])
+    
+    prompt = f"""You are an expert social media content strategist and copywriter specializing in B2B SaaS marketing for the legal technology industry.
+
+COMPANY INFORMATION:
+{company_info}
+
+PLATFORM: {platform}
+CONTENT TYPE: {content_type}
+TOPIC/THEME: {topic}
+
+PLATFORM SPECIFICATIONS:
+- Maximum Characters: {guidelines['max_chars']}
+- Recommended Hashtags: {guidelines['hashtags']}
+- Tone: {guidelines['tone']}
+- Format: {guidelines['format']}
+
+BEST PRACTICES FOR {platform.upper()}:
+{chr(10).join(['- ' + bp for bp in guidelines['best_practices']])}
+
+TARGET AUDIENCE: {target_audience}
+DESIRED TONE: {tone}
+
+ADDITIONAL CONTEXT/REQUIREMENTS:
+{additional_context if additional_context else 'None specified'}
+
+TASK:
+Create a compelling {content_type.lower()} for {platform} about "{topic}".
+
+The content should:
+1. Be optimized for {platform}'s algorithm and best practices
+2. Include a strong hook/opening
+3. Provide genuine value to the target audience
+4. Include a clear call-to-action
+5. Be formatted appropriately for the platform
+6. Include relevant hashtags (exact number: {guidelines['hashtags']})
+7. Stay within character limits
+
+OUTPUT FORMAT:
+Provide the ready-to-post content with:
+1. MAIN CONTENT (the actual post text)
+2. HASHTAGS (platform-appropriate)
+3. POSTING TIPS (2-3 specific tips for this post)
+4. BEST TIME TO POST (recommended timing)
+5. SUGGESTED VISUAL (description of ideal accompanying image/video)
+
+Make the content engaging, authentic, and aligned with the company's voice while following all platform best practices."""
+
+    return prompt
+
+def build_video_script_prompt(company_info, platform, video_type, topic, duration, additional_context):
+    """Build prompt for video script generation"""
+    prompt = f"""You are an expert video content strategist and scriptwriter specializing in B2B SaaS marketing for the legal technology industry.
+
+COMPANY INFORMATION:
+{company_info}
+
+PLATFORM: {platform}
+VIDEO TYPE: {video_type}
+TOPIC: {topic}
+TARGET DURATION: {duration}
+
+ADDITIONAL CONTEXT:
+{additional_context if additional_context else 'None specified'}
+
+TASK:
+Create a complete video script for a {video_type} about "{topic}" for {platform}.
+
+The script should include:
+
+1. HOOK (First 3 seconds) - Attention-grabbing opening
+2. INTRO (5-10 seconds) - Brief context setting
+3. MAIN CONTENT - Structured body with clear sections
+4. CALL TO ACTION - What viewers should do next
+5. OUTRO - Memorable closing
+
+OUTPUT FORMAT:
+Provide a complete script with:
+1. FULL SCRIPT (with timestamps and speaker directions)
+2. B-ROLL SUGGESTIONS (visual elements to include)
+3. ON-SCREEN TEXT/GRAPHICS (key points to display)
+4. MUSIC/SOUND RECOMMENDATIONS
+5. THUMBNAIL CONCEPT (for YouTube/TikTok)
+6. CAPTION/DESCRIPTION (for posting)
+7. HASHTAGS (platform-appropriate)
+
+Make it engaging, informative, and optimized for {platform}'s algorithm."""
+
+    return prompt
+
+def build_seo_content_prompt(company_info, content_type, primary_keyword, secondary_keywords, target_word_count, additional_context):
+    """Build prompt for SEO-optimized content"""
+    prompt = f"""You are an expert SEO content strategist and writer specializing in B2B SaaS marketing for the legal technology industry.
+
+COMPANY INFORMATION:
+{company_info}
+
+CONTENT TYPE: {content_type}
+PRIMARY KEYWORD: {primary_keyword}
+SECONDARY KEYWORDS: {secondary_keywords}
+TARGET WORD COUNT: {target_word_count}
+
+ADDITIONAL CONTEXT:
+{additional_context if additional_context else 'None specified'}
+
+TASK:
+Create SEO-optimized content for "{primary_keyword}".
+
+The content should:
+1. Naturally incorporate the primary keyword in title, headers, and body
+2. Include secondary keywords throughout
+3. Follow on-page SEO best practices
+4. Provide genuine value to readers
+5. Include internal linking opportunities
+6. Be structured with proper H1, H2, H3 hierarchy
+
+OUTPUT FORMAT:
+Provide complete content with:
+1. META TITLE (50-60 characters)
+2. META DESCRIPTION (150-160 characters)
+3. FULL CONTENT (with proper heading structure)
+4. KEYWORD DENSITY ANALYSIS
+5. INTERNAL LINKING SUGGESTIONS
+6. FEATURED SNIPPET OPTIMIZATION (structured for position zero)
+7. FAQ SECTION (for additional keyword targeting)
+8. SCHEMA MARKUP SUGGESTIONS
+
+Make it comprehensive, authoritative, and optimized for search intent."""
+
+    return prompt
+
+
+def build_social_prompt_sections(company_context, platform, marketing_goal, target_persona, content_type, topic, tone,
+                                 include_cta, hook_style, key_features, competitor_mention, additional_context):
+    """Build the social media marketing prompt as an ordered list of (section name, text) pairs"""
+    persona_details = TARGET_PERSONAS[target_persona]
+    guidelines = PLATFORM_GUIDELINES.get(platform, PLATFORM_GUIDELINES["LinkedIn"])
+    persona_block = f"""TARGET PERSONA: {target_persona}
+- Description: {persona_details['description']}
+- Pain Points: {', '.join(persona_details['pain_points'])}
+- Motivators: {', '.join(persona_details['motivators'])}
+"""
+
+    # Special LinkedIn formatting for viral posts
+    if platform == "LinkedIn":
+        return [
+            ("Role", """You are a TOP LinkedIn content creator and B2B marketing expert who writes viral posts 
+that get 100K+ impressions. You understand the LinkedIn algorithm perfectly and write posts that STOP THE SCROLL.
+
+"""),
+            ("Company knowledge", f"""COMPANY INFORMATION:
+{company_context}
+
+"""),
+            ("Objective", f"""MARKETING OBJECTIVE: {marketing_goal}
+
+"""),
+            ("Persona", persona_block + "\n"),
+            ("Request details", f"""CONTENT TYPE: {content_type}
+TOPIC: {topic}
+DESIRED TONE: {tone}
+CALL-TO-ACTION: {include_cta}
+HOOK STYLE PREFERENCE: {hook_style if platform == "LinkedIn" else "N/A"}
+KEY FEATURES TO HIGHLIGHT: {', '.join(key_features) if key_features else 'General platform benefits'}
+COMPETITORS TO POSITION AGAINST: {', '.join(competitor_mention) if competitor_mention else 'None'}
+ADDITIONAL CONTEXT: {additional_context if additional_context else 'None'}
+
+"""),
+            ("LinkedIn rules", """═══════════════════════════════════════════════════════════
+CRITICAL LINKEDIN VIRAL POST RULES (FOLLOW EXACTLY):
+═══════════════════════════════════════════════════════════
+
+1. **HOOK (First Line)** - This is EVERYTHING. Must create curiosity gap or pattern interrupt.
+   Examples of hooks that work:
+   - "I've helped 50+ immigration law firms. Here's what the top 1% do differently:"
+   - "Stop using spreadsheets for case management. Here's why:"
+   - "Most immigration attorneys waste 10+ hours/week on admin. The solution?"
+   - "Unpopular opinion: Your case management software is killing your revenue."
+   - "I was skeptical about immigration software. Then I saw a firm increase revenue 30%."
+
+2. **FORMAT** - This is non-negotiable:
+   - ONE sentence per line
+   - Blank line between EVERY sentence
+   - Short sentences (under 15 words each)
+   - NO long paragraphs ever
+   - Use → or • for lists
+   - Maximum 1,200-1,500 characters
+
+3. **STRUCTURE**:
+   Line 1: HOOK (curiosity/controversy/bold claim)
+   Line 2-3: Expand the hook / set up the problem
+   Line 4-8: The insight/story/value (one point per line)
+   Line 9-10: The solution/revelation
+   Line 11: Call-to-action or question
+   Line 12: Hashtags (3-5 at very end)
+
+4. **ENGAGEMENT TRIGGERS**:
+   - End with a question that's easy to answer
+   - Use "you" frequently to speak directly to reader
+   - Include a specific number or metric
+   - Share a contrarian or surprising insight
+
+5. **WHAT NOT TO DO**:
+   - No external links in post body (kills reach)
+   - No more than 2-3 emojis total
+   - No corporate jargon or buzzwords
+   - No long paragraphs
+   - No hashtags mixed into the text
+
+═══════════════════════════════════════════════════════════
+
+"""),
+            ("Task", f"""TASK: Write a VIRAL LinkedIn post about "{topic}" targeting {target_persona}.
+
+"""),
+            ("Output format", """OUTPUT FORMAT (Follow this EXACTLY):
+
+---
+**📱 LINKEDIN POST (Copy & Paste Ready):**
+
+[Write the complete post here with PERFECT formatting:
+- Hook on line 1
+- One sentence per line
+- Blank lines between sentences
+- Question or CTA at end
+- Hashtags at very bottom]
+
+---
+
+**🎯 WHY THIS POST WILL PERFORM:**
+[2-3 bullet points on why this hooks the target persona]
+
+**⏰ BEST TIME TO POST:**
+[Specific day and time recommendation]
+
+**💬 ENGAGEMENT STRATEGY:**
+[How to respond to comments to boost reach]
+
+**🔗 COMMENT CTA:**
+[What to put in the first comment - usually the link]
+
+**📊 EXPECTED PERFORMANCE:**
+[Realistic engagement expectations]
+
+---
+
+Remember: The post MUST look like it was written by a human thought leader, NOT a company. 
+First-person, authentic, valuable, and formatted for MOBILE READABILITY.""")
+        ]
+
+    # Standard prompt for other platforms
+    return [
+        ("Role", """You are an expert B2B SaaS marketing strategist specializing in legal technology marketing, 
+specifically immigration case management software. You understand the immigration law market deeply.
+
+"""),
+        ("Company knowledge", f"""COMPANY INFORMATION:
+{company_context}
+
+"""),
+        ("Objective", f"""MARKETING OBJECTIVE: {marketing_goal}
+
+"""),
+        ("Persona", persona_block + f"""- Preferred Tone: {persona_details['tone']}
+- Content Focus: {persona_details['content_focus']}
+
+"""),
+        ("Request details", f"""PLATFORM: {platform}
+CONTENT TYPE: {content_type}
+TOPIC: {topic}
+DESIRED TONE: {tone}
+
+"""),
+        ("Platform specs", f"""PLATFORM SPECIFICATIONS:
+- Maximum Characters: {guidelines['max_chars']}
+- Recommended Hashtags: {guidelines['hashtags']}
+- Platform Tone: {guidelines['tone']}
+- Format: {guidelines['format']}
+
+"""),
+        ("Positioning", f"""CALL-TO-ACTION: {include_cta}
+KEY FEATURES TO HIGHLIGHT: {', '.join(key_features) if key_features else 'General platform benefits'}
+COMPETITORS TO POSITION AGAINST: {', '.join(competitor_mention) if competitor_mention else 'None - focus on LawTrax strengths'}
+
+ADDITIONAL CONTEXT: {additional_context if additional_context else 'None'}
+
+"""),
+        ("Best practices", f"""BEST PRACTICES FOR {platform.upper()}:
+{chr(10).join(['- ' + bp for bp in guidelines['best_practices']])}
+
+"""),
+        ("Task", f"""TASK:
+Create compelling marketing content for {platform} that:
+1. Speaks directly to the {target_persona} persona's pain points and motivators
+2. Achieves the marketing objective: {marketing_goal}
+3. Highlights LawTrax's unique value propositions
+4. Includes a strong hook that stops the scroll
+5. Builds credibility and trust
+6. Includes the specified call-to-action: {include_cta}
+7. Is optimized for {platform}'s algorithm and best practices
+8. Uses social proof and specific metrics where possible (e.g., "30% revenue increase", "99.9% uptime")
+
+"""),
+        ("Output format", f"""OUTPUT FORMAT:
+Provide ready-to-post content with:
+
+**📱 MAIN CONTENT:**
+[The actual post text, fully formatted for {platform}]
+
+**#️⃣ HASHTAGS:**
+[{guidelines['hashtags']} relevant hashtags]
+
+**🎯 TARGETING NOTES:**
+[Why this content will resonate with {target_persona}]
+
+**📊 POSTING STRATEGY:**
+- Best time to post
+- Engagement tips
+- Follow-up content ideas
+
+**🖼️ VISUAL SUGGESTION:**
+[Description of ideal accompanying image/video/graphic]
+
+**📈 SUCCESS METRICS:**
+[What metrics to track for this post]
+
+Make the content compelling, authentic, and designed to generate leads for LawTrax.""")
+    ]
+
+def join_prompt_sections(sections):
+    """Concatenate (name, text) prompt sections into the prompt string"""
+    return "".join(text for _, text in sections)
+
+# Multi-variant generation - all variants come back from a single call and are ranked locally
+VARIANT_COUNTS = [1, 3, 4, 5]
+VARIANT_RANK_WEIGHTS = {"validator": 0.5, "length": 0.3, "similarity": 0.2}
+HOOK_LENGTH_RANGE = (40, 150)
+LINKEDIN_LENGTH_RANGE = (1200, 1500)
+CTA_KEYWORDS = ("demo", "trial", "learn more", "comment", "contact", "visit", "download", "book", "sign up", "call", "link", "dm", "register", "join")
+
+def build_variant_output_section(variant_count, variant_kind, platform):
+    """Output format asking for every variant in one structured response"""
+    if variant_kind == "Hooks only":
+        body = f"""Write {variant_count} distinct opening hooks (first line only, under {HOOK_LENGTH_RANGE[1]} characters) for this {platform} post.
+Each hook must use a different angle: curiosity, bold claim, number/metric, question, contrarian take."""
+    else:
+        body = f"""Write {variant_count} distinct, complete, ready-to-post {platform} posts for A/B testing.
+Each variant must open with a different hook and angle, follow every rule above, and end with its hashtags."""
+    return ("Output format", f"""OUTPUT FORMAT (Follow this EXACTLY):
+{body}
+
+Start each variant with a line containing only "### VARIANT <number>" followed by the variant text.
+Do not add any commentary, strategy notes or headings before, between or after the variants.""")
+
+def variant_output_budget(platform, variant_count, variant_kind):
+    """Output budget for all variants in one response"""
+    if variant_kind == "Hooks only":
+        per_variant = chars_to_tokens(HOOK_LENGTH_RANGE[1])
+    else:
+        max_chars = PLATFORM_GUIDELINES.get(platform, PLATFORM_GUIDELINES["LinkedIn"])["max_chars"]
+        per_variant = chars_to_tokens(min(max_chars, SOCIAL_BODY_CHAR_CAP))
+    return size_output_budget(per_variant * variant_count, "variants")
+
+def parse_variants(text):
+    """Split a structured multi-variant response into the individual variants"""
+    parts = re.split(r"^\s*#{0,3}\s*\**VARIANT\s+\d+\**\s*:?\s*$", text, flags=re.M | re.I)
+    variants = [part.strip().strip("-").strip() for part in parts[1:]]
+    return [v for v in variants if v] or [text.strip()]
+
+def validate_social_post(text, platform, variant_kind="Full posts"):
+    """Local rule checks for a generated post (or hook); returns (score 0-1, failed checks)"""
+    if variant_kind == "Hooks only":
+        checks = {
+            "Single line": "\n" not in text.strip(),
+            "Hook length": HOOK_LENGTH_RANGE[0] <= len(text) <= HOOK_LENGTH_RANGE[1],
+            "No hashtags": "#" not in text
+        }
+    else:
+        guidelines = PLATFORM_GUIDELINES.get(platform, PLATFORM_GUIDELINES["LinkedIn"])
+        hashtags = re.findall(r"#\w+", text)
+        first_line = text.strip().splitlines()[0] if text.strip() else ""
+        checks = {
+            "Within character limit": len(text) <= guidelines["max_chars"],
+            "Hashtag count": abs(len(hashtags) - guidelines["hashtags"]) <= max(1, guidelines["hashtags"] // 4),
+            "Short hook line": 0 < len(first_line) <= HOOK_LENGTH_RANGE[1],
+            "CTA or question": "?" in text or any(k in text.lower() for k in CTA_KEYWORDS)
+        }
+        if platform == "LinkedIn":
+            lines = [line for line in text.splitlines() if line.strip()]
+            checks["No links in body"] = not re.search(r"https?://", text)
+            checks["One sentence per line"] = bool(lines) and sum(len(line) for line in lines) / len(lines) <= 120
+            checks["Hashtags at the end"] = not hashtags or all("#" not in line for line in lines[:-2])
+    failed = [name for name, passed in checks.items() if not passed]
+    return (len(checks) - len(failed)) / len(checks), failed
+
+def length_fit_score(text, platform, variant_kind="Full posts"):
+    """1.0 inside the target length range, decaying outside it"""
+    if variant_kind == "Hooks only":
+        low, high = HOOK_LENGTH_RANGE
+    elif platform == "LinkedIn":
+        low, high = LINKEDIN_LENGTH_RANGE
+    else:
+        limit = min(PLATFORM_GUIDELINES.get(platform, PLATFORM_GUIDELINES["LinkedIn"])["max_chars"], SOCIAL_BODY_CHAR_CAP)
+        low, high = int(limit * 0.4), int(limit * 0.9)
+    length = len(text)
+    if length < low:
+        return length / low
+    if length > high:
+        return max(0.0, 1 - (length - high) / high)
+    return 1.0
+
+def cosine_similarity(counts_a, counts_b):
+    """Cosine similarity of two term-count vectors"""
+    if not counts_a or not counts_b:
+        return 0.0
+    dot = sum(count * counts_b.get(term, 0) for term, count in counts_a.items())
+    norm = math.sqrt(sum(c * c for c in counts_a.values())) * math.sqrt(sum(c * c for c in counts_b.values()))
+    return dot / norm if norm else 0.0
+
+def rank_variants(variants, platform, variant_kind, high_performers):
+    """Score each variant by validator checks, length fit and similarity to past high performers"""
+    performer_vectors = [Counter(tokenize_for_search(content)) for content in high_performers]
+    ranked = []
+    for number, text in enumerate(variants, start=1):
+        validator, failed = validate_social_post(text, platform, variant_kind)
+        length = length_fit_score(text, platform, variant_kind)
+        vector = Counter(tokenize_for_search(text))
+        similarity = max((cosine_similarity(vector, other) for other in performer_vectors), default=0.0)
+        score = (VARIANT_RANK_WEIGHTS["validator"] * validator
+                 + VARIANT_RANK_WEIGHTS["length"] * length
+                 + VARIANT_RANK_WEIGHTS["similarity"] * similarity)
+        ranked.append({
+            "variant": number,
+            "content": text,
+            "score": round(score, 3),
+            "validator": round(validator, 2),
+            "length_fit": round(length, 2),
+            "similarity": round(similarity, 2),
+            "issues": failed
+        })
+    ranked.sort(key=lambda v: v["score"], reverse=True)
+    return ranked
+
+# Content-addressed artifact storage - each body is kept once per session under the SHA-256 of its text,
+# zlib-compressed. A body derived from another (provider packages built from one script, a refined or
+# trimmed history item) is compressed against its base as the zlib preset dictionary, so the text they
+# share is stored only once, in the base.
+BLOB_COMPRESSION_LEVEL = 6
+BLOB_ENTRY_BYTES = 250  # digest string, entry tuple and dict slot
+HISTORY_PAGE_SIZE = 20  # Content History items listed per page; only opened items read their body
+
+class BlobStore:
+    """Compressed text blobs for one session, keyed by content hash
+
+    Bodies can be spilled to a private temporary SQLite file (least recently read first) and are read back
+    from it transparently; the file goes away with the store.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # digest -> (compressed bytes, or None once spilled, base digest or None, raw size, compressed size)
+        self.blobs = OrderedDict()
+        self.disk = None
+        self.puts = 0
+        self.logical_bytes = 0  # every put, duplicates included
+
+    def _data(self, digest):
+        data = self.blobs[digest][0]
+        if data is None:
+            data = self.disk.execute("SELECT data FROM blobs WHERE digest = ?", (digest,)).fetchone()[0]
+        return data
+
+    def _text(self, digest):
+        self.blobs.move_to_end(digest)
+        base = self.blobs[digest][1]
+        decompressor = zlib.decompressobj(zdict=self._text(base).encode("utf-8")) if base else zlib.decompressobj()
+        return (decompressor.decompress(self._data(digest)) + decompressor.flush()).decode("utf-8")
+
+    def put(self, text, base=None):
+        """Store text (once) and return its digest; base is the digest of a blob the text derives from"""
+        raw = text.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        added = 0
+        with self._lock:
+            self.puts += 1
+            self.logical_bytes += len(raw)
+            if digest in self.blobs:
+                self.blobs.move_to_end(digest)
+            else:
+                base = base if base in self.blobs and self.blobs[base][2] else None
+                compressor = (zlib.compressobj(BLOB_COMPRESSION_LEVEL, zdict=self._text(base).encode("utf-8"))
+                              if base else zlib.compressobj(BLOB_COMPRESSION_LEVEL))
+                data = compressor.compress(raw) + compressor.flush()
+                self.blobs[digest] = (data, base, len(raw), len(data))
+                added = len(data)
+        telemetry = get_telemetry()
+        telemetry.increment("artifact_bytes_logical", len(raw))
+        if added:
+            telemetry.increment("artifact_bytes_raw", len(raw))
+            telemetry.increment("artifact_bytes_stored", added)
+        return digest
+
+    def get(self, digest):
+        with self._lock:
+            return self._text(digest)
+
+    def spill(self, keep_bytes=0):
+        """Move the least recently read bodies to disk until memory_bytes() is at most keep_bytes; bytes moved"""
+        moved = 0
+        with self._lock:
+            held = self._memory_bytes()
+            if held <= keep_bytes:
+                return 0
+            if self.disk is None:
+                self.disk = sqlite3.connect("", check_same_thread=False)
+                self.disk.execute("CREATE TABLE blobs (digest TEXT PRIMARY KEY, data BLOB)")
+            with self.disk:
+                for digest, (data, base, raw, stored) in list(self.blobs.items()):
+                    if held - moved <= keep_bytes:
+                        break
+                    if data is None:
+                        continue
+                    self.disk.execute("INSERT INTO blobs VALUES (?, ?)", (digest, data))
+                    self.blobs[digest] = (None, base, raw, stored)
+                    moved += stored
+        return moved
+
+    def retain(self, digests):
+        """Drop every blob that is neither in digests nor the base of one that is"""
+        with self._lock:
+            keep = set()
+            for digest in digests:
+                while digest in self.blobs and digest not in keep:
+                    keep.add(digest)
+                    digest = self.blobs[digest][1]
+            dropped = [digest for digest in self.blobs if digest not in keep]
+            for digest in dropped:
+                if self.blobs.pop(digest)[0] is None:
+                    self.disk.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            if self.disk is not None:
+                self.disk.commit()
+        return len(dropped)
+
+    def _memory_bytes(self):
+        return sum(len(entry[0]) for entry in self.blobs.values() if entry[0] is not None) + BLOB_ENTRY_BYTES * len(self.blobs)
+
+    def memory_bytes(self):
+        """Compressed bodies held in memory plus per-entry bookkeeping"""
+        with self._lock:
+            return self._memory_bytes()
+
+    def stats(self):
+        """Bodies stored, bytes as saved (duplicates included), unique raw bytes, compressed and spilled bytes"""
+        with self._lock:
+            return {
+                "bodies": len(self.blobs),
+                "puts": self.puts,
+                "logical_bytes": self.logical_bytes,
+                "raw_bytes": sum(entry[2] for entry in self.blobs.values()),
+                "stored_bytes": sum(entry[3] for entry in self.blobs.values()),
+                "spilled_bytes": sum(entry[3] for entry in self.blobs.values() if entry[0] is None)
+            }
+
+def get_blob_store():
+    """Session blob store for generated artifact bodies"""
+    if "blob_store" not in st.session_state:
+        st.session_state.blob_store = BlobStore()
+    return st.session_state.blob_store
+
+def history_content(item, store=None):
+    """Body of a history item from the blob store (items built outside the app may carry it inline)"""
+    if "content" in item:
+        return item["content"]
+    return (store or get_blob_store()).get(item["content_blob"])
+
+def add_to_history(item, base=None):
+    """Append an item to the session history, moving its body into the blob store
+
+    base is the history position the item was derived from (refined or trimmed), used as its compression base.
+    """
+    history = st.session_state.generated_content
+    base_blob = history[base].get("content_blob") if base is not None and base < len(history) else None
+    item["content_blob"] = get_blob_store().put(item.pop("content"), base=base_blob)
+    history.append(item)
+    return item
+
+def storage_summary(stats):
+    """One-line compression ratio and storage saved for blob store stats"""
+    saved = stats["logical_bytes"] - stats["stored_bytes"]
+    return (f"{stats['bodies']:,} bod{'y' if stats['bodies'] == 1 else 'ies'} · "
+            f"{stats['logical_bytes'] / 1024:,.1f} KB written, {stats['stored_bytes'] / 1024:,.1f} KB stored "
+            f"({stats['raw_bytes'] / max(stats['stored_bytes'], 1):.1f}x compression; {saved / 1024:,.1f} KB "
+            f"({saved / max(stats['logical_bytes'], 1):.0%}) saved, "
+            f"{(stats['logical_bytes'] - stats['raw_bytes']) / 1024:,.1f} KB of it duplicates)"
+            + (f" · {stats['spilled_bytes'] / 1024:,.1f} KB spilled to disk" if stats.get("spilled_bytes") else ""))
+
+def session_blob_refs():
+    """Digests still referenced from this session's history, saved variants and provider packages"""
+    refs = [item["content_blob"] for item in st.session_state.get("generated_content", []) if "content_blob" in item]
+    refs += [variant["content_blob"] for variant in st.session_state.get("social_variants", {}).get("variants", [])]
+    packages = st.session_state.get("provider_packages")
+    if packages:
+        refs += [packages["script"], *packages["results"].values()]
+    return refs
+
+# Per-session memory accounting - after each script run the session's state is measured (at most every few
+# seconds); a session over the cap spills its least recently read artifact bodies to disk, and a session idle
+# for longer than the idle timeout is spilled entirely. Spilled bodies are read back when they are viewed.
+SESSION_MEMORY_CAP_MB = 32
+SESSION_IDLE_MINUTES = 30
+SESSION_ACCOUNTING_SECONDS = 5
+SIZE_SAMPLE_ITEMS = 32  # longer containers are measured from a sample and extrapolated
+
+def approx_size(value, seen=None):
+    """Rough deep size of a session state value in bytes; objects with memory_bytes() report their own"""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if hasattr(value, "memory_bytes") and not isinstance(value, type):
+        return value.memory_bytes()
+    size = sys.getsizeof(value, 0)
+    if isinstance(value, dict):
+        items = list(itertools.islice(value.items(), SIZE_SAMPLE_ITEMS))
+        measured = sum(approx_size(key, seen) + approx_size(item, seen) for key, item in items)
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        items = list(itertools.islice(value, SIZE_SAMPLE_ITEMS))
+        measured = sum(approx_size(item, seen) for item in items)
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        return size + approx_size(vars(value), seen)
+    else:
+        return size
+    return size + (measured * len(value) // len(items) if items else 0)
+
+class SessionRegistry:
+    """Process-wide footprint and activity of every live session, with the memory cap and idle timeout"""
+
+    def __init__(self, cap_mb=SESSION_MEMORY_CAP_MB, idle_minutes=SESSION_IDLE_MINUTES):
+        self._lock = threading.Lock()
+        self.cap_mb = cap_mb
+        self.idle_minutes = idle_minutes
+        # session id -> {"store": weakref to its BlobStore, "footprint", "last_seen", "accounted", "idle_spilled"}
+        self.sessions = {}
+
+    def due(self, session_id, now):
+        """Whether this session should be measured again"""
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            return entry is None or now - entry["accounted"] >= SESSION_ACCOUNTING_SECONDS
+
+    def touch(self, session_id, store, now, footprint=None):
+        with self._lock:
+            entry = self.sessions.setdefault(session_id, {"footprint": 0, "accounted": 0.0})
+            entry.update(store=weakref.ref(store), last_seen=now, idle_spilled=False)
+            if footprint is not None:
+                entry.update(footprint=footprint, accounted=now)
+
+    def evict_idle(self, now):
+        """Spill every body of sessions idle past the timeout and forget sessions that are gone; bytes spilled"""
+        with self._lock:
+            for session_id in [sid for sid, entry in self.sessions.items() if entry["store"]() is None]:
+                del self.sessions[session_id]
+            idle = [(session_id, entry) for session_id, entry in self.sessions.items()
+                    if not entry["idle_spilled"] and now - entry["last_seen"] > self.idle_minutes * 60]
+            for _, entry in idle:
+                entry["idle_spilled"] = True
+        spilled = 0
+        for session_id, entry in idle:
+            store = entry["store"]()
+            moved = store.spill() if store is not None else 0
+            with self._lock:
+                entry["footprint"] -= moved
+            spilled += moved
+            get_telemetry().record_event("session_evicted", session=session_id[:8], bytes=moved)
+        return spilled
+
+    def snapshot(self, now):
+        """One row per live session, largest footprint first"""
+        with self._lock:
+            entries = list(self.sessions.items())
+        rows = []
+        for session_id, entry in entries:
+            store = entry["store"]()
+            if store is None:
+                continue
+            stats = store.stats()
+            rows.append({
+                "session": session_id,
+                "footprint": entry["footprint"],
+                "bodies": stats["bodies"],
+                "spilled": stats["spilled_bytes"],
+                "idle_minutes": (now - entry["last_seen"]) / 60,
+                "idle_spilled": entry["idle_spilled"]
+            })
+        return sorted(rows, key=lambda row: row["footprint"], reverse=True)
+
+@st.cache_resource(show_spinner=False)
+def get_session_registry():
+    """Shared session memory registry for this server process"""
+    return SessionRegistry()
+
+def account_session_memory():
+    """Measure this session, spill bodies past the cap and spill idle sessions; call at the end of a script run"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    registry = get_session_registry()
+    store = get_blob_store()
+    now = time.time()
+    if not registry.due(ctx.session_id, now):
+        registry.touch(ctx.session_id, store, now)
+        return
+    footprint = approx_size(st.session_state.to_dict())
+    cap = registry.cap_mb * 2 ** 20
+    if footprint > cap:
+        spilled = store.spill(max(0, store.memory_bytes() - (footprint - cap)))
+        if spilled:
+            footprint -= spilled
+            get_telemetry().increment("session_bytes_spilled", spilled)
+            get_telemetry().record_event("session_spill", session=ctx.session_id[:8], bytes=spilled, footprint=footprint)
+    registry.touch(ctx.session_id, store, now, footprint)
+    registry.evict_idle(now)
+
+# Near-duplicate detection over content history (MinHash signatures + LSH banding)
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 32                    # 32 bands x 4 rows ~ candidate threshold of 0.42 Jaccard
+TOPIC_DUPLICATE_THRESHOLD = 0.5
+CONTENT_DUPLICATE_THRESHOLD = 0.5
+MAX_DUPLICATE_MATCHES = 3
+MERSENNE_PRIME = (1 << 61) - 1
+
+def topic_shingles(text):
+    """Character trigrams of each word - robust to word order ("H-1B tips" vs "tips for H-1B")"""
+    shingles = set()
+    for word in tokenize_for_search(text):
+        padded = f" {word} "
+        shingles.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return shingles
+
+def content_shingles(text, size=3):
+    """Word 3-grams of generated content"""
+    words = tokenize_for_search(text)
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+class MinHashLSH:
+    """MinHash signatures bucketed by LSH bands; items are added one at a time"""
+
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, bands=LSH_BANDS, seed=7):
+        rng = random.Random(seed)
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.permutations = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+        self.signatures = {}
+        self.buckets = [{} for _ in range(bands)]
+
+    def signature(self, shingles):
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles] or [0]
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.permutations)
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows] for band in range(self.bands)]
+
+    def add(self, key, shingles):
+        signature = self.signature(shingles)
+        self.signatures[key] = signature
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self.buckets[band].setdefault(band_key, set()).add(key)
+
+    def query(self, shingles, threshold, exclude=None):
+        """Keys whose estimated Jaccard similarity is at least the threshold, most similar first"""
+        signature = self.signature(shingles)
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            candidates.update(self.buckets[band].get(band_key, ()))
+        candidates.discard(exclude)
+        matches = []
+        for key in candidates:
+            other = self.signatures[key]
+            similarity = sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+class HistoryDuplicateIndex:
+    """Topic and content LSH indexes over the session's content history, keyed by history position"""
+
+    def __init__(self):
+        self.topics = MinHashLSH()
+        self.contents = MinHashLSH()
+        self.indexed = 0
+
+    def sync(self, history):
+        """Index only the items added since the last sync (positions are only valid until clear_history())"""
+        if len(history) < self.indexed:
+            self.__init__()
+        for position in range(self.indexed, len(history)):
+            item = history[position]
+            self.topics.add(position, topic_shingles(item.get("topic", "")))
+            self.contents.add(position, content_shingles(history_content(item)))
+        self.indexed = len(history)
+
+    def similar_topics(self, topic, threshold=TOPIC_DUPLICATE_THRESHOLD):
+        return self.topics.query(topic_shingles(topic), threshold)[:MAX_DUPLICATE_MATCHES]
+
+    def similar_contents(self, content, exclude=None, threshold=CONTENT_DUPLICATE_THRESHOLD):
+        return self.contents.query(content_shingles(content), threshold, exclude)[:MAX_DUPLICATE_MATCHES]
+
+def get_history_index():
+    """Session history index, brought up to date incrementally"""
+    if "history_index" not in st.session_state:
+        st.session_state.history_index = HistoryDuplicateIndex()
+    index = st.session_state.history_index
+    index.sync(st.session_state.generated_content)
+    return index
+
+def duplicate_gate(tab_key, topic, mode=True):
+    """Return True when generation should go ahead; otherwise park the near-duplicates for review"""
+    if st.session_state.pop(f"skip_duplicate_check_{tab_key}", False):
+        return True
+    matches = get_history_index().similar_topics(topic)
+    if not matches:
+        return True
+    st.session_state[f"pending_duplicates_{tab_key}"] = {"topic": topic, "matches": matches, "mode": mode}
+    get_telemetry().increment("duplicate_prompts_flagged")
+    return False
+
+def build_refine_prompt(existing_content, request_details):
+    """Short prompt that adapts an earlier piece instead of generating from scratch"""
+    details = "\n".join(f"- {name}: {value}" for name, value in request_details.items() if value)
+    return f"""You are an expert B2B SaaS marketing copywriter for the legal technology industry.
+
+Below is an existing piece of marketing content we already produced. Refine it for the new request:
+keep what works, change the angle, hook and wording so it is clearly a fresh piece, and keep the same output structure.
+
+NEW REQUEST:
+{details}
+
+EXISTING CONTENT:
+{existing_content}"""
+
+def render_duplicate_review(tab_key):
+    """Show parked near-duplicates with reuse / refine / generate-anyway actions"""
+    pending = st.session_state.get(f"pending_duplicates_{tab_key}")
+    if not pending:
+        return
+    history = st.session_state.generated_content
+    matches = [(position, similarity) for position, similarity in pending["matches"] if position < len(history)]
+    st.warning(
+        f"🔁 **{len(matches)} similar item(s) already in your history** for \"{pending['topic']}\". "
+        "Reuse or refine one instead of paying for a new generation?"
+    )
+    for position, similarity in matches:
+        item = history[position]
+        with st.expander(f"{similarity:.0%} similar · {item['type']} - {item['platform']} - {item['topic'][:60]} ({item['timestamp']})"):
+            st.markdown(history_content(item))
+            reuse_col, refine_col = st.columns(2)
+            with reuse_col:
+                if st.button("♻️ Reuse As-Is", key=f"reuse_{tab_key}_{position}", use_container_width=True):
+                    st.session_state[f"reused_{tab_key}"] = position
+                    del st.session_state[f"pending_duplicates_{tab_key}"]
+                    get_telemetry().increment("calls_avoided_by_reuse")
+                    st.rerun()
+            with refine_col:
+                if st.button("✏️ Refine This One", key=f"refine_{tab_key}_{position}", use_container_width=True):
+                    st.session_state[f"refine_source_{tab_key}"] = position
+                    st.session_state[f"skip_duplicate_check_{tab_key}"] = True
+                    st.session_state[f"force_generate_{tab_key}"] = pending["mode"]
+                    del st.session_state[f"pending_duplicates_{tab_key}"]
+                    st.rerun()
+    if st.button("🚀 Generate New Anyway", key=f"generate_anyway_{tab_key}"):
+        st.session_state[f"skip_duplicate_check_{tab_key}"] = True
+        st.session_state[f"force_generate_{tab_key}"] = pending["mode"]
+        del st.session_state[f"pending_duplicates_{tab_key}"]
+        st.rerun()
+
+def render_reused_item(tab_key):
+    """Display an item the user chose to reuse from history"""
+    position = st.session_state.get(f"reused_{tab_key}")
+    if position is None or position >= len(st.session_state.generated_content):
+        return
+    item = st.session_state.generated_content[position]
+    st.markdown('<div class="success-banner">♻️ Reused From History - No API Call Needed</div>', unsafe_allow_html=True)
+    st.markdown(f"### ♻️ {item['type']} - {item['topic']}")
+    st.markdown(history_content(item))
+    if st.button("✖️ Close", key=f"close_reused_{tab_key}"):
+        del st.session_state[f"reused_{tab_key}"]
+        st.rerun()
+
+def flag_new_duplicates(item):
+    """After generation, note earlier history items that the new content nearly duplicates"""
+    history = st.session_state.generated_content
+    position = len(history) - 1
+    index = get_history_index()
+    matches = index.similar_contents(history_content(item), exclude=position)
+    if matches:
+        item["near_duplicates"] = [{"position": p, "similarity": round(sim, 2)} for p, sim in matches]
+        st.info("🔁 **Near-duplicate of earlier content:** " + " · ".join(
+            f"{history[p]['type']} - {history[p]['topic'][:50]} ({sim:.0%})" for p, sim in matches
+        ))
+        get_telemetry().increment("near_duplicates_generated")
+
+# Full-text search over content history (SQLite FTS5, BM25 ranking)
+SEARCH_RESULT_LIMIT = 20
+SEARCH_SNIPPET_TOKENS = 24
+# BM25 column weights: topic, persona, goal, content
+SEARCH_COLUMN_WEIGHTS = (5.0, 1.5, 1.5, 1.0)
+SEARCH_TERM_PATTERN = re.compile(r"[\w][\w'-]*")
+
+def search_match_query(text):
+    """FTS5 MATCH expression for free text: every term must appear, the last one as a prefix
+
+    Terms are quoted so punctuation and words like NOT or OR are never read as query syntax.
+    """
+    terms = [term.replace('"', "") for term in SEARCH_TERM_PATTERN.findall(text)]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+class HistorySearchIndex:
+    """FTS5 index over the session's content history, keyed by history position
+
+    Facet columns live in a plain side table so counting and filtering never read the indexed text.
+    Uses a private temporary on-disk database, so large histories are paged rather than all held in memory.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect("", check_same_thread=False)
+        self.db.executescript(
+            "CREATE VIRTUAL TABLE history USING fts5("
+            "topic, persona, goal, content, tokenize = 'porter unicode61 remove_diacritics 2');"
+            "CREATE TABLE items (rowid INTEGER PRIMARY KEY, type TEXT, platform TEXT, topic TEXT, timestamp TEXT);"
+            f"INSERT INTO history (history, rank) VALUES ('rank', 'bm25({', '.join(map(str, SEARCH_COLUMN_WEIGHTS))})');"
+        )
+        self.indexed = 0
+
+    def sync(self, history):
+        """Index only the items added since the last sync (positions are only valid until clear_history())"""
+        with self._lock:
+            if len(history) < self.indexed:
+                self.db.executescript("DELETE FROM history; DELETE FROM items;")
+                self.indexed = 0
+            if len(history) == self.indexed:
+                return
+            added = list(enumerate(history[self.indexed:], start=self.indexed))
+            with self.db:
+                self.db.executemany(
+                    "INSERT INTO history (rowid, topic, persona, goal, content) VALUES (?, ?, ?, ?, ?)",
+                    ((position, item.get("topic", ""), item.get("persona", ""), item.get("goal", ""), history_content(item))
+                     for position, item in added)
+                )
+                self.db.executemany(
+                    "INSERT INTO items (rowid, type, platform, topic, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    ((position, item["type"], item["platform"], item.get("topic", ""), item.get("timestamp", ""))
+                     for position, item in added)
+                )
+            self.indexed = len(history)
+
+    def memory_bytes(self):
+        """Page cache held by the connection - the index itself lives in its temporary file"""
+        with self._lock:
+            page_size, pages, cache_size = (
+                self.db.execute(f"PRAGMA {name}").fetchone()[0] for name in ("page_size", "page_count", "cache_size")
+            )
+        # A negative cache_size is a limit in KiB rather than in pages
+        cache_pages = -cache_size * 1024 // page_size if cache_size < 0 else cache_size
+        return min(pages, cache_pages) * page_size
+
+    def search(self, text, platforms=(), types=(), limit=SEARCH_RESULT_LIMIT):
+        """Ranked matches with highlighted snippets, plus platform and type facet counts for the query
+
+        Facets count every match for the text, before the platform/type filters, so they show what
+        each filter would return.
+        """
+        match = search_match_query(text)
+        empty = {"results": [], "total": 0, "platforms": {}, "types": {}}
+        if match is None:
+            return empty
+        filters, params = "", [match]
+        for column, values in (("platform", platforms), ("type", types)):
+            if values:
+                filters += f" AND items.{column} IN ({', '.join('?' * len(values))})"
+                params += list(values)
+        with self._lock:
+            try:
+                # Rank first, then build snippets for the page of results only
+                top = self.db.execute(
+                    f"SELECT history.rowid FROM history JOIN items ON items.rowid = history.rowid "
+                    f"WHERE history MATCH ?{filters} ORDER BY rank LIMIT ?",
+                    params + [limit]
+                ).fetchall()
+                snippets = dict(self.db.execute(
+                    f"SELECT rowid, snippet(history, 3, '**', '**', ' … ', {SEARCH_SNIPPET_TOKENS}) FROM history "
+                    f"WHERE history MATCH ? AND rowid IN ({', '.join('?' * len(top))})",
+                    [match] + [rowid for rowid, in top]
+                ).fetchall()) if top else {}
+                details = {row[0]: row[1:] for row in self.db.execute(
+                    f"SELECT rowid, topic, type, platform, timestamp FROM items WHERE rowid IN ({', '.join('?' * len(top))})",
+                    [rowid for rowid, in top]
+                )} if top else {}
+                counts = self.db.execute(
+                    "SELECT items.platform, items.type, count(*) FROM history JOIN items ON items.rowid = history.rowid "
+                    "WHERE history MATCH ? GROUP BY items.platform, items.type",
+                    [match]
+                ).fetchall()
+            except sqlite3.OperationalError:
+                return empty
+        platform_counts, type_counts, total = Counter(), Counter(), 0
+        for platform, item_type, count in counts:
+            platform_counts[platform] += count
+            type_counts[item_type] += count
+            if (not platforms or platform in platforms) and (not types or item_type in types):
+                total += count
+        return {
+            "results": [
+                {"position": rowid, "topic": details[rowid][0], "type": details[rowid][1], "platform": details[rowid][2],
+                 "timestamp": details[rowid][3], "snippet": snippets.get(rowid, "")}
+                for rowid, in top
+            ],
+            "total": total,
+            "platforms": dict(platform_counts.most_common()),
+            "types": dict(type_counts.most_common())
+        }
+
+def get_history_search():
+    """Session history search index, brought up to date incrementally"""
+    if "history_search_index" not in st.session_state:
+        st.session_state.history_search_index = HistorySearchIndex()
+    index = st.session_state.history_search_index
+    index.sync(st.session_state.generated_content)
+    return index
+
+def clear_history():
+    """Empty the session's content history, drop the indexes keyed by its positions and free unreferenced blobs"""
+    st.session_state.generated_content = []
+    st.session_state.pop("history_search_index", None)
+    st.session_state.pop("history_index", None)
+    get_blob_store().retain(session_blob_refs())
+
+# Semantic response cache - exact match on settings, similarity match on topic + context
+SEMANTIC_CACHE_THRESHOLD = 0.85
+SEMANTIC_CACHE_MAX_ENTRIES = 500
+SEMANTIC_CACHE_TTL_SECONDS = 24 * 3600
+HASHED_NGRAM_BUCKETS = 2 ** 18
+
+def hashed_ngram_vector(text):
+    """Hashed word + character-trigram vector of normalized text (word order does not matter)"""
+    vector = Counter()
+    for word in tokenize_for_search(text):
+        word = word.replace("-", "")  # "H-1B" and "H1B" are the same request
+        vector[zlib.crc32(f"w:{word}".encode("utf-8")) % HASHED_NGRAM_BUCKETS] += 1.0
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(f"c:{padded[i:i + 3]}".encode("utf-8")) % HASHED_NGRAM_BUCKETS] += 0.5
+    return vector
+
+class SemanticCache:
+    """Process-wide LRU of generated results, looked up by settings and topic similarity"""
+
+    def __init__(self, max_entries=SEMANTIC_CACHE_MAX_ENTRIES, ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS):
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+
+    @staticmethod
+    def settings_key(namespace, settings):
+        payload = json.dumps(settings, sort_keys=True, default=str)
+        return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def lookup(self, namespace, settings, text, threshold):
+        """Best cached entry with identical settings and topic similarity >= threshold, or None"""
+        key = self.settings_key(namespace, settings)
+        vector = hashed_ngram_vector(text)
+        now = time.time()
+        best, best_similarity = None, 0.0
+        with self._lock:
+            for entry_id, entry in list(self.entries.items()):
+                if now - entry["created"] > self.ttl_seconds:
+                    del self.entries[entry_id]
+                    continue
+                if entry["settings_key"] != key:
+                    continue
+                similarity = cosine_similarity(vector, entry["vector"])
+                if similarity >= threshold and similarity > best_similarity:
+                    best, best_similarity = entry, similarity
+            if best is None:
+                return None
+            self.entries.move_to_end(best["id"])
+            best["hits"] += 1
+            return {**best, "similarity": best_similarity}
+
+    def store(self, namespace, settings, text, result):
+        entry_id = hashlib.sha256(f"{namespace}|{text}|{time.time()}".encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self.entries[entry_id] = {
+                "id": entry_id,
+                "settings_key": self.settings_key(namespace, settings),
+                "text": text,
+                "vector": hashed_ngram_vector(text),
+                "result": result,
+                "created": time.time(),
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
+                "hits": 0
+            }
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def evict(self, entry_id):
+        with self._lock:
+            self.entries.pop(entry_id, None)
+
+@st.cache_resource(show_spinner=False)
+def get_semantic_cache():
+    """Shared semantic cache for this server process"""
+    return SemanticCache()
+
+def semantic_cache_lookup(tab_key, settings, text, mode=True, bypass=False):
+    """Check the semantic cache, remembering a hit so the notice and override survive reruns"""
+    st.session_state.pop(f"cache_hit_{tab_key}", None)
+    if (st.session_state.pop(f"skip_semantic_cache_{tab_key}", False) or bypass
+            or not st.session_state.get("semantic_cache_enabled", True)):
+        return None
+    telemetry = get_telemetry()
+    telemetry.increment("semantic_cache_lookups")
+    threshold = st.session_state.get("semantic_cache_threshold", SEMANTIC_CACHE_THRESHOLD)
+    hit = get_semantic_cache().lookup(tab_key, settings, text, threshold)
+    if hit:
+        telemetry.increment("semantic_cache_hits")
+        st.session_state[f"cache_hit_{tab_key}"] = {
+            "id": hit["id"], "similarity": hit["similarity"], "text": hit["text"],
+            "timestamp": hit["timestamp"], "mode": mode
+        }
+    return hit
+
+def semantic_cache_store(tab_key, settings, text, result, truncated=False):
+    """Cache a successful generation for later near-identical requests
+
+    truncated is set when any call behind the result stopped at its max_tokens limit; cut-off text is never
+    cached, so a later request gets a fresh (possibly complete) generation instead.
+    """
+    if truncated:
+        get_telemetry().increment("semantic_cache_truncated_skips")
+        return
+    if st.session_state.get("semantic_cache_enabled", True) and not result.startswith("ERROR"):
+        get_semantic_cache().store(tab_key, settings, text, result)
+
+def render_cache_notice(tab_key):
+    """Say clearly that the last result came from cache and let the user force a fresh generation"""
+    hit = st.session_state.get(f"cache_hit_{tab_key}")
+    if not hit:
+        return
+    st.info(
+        f"⚡ **Served from the semantic cache - no API call.** {hit['similarity']:.0%} match with an earlier "
+        f"request (\"{hit['text'][:80]}\", generated {hit['timestamp']}) using identical settings."
+    )
+    fresh_col, keep_col = st.columns(2)
+    with fresh_col:
+        if st.button("🔄 Not a match - generate fresh", key=f"cache_override_{tab_key}", use_container_width=True):
+            # A false hit: drop the entry so it cannot be served again and bypass the cache once
+            get_semantic_cache().evict(hit["id"])
+            get_telemetry().increment("semantic_cache_false_hits")
+            st.session_state[f"skip_semantic_cache_{tab_key}"] = True
+            st.session_state[f"skip_duplicate_check_{tab_key}"] = True
+            st.session_state[f"force_generate_{tab_key}"] = hit["mode"]
+            del st.session_state[f"cache_hit_{tab_key}"]
+            st.rerun()
+    with keep_col:
+        if st.button("✔️ Looks right", key=f"cache_keep_{tab_key}", use_container_width=True):
+            del st.session_state[f"cache_hit_{tab_key}"]
+            st.rerun()
+
+# Full video package as a dependency graph: the script first, then the secondary stages
+# concurrently, each reusing the brief and the script as a cached prompt prefix
+VIDEO_PACKAGE_SCRIPT_TASK = """TASK:
+Write the VIDEO SCRIPT for this video. The storyboard, thumbnails, captions and distribution plan are produced
+separately from your script, so output only the script.
+
+OUTPUT:
+
+## 🎬 VIDEO SCRIPT
+
+### HOOK (First 3 Seconds)
+[Attention-grabbing opening that stops the scroll - critical for {platform}]
+
+### OPENING (Seconds 4-10)
+[Problem statement that resonates with {persona}]
+
+### MAIN CONTENT
+[Full script with timestamps, speaker directions, and visual cues]
+- Include [VISUAL: description] cues for B-roll
+- Include [TEXT ON SCREEN: text] for graphics
+- Include [TRANSITION: type] for editing
+
+### CALL-TO-ACTION (Final 5-10 seconds)
+[Strong CTA: {cta}]"""
+
+VIDEO_PACKAGE_STAGES = [
+    {
+        "key": "visuals",
+        "label": "🎨 B-roll, storyboard & audio",
+        "max_tokens": None,  # sized from the duration, the storyboard grows with the script
+        "task": """## 🎨 VISUAL STORYBOARD
+
+| Timestamp | Visual | Audio/Voiceover | Text Overlay |
+|-----------|--------|-----------------|--------------|
+[Complete scene-by-scene breakdown of the script above, with B-roll for every [VISUAL] cue]
+
+---
+
+## 🎵 AUDIO RECOMMENDATIONS
+- Background music style
+- Sound effects
+- Voiceover tone and pacing"""
+    },
+    {
+        "key": "thumbnail",
+        "label": "🖼️ Thumbnails",
+        "max_tokens": 600,
+        "task": """## 🖼️ THUMBNAIL OPTIONS
+[3 thumbnail concepts with descriptions, matching the script's hook]"""
+    },
+    {
+        "key": "captions",
+        "label": "✍️ Captions & hashtags",
+        "max_tokens": 900,
+        "task": """## ✍️ CAPTIONS & DESCRIPTIONS
+
+### Video Title (SEO Optimized)
+[Title]
+
+### Video Description
+[Full description with keywords, timestamps from the script, links]
+
+### Hashtags
+[Platform-appropriate hashtags for {platform}]"""
+    },
+    {
+        "key": "distribution",
+        "label": "📊 Distribution plan",
+        "max_tokens": 1000,
+        "task": """## 📱 PLATFORM-SPECIFIC VERSIONS
+
+### {platform} Version
+- Optimized length and format
+- Platform-specific hooks
+
+### Alternative Cuts
+- 15-second teaser version (which script lines to keep)
+- 30-second ad version
+- Full version
+
+---
+
+## 📊 POSTING STRATEGY
+- Best posting time for {platform}
+- Engagement strategy
+- Cross-posting recommendations
+- A/B testing suggestions"""
+    }
+]
+
+def video_stage_prompt(stage, platform):
+    """Suffix sent after the cached brief + script for one secondary stage"""
+    return (
+        "Using the approved video script above, write ONLY the following section of the video marketing package. "
+        "Do not repeat the script.\n\n" + stage["task"].format(platform=platform)
+    )
+
+def generate_video_package(brief, platform, persona, cta, duration, api_key, tier, on_progress=None):
+    """Run the video package DAG; returns (package text or error, per-stage timing rows, failed stage labels)
+
+    A failed secondary stage leaves a placeholder in the package, so callers must not cache a package with
+    failed stages. on_progress(rows) is called from the script thread whenever a stage changes state.
+    """
+    rows = {"script": {"Stage": "🎬 Script", "Status": "🔄 Running", "Seconds": None}}
+    rows.update({stage["key"]: {"Stage": stage["label"], "Status": "⏳ Waiting for script", "Seconds": None}
+                 for stage in VIDEO_PACKAGE_STAGES})
+
+    def report():
+        if on_progress:
+            on_progress(list(rows.values()))
+
+    report()
+    started = time.perf_counter()
+    script = get_claude_response(
+        VIDEO_PACKAGE_SCRIPT_TASK.format(platform=platform, persona=persona, cta=cta),
+        api_key,
+        tier,
+        max_tokens=video_output_budget(duration),
+        cached_prefix=brief
+    )
+    rows["script"]["Seconds"] = round(time.perf_counter() - started, 2)
+    if script.startswith("ERROR"):
+        rows["script"]["Status"] = "❌ Failed"
+        report()
+        return script, list(rows.values()), [rows["script"]["Stage"]]
+    rows["script"]["Status"] = "✅ Done"
+
+    script_prefix = f"APPROVED VIDEO SCRIPT:\n\n{script}"
+    # One stage writes the brief + script cache entry; the rest start once it responds and read it
+    lead = VIDEO_PACKAGE_STAGES[0]["key"] if prefix_cacheable([brief, script_prefix], tier) else None
+    jobs = {}
+    for stage in VIDEO_PACKAGE_STAGES:
+        rows[stage["key"]]["Status"] = "🔄 Running"
+        jobs[stage["key"]] = (lambda stage=stage: get_claude_response(
+            video_stage_prompt(stage, platform),
+            api_key,
+            tier,
+            max_tokens=stage["max_tokens"] or video_output_budget(duration),
+            cached_prefix=[brief, script_prefix]
+        ))
+    report()
+
+    def on_queue(key, position, eta):
+        rows[key]["Status"] = f"⏳ Queued: {queued_status(position, eta)}" if position else "🔄 Running"
+        report()
+
+    sections = {}
+    for key, section, seconds in run_concurrently(jobs, on_queue, lead):
+        rows[key]["Seconds"] = round(seconds, 2)
+        rows[key]["Status"] = "❌ Failed" if section.startswith("ERROR") else "✅ Done"
+        sections[key] = section
+        report()
+
+    total = time.perf_counter() - started
+    rows["total"] = {"Stage": "⏱️ Total (wall clock)", "Status": "", "Seconds": round(total, 2)}
+    report()
+    get_telemetry().record_event(
+        "video_package_dag",
+        total_seconds=round(total, 2),
+        serial_seconds=round(sum(r["Seconds"] or 0 for k, r in rows.items() if k != "total"), 2),
+        stages={k: r["Seconds"] for k, r in rows.items() if k != "total"}
+    )
+    package = [script]
+    failed = []
+    for stage in VIDEO_PACKAGE_STAGES:
+        section = sections[stage["key"]]
+        if section.startswith("ERROR"):
+            section = f"## {stage['label']}\n\n_This stage failed: {section}_"
+            failed.append(stage["label"])
+        package.append(section)
+    return "\n\n---\n\n".join(package), list(rows.values()), failed
+
+# Local script parsing - typed timeline, captions and edit decision lists without an API call
+SPOKEN_WORDS_PER_MINUTE = 150
+CAPTION_LINE_CHARS = 42
+CAPTION_MAX_WORDS = 14
+CUE_KINDS = {
+    "VISUAL": "visual",
+    "B-ROLL": "visual",
+    "TEXT ON SCREEN": "text_on_screen",
+    "ON-SCREEN TEXT": "text_on_screen",
+    "TRANSITION": "transition",
+    "MUSIC": "audio",
+    "SFX": "audio"
+}
+CUE_PATTERN = re.compile(r"\[(" + "|".join(re.escape(k) for k in CUE_KINDS) + r")\s*:\s*([^\]]*)\]", re.IGNORECASE)
+SCRIPT_HEADING_PATTERN = re.compile(r"^#{3,6}\s+(.+?)\s*$")
+SCRIPT_BOLD_HEADER_PATTERN = re.compile(r"^\*\*([^*]+?)\*\*\s*:?\s*$")
+LINE_TIMESTAMP_PATTERN = re.compile(
+    r"^[\s*_>\-]*[\[(]?(\d{1,2}):(\d{2})(?:\s*[-–]\s*(\d{1,2}):(\d{2}))?[\])]?\s*\**\s*[-–—:|]?\s*\**\s*"
+)
+CLOCK_RANGE_PATTERN = re.compile(r"(\d{1,2}):(\d{2})\s*[-–]\s*(\d{1,2}):(\d{2})")
+SECONDS_RANGE_PATTERN = re.compile(r"(\d+)\s*[-–]\s*(\d+)\s*s(?:ec|econds?)?\b", re.IGNORECASE)
+SECONDS_LEAD_RANGE_PATTERN = re.compile(r"seconds?\s+(\d+)\s*[-–]\s*(\d+)", re.IGNORECASE)
+FIRST_SECONDS_PATTERN = re.compile(r"first\s+(\d+)\s*s", re.IGNORECASE)
+FINAL_SECONDS_PATTERN = re.compile(r"(?:final|last)\s+(?:(\d+)\s*[-–]\s*)?(\d+)\s*s", re.IGNORECASE)
+PAUSE_PATTERN = re.compile(r"[\[(]\s*(?:long\s+|short\s+)?(?:pause|beat)\b", re.IGNORECASE)
+SPEAKER_LABEL_PATTERN = re.compile(r"^(?:[A-Z][A-Za-z/ ]{0,24}|VO|V\.O\.)(?:\s*\([^)]*\))?\s*:\s+")
+DIRECTION_PATTERN = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+
+@dataclass
+class ScriptCue:
+    kind: str
+    text: str
+    offset_words: int = 0
+    at: float = 0.0
+
+@dataclass
+class ScriptSegment:
+    label: str
+    start: float = None
+    end: float = None
+    duration_hint: float = None
+    timed: bool = False
+    pauses: int = 0
+    lines: list = field(default_factory=list)
+    cues: list = field(default_factory=list)
+    source_lines: list = field(default_factory=list)
+
+    @property
+    def words(self):
+        return sum(len(line.split()) for line in self.lines)
+
+    @property
+    def duration(self):
+        return (self.end or 0.0) - (self.start or 0.0)
+
+    @property
+    def slot(self):
+        """Seconds the script itself allots to this segment, if it says"""
+        if self.timed:
+            return self.end - self.start
+        return self.duration_hint
+
+    def cues_of(self, kind):
+        return [cue.text for cue in self.cues if cue.kind == kind]
+
+@dataclass
+class ScriptTimeline:
+    title: str
+    segments: list
+
+    @property
+    def duration(self):
+        return self.segments[-1].end if self.segments else 0.0
+
+def extract_script_body(script_text):
+    """(line number, line) pairs of the script section only - stops at the first rule or level-2 heading after it starts"""
+    lines = script_text.splitlines()
+    start = next((i + 1 for i, line in enumerate(lines) if re.match(r"^##\s.*VIDEO SCRIPT", line, re.IGNORECASE)), 0)
+    body = []
+    for number in range(start, len(lines)):
+        stripped = lines[number].strip()
+        if body and (stripped == "---" or re.match(r"^##\s", stripped)):
+            break
+        body.append((number, stripped))
+    return body
+
+def parse_header_times(header):
+    """(start, end, duration_hint) from a section header like "HOOK (0-3 seconds)" or "CTA (Final 5-10 seconds)" """
+    clock = CLOCK_RANGE_PATTERN.search(header)
+    if clock:
+        a, b, c, d = map(int, clock.groups())
+        return a * 60 + b, c * 60 + d, None
+    final = FINAL_SECONDS_PATTERN.search(header)
+    if final:
+        return None, None, float(final.group(2))
+    first = FIRST_SECONDS_PATTERN.search(header)
+    if first:
+        return 0.0, float(first.group(1)), None
+    seconds = SECONDS_LEAD_RANGE_PATTERN.search(header) or SECONDS_RANGE_PATTERN.search(header)
+    if seconds:
+        return float(seconds.group(1)), float(seconds.group(2)), None
+    return None, None, None
+
+def clean_spoken_line(line):
+    """Strip markdown, list markers, speaker labels and stage directions from a script line"""
+    text = re.sub(r"[*_`]+", "", line)
+    text = re.sub(r"^\s*(?:[-•>]|\d+[.)])\s+", "", text)
+    text = SPEAKER_LABEL_PATTERN.sub("", text)
+    text = DIRECTION_PATTERN.sub("", text)
+    return text.strip().strip('"“”').strip()
+
+def parse_video_script(script_text, title="Video script"):
+    """Turn a generated script into a typed timeline of segments, cues and spoken lines"""
+    segments = []
+    section = "Intro"
+    current = None
+
+    def open_segment(label, start=None, end=None, hint=None):
+        segment = ScriptSegment(label=label, start=start, end=end, duration_hint=hint,
+                                timed=start is not None and end is not None)
+        segments.append(segment)
+        return segment
+
+    for number, line in extract_script_body(script_text):
+        if not line or line.startswith("|"):
+            continue
+        header = SCRIPT_HEADING_PATTERN.match(line) or SCRIPT_BOLD_HEADER_PATTERN.match(line)
+        if header:
+            section = header.group(1).rstrip(":").strip()
+            start, end, hint = parse_header_times(section)
+            current = open_segment(re.sub(r"\s*\([^)]*\)", "", section).strip() or section, start, end, hint)
+            continue
+        stamp = LINE_TIMESTAMP_PATTERN.match(line)
+        if stamp and stamp.group(1) is not None:
+            start = int(stamp.group(1)) * 60 + int(stamp.group(2))
+            end = int(stamp.group(3)) * 60 + int(stamp.group(4)) if stamp.group(3) else None
+            label = re.sub(r"\s*\([^)]*\)", "", section).strip()
+            if current is not None and not current.lines and not current.cues and current.label == label:
+                current.start, current.end = start, end  # timestamp straight under its header
+                current.timed = end is not None
+            else:
+                current = open_segment(label, start, end)
+            line = line[stamp.end():]
+        if current is None:
+            current = open_segment(section)
+        current.source_lines.append(number)
+        current.pauses += len(PAUSE_PATTERN.findall(line))
+        for kind, text in CUE_PATTERN.findall(line):
+            current.cues.append(ScriptCue(CUE_KINDS[kind.upper()], text.strip(), current.words))
+        spoken = clean_spoken_line(CUE_PATTERN.sub("", line))
+        if re.search(r"[A-Za-z]", spoken):
+            current.lines.append(spoken)
+
+    segments = [segment for segment in segments if segment.lines or segment.cues]
+    time_segments(segments)
+    return ScriptTimeline(title=title, segments=segments)
+
+# Runtime estimation - cue allowances on top of spoken time
+CUE_SECONDS = {"transition": 0.5}
+PAUSE_SECONDS = 1.0
+ON_SCREEN_READING_WORDS_PER_SECOND = 3.0
+DURATION_TOLERANCE = 0.05
+MAX_TRIM_SHARE = 0.4
+
+def estimate_segment_seconds(segment, words_per_minute=SPOKEN_WORDS_PER_MINUTE):
+    """Runtime of a segment: spoken time (or on-screen reading time if longer) plus pauses and transitions"""
+    spoken = segment.words / words_per_minute * 60
+    reading = sum(len(text.split()) for text in segment.cues_of("text_on_screen")) / ON_SCREEN_READING_WORDS_PER_SECOND
+    cues = sum(CUE_SECONDS.get(cue.kind, 0.0) for cue in segment.cues)
+    return max(spoken, reading) + segment.pauses * PAUSE_SECONDS + cues
+
+def time_segments(segments):
+    """Fill in missing start/end times sequentially and place each cue inside its segment"""
+    cursor = 0.0
+    for segment in segments:
+        if segment.start is None or segment.start < cursor - 0.5:
+            segment.start = cursor
+        if segment.end is None or segment.end <= segment.start:
+            estimate = estimate_segment_seconds(segment)
+            segment.end = segment.start + max(estimate, segment.duration_hint or 0.0, 1.0)
+        cursor = segment.end
+        words = segment.words or 1
+        for cue in segment.cues:
+            cue.at = segment.start + segment.duration * min(cue.offset_words, words) / words
+
+def caption_chunks(segment):
+    """(start, end, text) captions for a segment, split at CAPTION_MAX_WORDS and timed by word share"""
+    chunks = []
+    for line in segment.lines:
+        words = line.split()
+        for i in range(0, len(words), CAPTION_MAX_WORDS):
+            chunks.append(words[i:i + CAPTION_MAX_WORDS])
+    total = sum(len(chunk) for chunk in chunks) or 1
+    cursor = segment.start
+    captions = []
+    for chunk in chunks:
+        end = cursor + segment.duration * len(chunk) / total
+        captions.append((cursor, end, wrap_caption(" ".join(chunk))))
+        cursor = end
+    return captions
+
+def wrap_caption(text):
+    """Break a caption onto at most two lines of about CAPTION_LINE_CHARS"""
+    if len(text) <= CAPTION_LINE_CHARS:
+        return text
+    split = text.rfind(" ", 0, len(text) // 2 + CAPTION_LINE_CHARS // 4)
+    return text if split <= 0 else f"{text[:split]}\n{text[split + 1:]}"
+
+def format_timecode(seconds, separator=","):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+def timeline_to_srt(timeline):
+    captions = [caption for segment in timeline.segments for caption in caption_chunks(segment)]
+    return "\n".join(
+        f"{i}\n{format_timecode(start)} --> {format_timecode(end)}\n{text}\n"
+        for i, (start, end, text) in enumerate(captions, start=1)
+    )
+
+def timeline_to_vtt(timeline):
+    captions = [caption for segment in timeline.segments for caption in caption_chunks(segment)]
+    return "WEBVTT\n\n" + "\n".join(
+        f"{format_timecode(start, '.')} --> {format_timecode(end, '.')}\n{text}\n" for start, end, text in captions
+    )
+
+def timeline_to_edl(timeline, target="manual"):
+    """Edit decision list: CSV for manual editing, scene JSON for HeyGen or Synthesia"""
+    if target == "heygen":
+        return json.dumps({
+            "title": timeline.title,
+            "video_inputs": [
+                {
+                    "character": {"type": "avatar", "avatar_id": "<avatar_id>"},
+                    "voice": {"type": "text", "voice_id": "<voice_id>", "input_text": " ".join(segment.lines)},
+                    "background": {"type": "color", "value": "#FFFFFF"},
+                    "scene": segment.label,
+                    "duration_seconds": round(segment.duration, 1),
+                    "b_roll": segment.cues_of("visual"),
+                    "text_overlays": segment.cues_of("text_on_screen"),
+                    "transition": (segment.cues_of("transition") or ["cut"])[0]
+                }
+                for segment in timeline.segments if segment.lines
+            ]
+        }, indent=2)
+    if target == "synthesia":
+        return json.dumps({
+            "title": timeline.title,
+            "input": [
+                {
+                    "scriptText": " ".join(segment.lines),
+                    "avatar": "<avatar>",
+                    "background": "off_white",
+                    "scene": segment.label,
+                    "duration_seconds": round(segment.duration, 1),
+                    "b_roll": segment.cues_of("visual"),
+                    "text_overlays": segment.cues_of("text_on_screen"),
+                    "transition": (segment.cues_of("transition") or ["cut"])[0]
+                }
+                for segment in timeline.segments if segment.lines
+            ]
+        }, indent=2)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Event", "Segment", "Start", "End", "Duration (s)", "Spoken", "Visual / B-roll", "Text on screen", "Transition", "Audio"])
+    for event, segment in enumerate(timeline.segments, start=1):
+        writer.writerow([
+            event, segment.label, format_timecode(segment.start), format_timecode(segment.end), round(segment.duration, 1),
+            " ".join(segment.lines), " | ".join(segment.cues_of("visual")), " | ".join(segment.cues_of("text_on_screen")),
+            " | ".join(segment.cues_of("transition")), " | ".join(segment.cues_of("audio"))
+        ])
+    return buffer.getvalue()
+
+def timeline_rows(timeline):
+    """Table rows for showing a parsed timeline"""
+    return [
+        {
+            "Segment": segment.label,
+            "Start": format_timecode(segment.start)[3:8],
+            "End": format_timecode(segment.end)[3:8],
+            "Words": segment.words,
+            "Visuals": len(segment.cues_of("visual")),
+            "On-screen text": len(segment.cues_of("text_on_screen")),
+            "Transitions": len(segment.cues_of("transition"))
+        }
+        for segment in timeline.segments
+    ]
+
+def deferred(payload):
+    """Download data as a callable: Streamlit only asks for it when the button is clicked
+
+    Passing bytes or text directly registers a copy in the media file manager on every rerun.
+    """
+    return lambda: payload
+
+# (file suffix, button label, mime type, writer) for each local export of a parsed script
+SCRIPT_EXPORTS = [
+    (".srt", "📥 SRT", "application/x-subrip", timeline_to_srt),
+    (".vtt", "📥 VTT", "text/vtt", timeline_to_vtt),
+    ("_edl.csv", "📥 EDL (manual)", "text/csv", partial(timeline_to_edl, target="manual")),
+    ("_heygen.json", "📥 HeyGen scenes", "application/json", partial(timeline_to_edl, target="heygen")),
+    ("_synthesia.json", "📥 Synthesia scenes", "application/json", partial(timeline_to_edl, target="synthesia"))
+]
+
+def script_export_files(timeline, stem):
+    """(file name, data, mime) for every local export of a parsed script"""
+    return [(f"{stem}{suffix}", writer(timeline), mime) for suffix, _, mime, writer in SCRIPT_EXPORTS]
+
+def script_export_archive(items, store=None):
+    """ZIP of captions and edit decision lists for many history scripts, parsed locally in one pass"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for number, item in enumerate(items, start=1):
+            stem = f"{number:03d}_{file_slug(item['topic'])}"
+            timeline = parse_video_script(history_content(item, store), title=item["topic"])
+            if not timeline.segments:
+                continue
+            for file_name, data, _ in script_export_files(timeline, stem):
+                archive.writestr(f"{stem}/{file_name}", data)
+    return buffer.getvalue()
+
+def render_script_exports(script_text, stem, key, in_expander=True):
+    """Parsed timeline plus caption / EDL downloads for a generated script - no API call"""
+    timeline = parse_video_script(script_text, title=stem)
+    if not timeline.segments:
+        return timeline
+    summary = f"🧾 Timeline, captions & edit decision list ({len(timeline.segments)} segments, ~{timeline.duration:.0f}s)"
+    # Expanders cannot be nested, so history items get a plain container
+    with st.expander(summary) if in_expander else st.container():
+        if in_expander:
+            st.dataframe(timeline_rows(timeline), hide_index=True, use_container_width=True)
+        else:
+            st.caption(summary)
+        export_cols = st.columns(len(SCRIPT_EXPORTS))
+        for export_col, (suffix, label, mime, writer) in zip(export_cols, SCRIPT_EXPORTS):
+            with export_col:
+                # Files are written only when clicked, not registered with the media manager every rerun
+                st.download_button(label, data=partial(writer, timeline), file_name=f"{stem}{suffix}", mime=mime,
+                                   key=f"export_{key}_{stem}{suffix}", use_container_width=True)
+    return timeline
+
+def plan_script_fit(timeline, target_seconds, words_per_minute=SPOKEN_WORDS_PER_MINUTE):
+    """Runtime estimate per segment and {segment index: seconds to trim it to} so the script fits
+
+    Segments that overrun the slot the script gives them are always trimmed to that slot. If the whole
+    script still runs over the target, the longest segments without a slot absorb the rest (at most
+    MAX_TRIM_SHARE of each); segments that fit their own slot are only touched as a last resort.
+    """
+    estimates = [estimate_segment_seconds(segment, words_per_minute) for segment in timeline.segments]
+    trims = {}
+    for index, (segment, estimate) in enumerate(zip(timeline.segments, estimates)):
+        if segment.slot and estimate > segment.slot * (1 + DURATION_TOLERANCE):
+            trims[index] = segment.slot
+    projected = sum(trims.get(index, estimate) for index, estimate in enumerate(estimates))
+    if target_seconds and projected > target_seconds * (1 + DURATION_TOLERANCE):
+        over = projected - target_seconds
+        candidates = sorted(
+            (i for i in range(len(estimates)) if i not in trims),
+            key=lambda i: (timeline.segments[i].slot is not None, -estimates[i])
+        )
+        for index in candidates:
+            if over <= 0:
+                break
+            cut = min(over, estimates[index] * MAX_TRIM_SHARE)
+            trims[index] = estimates[index] - cut
+            over -= cut
+    return {"total": sum(estimates), "target": target_seconds, "estimates": estimates, "trims": trims}
+
+def segment_source(script_text, segment):
+    """The original script lines a segment was parsed from, cues and timestamps included"""
+    lines = script_text.splitlines()
+    return "\n".join(lines[min(segment.source_lines):max(segment.source_lines) + 1])
+
+def build_trim_prompt(script_text, timeline, plan, words_per_minute=SPOKEN_WORDS_PER_MINUTE):
+    """Short prompt that rewrites only the overrunning segments"""
+    blocks = []
+    for number, (index, seconds) in enumerate(sorted(plan["trims"].items()), start=1):
+        segment = timeline.segments[index]
+        # Pauses and transitions keep their time, so only the spoken part shrinks
+        allowance = plan["estimates"][index] - segment.words / words_per_minute * 60
+        max_words = max(3, int((seconds - max(allowance, 0.0)) / 60 * words_per_minute))
+        blocks.append(
+            f"### SEGMENT {number} - {segment.label} (at most {max_words} spoken words, currently {segment.words})\n"
+            f"{segment_source(script_text, segment)}"
+        )
+    segments = "\n\n".join(blocks)
+    return f"""You are trimming a video script so it fits its time slot. Rewrite ONLY the segments below so each one
+stays within its spoken word limit. Keep the meaning, the hook and the call-to-action. Keep every timestamp and every
+[VISUAL: ...], [TEXT ON SCREEN: ...] and [TRANSITION: ...] cue (shorten on-screen text if needed), and keep the same line format.
+Return each segment under the same "### SEGMENT n" heading and nothing else.
+
+{segments}"""
+
+def apply_script_trims(script_text, timeline, plan, response):
+    """Splice trimmed segments back into the script; returns (new script, segments replaced)"""
+    rewritten = {}
+    parts = re.split(r"^###\s*SEGMENT\s+(\d+)[^\n]*\n", response, flags=re.MULTILINE)
+    for number, text in zip(parts[1::2], parts[2::2]):
+        rewritten[int(number)] = text.strip()
+    lines = script_text.splitlines()
+    replaced = 0
+    ordered = sorted(plan["trims"])
+    # Replace from the bottom up so earlier line numbers stay valid
+    for number, index in sorted(enumerate(ordered, start=1), key=lambda pair: -pair[1]):
+        if not rewritten.get(number):
+            continue
+        source = timeline.segments[index].source_lines
+        lines[min(source):max(source) + 1] = rewritten[number].splitlines()
+        replaced += 1
+    return "\n".join(lines), replaced
+
+def format_runtime(seconds):
+    return f"{int(seconds // 60)}:{int(round(seconds % 60)):02d}"
+
+def render_script_fit(tab_key):
+    """Estimated runtime of the last generated script against its selected duration, with trim-to-fit"""
+    fit = st.session_state.get(f"script_fit_{tab_key}")
+    history = st.session_state.generated_content
+    if not fit or fit["position"] >= len(history):
+        return
+    item = history[fit["position"]]
+    script = history_content(item)
+    target = duration_to_seconds(fit["duration"])
+    timeline = parse_video_script(script, title=item["topic"])
+    if not target or not timeline.segments:
+        return
+    st.markdown("### ⏱️ Runtime Check")
+    words_per_minute = st.slider(
+        "🗣️ Speaking rate (words per minute)", 110, 190, SPOKEN_WORDS_PER_MINUTE, 5, key=f"speaking_rate_{tab_key}"
+    )
+    plan = plan_script_fit(timeline, target, words_per_minute)
+    message = (f"Estimated runtime **{format_runtime(plan['total'])}** vs target **{format_runtime(target)}** "
+               f"({(plan['total'] - target) / target:+.0%})")
+    if plan["total"] > target * (1 + DURATION_TOLERANCE):
+        st.warning(f"⚠️ {message} - the script runs over its slot")
+    else:
+        st.success(f"✅ {message}")
+    st.dataframe([
+        {
+            "Segment": segment.label,
+            "Words": segment.words,
+            "Estimate (s)": round(estimate, 1),
+            "Slot (s)": round(segment.slot, 1) if segment.slot else None,
+            "Trim to (s)": round(plan["trims"][index], 1) if index in plan["trims"] else None
+        }
+        for index, (segment, estimate) in enumerate(zip(timeline.segments, plan["estimates"]))
+    ], hide_index=True, use_container_width=True)
+
+    if item.get("trimmed_from"):
+        with st.expander(f"✂️ Trimmed script (was ~{format_runtime(item['trimmed_from'])})", expanded=True):
+            st.markdown(script)
+            st.download_button("📥 Download Trimmed Script", data=deferred(script),
+                               file_name=f"video_script_trimmed_{datetime.now().strftime('%Y%m%d_%H%M')}.md",
+                               mime="text/markdown", key=f"download_trimmed_{tab_key}")
+            render_script_exports(script, "video_script_trimmed", f"trimmed_{tab_key}", in_expander=False)
+
+    if plan["trims"] and st.button(f"✂️ Trim {len(plan['trims'])} overrunning segment(s) to fit", key=f"trim_{tab_key}"):
+        prompt = build_trim_prompt(script, timeline, plan, words_per_minute)
+        source_chars = sum(len(segment_source(script, timeline.segments[i])) for i in plan["trims"])
+        with st.spinner("✂️ Trimming only the segments that run over..."):
+            response = get_claude_response(
+                prompt,
+                st.session_state.api_key,
+                route_model_tier("video_scripts", None, source_chars),
+                max_tokens=size_output_budget(chars_to_tokens(source_chars), "trim")
+            )
+        if response.startswith("ERROR"):
+            st.error(response)
+            return
+        trimmed, replaced = apply_script_trims(script, timeline, plan, response)
+        if not replaced:
+            st.error("The trim response did not contain any of the requested segments - the script was left unchanged.")
+            return
+        get_telemetry().increment("script_segments_trimmed", replaced)
+        add_to_history({
+            **{key: value for key, value in item.items() if key not in ("near_duplicates", "from_cache")},
+            "content": trimmed,
+            "trimmed_from": plan["total"],
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
+        }, base=fit["position"])
+        st.session_state[f"script_fit_{tab_key}"] = {**fit, "position": len(st.session_state.generated_content) - 1}
+        st.rerun()
+
+# Video generation packages - deterministic parts are built locally from the user's own script and
+# settings; the API is only asked for the creative extras (alternative prompts, B-roll and thumbnail ideas)
+CREATIVE_EXTRAS_MAX_TOKENS = 700
+CREATIVE_EXTRAS_FAILED = "_Creative extras unavailable: "  # starts the note left in a package when extras fail
+BRAND_COLORS = {"Primary": "#4B0082", "Accent": "#9370DB", "Highlight": "#7B68EE"}
+PLATFORM_VIDEO_SPECS = [
+    {"Platform": "YouTube", "Aspect": "16:9", "Resolution": "1920x1080", "Max length": "No limit (2-5 min ideal)"},
+    {"Platform": "LinkedIn", "Aspect": "1:1 or 16:9", "Resolution": "1080x1080", "Max length": "10 min (30-90s ideal)"},
+    {"Platform": "Instagram Reels", "Aspect": "9:16", "Resolution": "1080x1920", "Max length": "90s"},
+    {"Platform": "TikTok", "Aspect": "9:16", "Resolution": "1080x1920", "Max length": "10 min (15-60s ideal)"},
+    {"Platform": "Facebook", "Aspect": "4:5 or 1:1", "Resolution": "1080x1350", "Max length": "240 min (1-2 min ideal)"}
+]
+ASPECT_USE_CASES = {
+    "16:9": "YouTube, LinkedIn and website embeds",
+    "9:16": "TikTok, Instagram Reels and YouTube Shorts",
+    "1:1": "LinkedIn and Instagram feed posts",
+    "4:5": "Instagram and Facebook feed posts"
+}
+RUNWAY_CAMERA_MOVES = {
+    "Static": "Locked-off static camera",
+    "Subtle": "Slow subtle push-in",
+    "Moderate": "Smooth tracking shot",
+    "Dynamic": "Dynamic handheld follow shot",
+    "Dramatic": "Dramatic sweeping crane move"
+}
+RUNWAY_STYLE_LOOKS = {
+    "Cinematic / Film": ("cinematic lighting, shallow depth of field, anamorphic film look, 35mm grain",
+                         "Orchestral ambient, slow build"),
+    "Corporate / Professional": ("bright even office lighting, clean composition, natural colors",
+                                 "Light corporate piano and strings"),
+    "Modern / Tech": ("cool blue and purple tones, crisp detail, soft glow on screens",
+                      "Minimal electronic pulse"),
+    "Documentary": ("natural available light, observational framing, true-to-life color",
+                    "Understated acoustic guitar"),
+    "Commercial / Ad": ("polished high-key lighting, vivid colors, hero product framing",
+                        "Upbeat modern pop instrumental"),
+    "Abstract / Artistic": ("stylized colors, soft surreal lighting, graphic shapes",
+                            "Atmospheric synth textures")
+}
+NEGATIVE_PROMPT_TERMS = ["blurry", "distorted faces", "extra fingers", "warped text", "watermark",
+                         "low resolution", "flicker", "cartoonish"]
+PIKA_MOTION_WORDS = {1: "nearly still", 2: "gentle movement", 3: "natural movement", 4: "energetic movement",
+                     5: "fast dynamic movement"}
+SYNTHESIA_LANGUAGE_VOICES = {
+    "English (US)": "en-US", "English (UK)": "en-GB", "Spanish": "es-ES", "French": "fr-FR", "German": "de-DE"
+}
+MANUAL_EXPORT_SECTIONS = {
+    "Complete Production Brief (PDF-ready)": ["brief", "script", "storyboard", "shots", "audio", "branding", "specs", "versions", "schedule"],
+    "Storyboard Document": ["brief", "storyboard"],
+    "Shot List + Script": ["script", "shots"],
+    "Social Media Package (All Platforms)": ["brief", "versions", "specs"],
+    "Agency Brief": ["brief", "storyboard", "audio", "branding", "specs", "versions", "schedule"]
+}
+
+def file_slug(text, limit=40):
+    """Lowercase file-name-safe slug"""
+    return re.sub(r"[^a-z0-9]+", "_", (text or "").lower()).strip("_")[:limit] or "video"
+
+def script_scenes(script_text, title="Video script"):
+    """Timeline of a pasted script - parsed segments, or one scene per paragraph for plain scripts"""
+    timeline = parse_video_script(script_text, title=title)
+    if len(timeline.segments) > 1:
+        return timeline
+    segments = []
+    for number, paragraph in enumerate(p for p in re.split(r"\n\s*\n", script_text) if p.strip()):
+        for segment in parse_video_script(paragraph).segments:
+            segment.label = f"Scene {number + 1}"
+            segment.start = segment.end = None
+            segment.timed = False
+            segments.append(segment)
+    time_segments(segments)
+    return ScriptTimeline(title=title, segments=segments)
+
+def scene_time(segment):
+    return f"{format_runtime(segment.start)}-{format_runtime(segment.end)}"
+
+def markdown_table(rows):
+    """Render a list of dicts as a markdown table"""
+    if not rows:
+        return ""
+    headers = list(rows[0])
+    lines = ["| " + " | ".join(headers) + " |", "|" + "|".join("---" for _ in headers) + "|"]
+    for row in rows:
+        lines.append("| " + " | ".join(str(row[h]).replace("|", "/").replace("\n", " ") for h in headers) + " |")
+    return "\n".join(lines)
+
+def formatted_script(timeline):
+    """Script with scene headers, timing marks and pause markers"""
+    blocks = []
+    for number, segment in enumerate(timeline.segments, start=1):
+        label = "" if segment.label == f"Scene {number}" else f" · {segment.label}"
+        lines = [f"**Scene {number} · {scene_time(segment)}{label}**"]
+        lines += [f"> {line}" for line in segment.lines]
+        lines += ["> ⏸️ *(pause 1s)*"] * segment.pauses
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+def creative_request(script_text, task):
+    """(prefix, task) for a creative-extras call; the prefix is the script, which providers building packages
+    for the same script send identically (see cache_warming_lead)"""
+    return f"VIDEO SCRIPT / SCENE:\n{script_text.strip()}", (
+        "You are a creative director for B2B legal-technology video marketing. Based on the material above, "
+        f"{task} Be concise - short bullet points, no preamble."
+    )
+
+def build_heygen_package(script_text, avatar, voice, length, background, captions, logo, brand):
+    """Local HeyGen package: formatted script, scene breakdown, settings, scene JSON and file names"""
+    timeline = script_scenes(script_text, title=f"{brand} HeyGen video")
+    target = duration_to_seconds(length) or timeline.duration
+    estimate = sum(estimate_segment_seconds(segment) for segment in timeline.segments)
+    # Speed the voice up a little when the script runs long, within what still sounds natural
+    speed = min(1.2, max(1.0, estimate / target)) if target else 1.0
+    last = len(timeline.segments)
+    scene_rows = []
+    for number, segment in enumerate(timeline.segments, start=1):
+        visuals = segment.cues_of("visual")
+        if number == last:
+            framing = "Avatar centered, end card with CTA and logo"
+        elif visuals:
+            framing = "Avatar picture-in-picture (bottom right) over B-roll"
+        else:
+            framing = "Avatar centered, direct to camera"
+        scene_rows.append({
+            "Scene": number, "Time": scene_time(segment), "Avatar": framing,
+            "Spoken": " ".join(segment.lines) or "—",
+            "On-screen text": " / ".join(segment.cues_of("text_on_screen")) or "—",
+            "B-roll": " / ".join(visuals) or "—"
+        })
+    scene_json = json.loads(timeline_to_edl(timeline, "heygen"))
+    for scene in scene_json["video_inputs"]:
+        scene["voice"]["speed"] = round(speed, 2)
+    stem = f"{file_slug(brand)}_heygen_{datetime.now().strftime('%Y%m%d')}"
+    package = f"""# 🎭 HeyGen Video Package
+
+**Avatar:** {avatar} · **Voice:** {voice} · **Background:** {background}
+**Target length:** {length} · **Script runs:** ~{format_runtime(estimate)} at {SPOKEN_WORDS_PER_MINUTE} wpm · **Scenes:** {len(timeline.segments)}
+
+## 1. 📝 Formatted Script
+
+{formatted_script(timeline)}
+
+## 2. 🎬 Scene Breakdown
+
+{markdown_table(scene_rows)}
+
+## 3. ⚙️ HeyGen Settings
+
+- **Avatar:** {avatar}
+- **Voice:** {voice} · speed {speed:.2f}x
+- **Background:** {background}
+- **Aspect ratio / resolution:** 16:9 · 1920x1080 (duplicate as 9:16 for Reels/TikTok)
+- **Captions:** {"On - burn in, brand font, bottom third" if captions else "Off"}
+- **Logo:** {"Top-right watermark, 8% width, 80% opacity" if logo else "None"}
+
+## 4. 🧩 Scene JSON (API / bulk import)
+
+```json
+{json.dumps(scene_json, indent=2)}
+```
+
+## 5. 📁 File Naming
+
+- Master: `{stem}_master_v1.mp4`
+- Scenes: `{stem}_scene01.mp4` … `{stem}_scene{len(timeline.segments):02d}.mp4`
+- Captions: `{stem}.srt`
+
+## 6. ✂️ Post-Production Checklist
+
+- Trim the avatar's lead-in and tail on every scene
+- Add B-roll inserts where the scene breakdown lists them
+- Check caption line breaks against on-screen text
+- Add end card with CTA and logo for the last 3 seconds
+- Export master, then 9:16 and 1:1 cuts"""
+    task = ("suggest one B-roll insert idea per scene (reference the scene number) and 3 thumbnail concepts "
+            "(text overlay, expression, background).")
+    return package, creative_request(script_text, task)
+
+def build_runway_package(scene, duration, style, motion, brand, script_text=None):
+    """Local Runway Gen-3 package: structured prompt, negative prompt, camera, clip plan and soundtrack"""
+    look, soundtrack = RUNWAY_STYLE_LOOKS.get(style, RUNWAY_STYLE_LOOKS["Corporate / Professional"])
+    camera = RUNWAY_CAMERA_MOVES.get(motion, RUNWAY_CAMERA_MOVES["Subtle"])
+    seconds = duration_to_seconds(duration) or 4
+    # Gen-3 renders 5 or 10 second clips; longer requests are planned as a sequence of extended clips
+    units = math.ceil(seconds / 5)
+    clips = [10] * (units // 2) + [5] * (units % 2)
+    clip_rows = [
+        {"Clip": number, "Length": f"{length}s",
+         "Use": "Generate from prompt" if number == 1 else "Extend previous clip (same prompt, keep seed)"}
+        for number, length in enumerate(clips, start=1)
+    ]
+    prompt = f"{camera}: {scene.strip().rstrip('.')}. {look.capitalize()}."
+    package = f"""# 🎨 Runway Gen-3 Package
+
+## 1. ✨ Optimized Prompt
+
+```
+{prompt}
+```
+
+## 2. 🚫 Negative Prompt
+
+```
+{", ".join(NEGATIVE_PROMPT_TERMS)}
+```
+
+## 3. 🎥 Camera Settings
+
+- **Movement:** {camera} ({motion})
+- **Style:** {style}
+- **Aspect ratio:** 16:9 (1280x768 render, upscale to 4K in Runway)
+- **Seed:** lock the seed of your favorite take before extending
+
+## 4. 🎞️ Clip Sequence ({duration})
+
+{markdown_table(clip_rows)}
+
+## 5. ✂️ Post-Production
+
+- Use as B-roll under voiceover or between talking-head scenes
+- Add a 6-frame cross-dissolve between extended clips
+- Overlay {brand} logo and on-screen text in the editor, not in the prompt
+
+## 6. 🎵 Soundtrack
+
+- {soundtrack} (royalty-free)"""
+    task = "write 3 alternative Runway Gen-3 prompts for A/B testing (different framing, lighting or subject action), one line each."
+    if script_text:
+        return package, creative_request(script_text, f"{task} Base prompt: \"{prompt}\".")
+    return package, creative_request(prompt, task)
+
+def build_pika_package(scene, aspect, motion, guidance, script_text=None):
+    """Local Pika package: formatted prompt, /create command, effects and use cases"""
+    prompt = f"{scene.strip().rstrip('.')}, {PIKA_MOTION_WORDS.get(motion, 'natural movement')}, cinematic lighting, sharp detail"
+    negative = ", ".join(NEGATIVE_PROMPT_TERMS[:5])
+    package = f"""# ⚡ Pika Package
+
+## 1. ✨ Optimized Pika Prompt
+
+```
+{prompt}
+```
+
+## 2. ⚙️ Parameters
+
+```
+/create prompt: {prompt} -ar {aspect} -motion {motion} -gs {guidance} -neg "{negative}" -fps 24
+```
+
+## 3. 🪄 Pikaffects
+
+- **Zoom/Pan camera controls** for reveal shots
+- **Lip sync** if the clip carries voiceover
+- **Modify region** to fix faces or on-screen text after generation
+
+## 4. 🎯 Best Use Cases
+
+- **{aspect}:** {ASPECT_USE_CASES.get(aspect, "Social feeds")}
+- Quick tips, stats and feature highlights under 10 seconds"""
+    task = "write 3 variations of the Pika prompt for testing (different subject action or setting), one line each."
+    if script_text:
+        return package, creative_request(script_text, f"{task} Base prompt: \"{prompt}\".")
+    return package, creative_request(prompt, task)
+
+def build_synthesia_package(script_text, avatar, language, template, branding, brand):
+    """Local Synthesia package: scene split, avatar and language settings and an API payload"""
+    timeline = script_scenes(script_text, title=f"{brand} Synthesia video")
+    payload = {
+        "title": f"{brand} - {template} video",
+        "test": True,
+        "visibility": "private",
+        "input": [
+            {
+                "scriptText": " ".join(segment.lines),
+                "avatar": "<avatar_id>",
+                "avatarSettings": {"horizontalAlign": "center", "scale": 1.0, "style": "rectangular"},
+                "background": "<background_id>"
+            }
+            for segment in timeline.segments if segment.lines
+        ]
+    }
+    scene_rows = [
+        {"Scene": number, "Time": scene_time(segment), "Words": segment.words,
+         "On-screen text": " / ".join(segment.cues_of("text_on_screen")) or "—"}
+        for number, segment in enumerate(timeline.segments, start=1)
+    ]
+    package = f"""# 🎬 Synthesia Package
+
+**Avatar:** {avatar} · **Language:** {language} ({SYNTHESIA_LANGUAGE_VOICES.get(language, "en-US")}) · **Template:** {template}
+**Runtime:** ~{format_runtime(timeline.duration)} · **Scenes:** {len(timeline.segments)}
+
+## 1. 📝 Scenes
+
+{formatted_script(timeline)}
+
+{markdown_table(scene_rows)}
+
+## 2. 🎨 Branding
+
+{f"- Logo top-right on every scene, brand colors {', '.join(BRAND_COLORS.values())}" if branding else "- No branding"}
+- Template: {template}
+
+## 3. 🧩 API Payload (POST /v2/videos)
+
+```json
+{json.dumps(payload, indent=2)}
+```
+
+## 4. ✅ Next Steps
+
+1. Open Synthesia and create a new video from the **{template}** template
+2. Select avatar: {avatar}, language: {language}
+3. Paste one scene per slide from section 1 (or send the payload above)
+4. Add branding elements and generate"""
+    return package, None
+
+def build_manual_export_package(script_text, export_format, brand):
+    """Local production package: brief, storyboard, shot list, specs and schedule from the script"""
+    timeline = script_scenes(script_text, title=f"{brand} video")
+    runtime = timeline.duration
+    sections = MANUAL_EXPORT_SECTIONS.get(export_format, MANUAL_EXPORT_SECTIONS["Complete Production Brief (PDF-ready)"])
+    shots = []
+    for number, segment in enumerate(timeline.segments, start=1):
+        scene_shots = []
+        if segment.lines:
+            scene_shots.append(("Medium close-up, presenter", f"{segment.duration:.0f}s", " ".join(segment.lines)[:120]))
+        scene_shots += [("B-roll insert", "2-4s", visual) for visual in segment.cues_of("visual")]
+        scene_shots += [("Graphic overlay", "2-3s", text) for text in segment.cues_of("text_on_screen")]
+        for letter, (framing, length, notes) in zip("ABCDEFGHIJKLMNOP", scene_shots):
+            shots.append({"Shot": f"{number}{letter}", "Framing": framing, "Duration": length, "Notes": notes})
+    storyboard = [
+        {"Scene": number, "Time": scene_time(segment), "Visual": " / ".join(segment.cues_of("visual")) or "Presenter",
+         "Audio/Voiceover": " ".join(segment.lines) or "—", "Text Overlay": " / ".join(segment.cues_of("text_on_screen")) or "—",
+         "Transition": " / ".join(segment.cues_of("transition")) or "Cut"}
+        for number, segment in enumerate(timeline.segments, start=1)
+    ]
+    edit_days = max(1, math.ceil(runtime / 60))
+    parts = {
+        "brief": f"""## 📋 Production Brief
+
+- **Brand:** {brand}
+- **Deliverable:** {export_format}
+- **Runtime:** ~{format_runtime(runtime)} across {len(timeline.segments)} scenes and {len(shots)} shots
+- **Objective:** Drive demo bookings from the call-to-action in the final scene""",
+        "script": f"## 📝 Script\n\n{formatted_script(timeline)}",
+        "storyboard": f"## 🎨 Storyboard\n\n{markdown_table(storyboard)}",
+        "shots": f"## 🎥 Shot List\n\n{markdown_table(shots)}",
+        "audio": f"""## 🎵 Audio Guide
+
+- **Voiceover:** ~{SPOKEN_WORDS_PER_MINUTE} words per minute, {sum(s.pauses for s in timeline.segments)} marked pause(s)
+- **Music:** light corporate bed at -18 LUFS under voice, lift for the CTA
+- **SFX:** soft whoosh on transitions, UI clicks on screen recordings""",
+        "branding": f"""## 🎨 Branding Guidelines
+
+- **Colors:** {", ".join(f"{name} {value}" for name, value in BRAND_COLORS.items())}
+- **Logo:** top-right watermark throughout; full logo on the end card
+- **Fonts:** clean sans-serif, on-screen text max 7 words per line""",
+        "specs": """## ⚙️ Technical Specs
+
+- **Master:** 1920x1080, 30 fps, H.264 MP4, AAC 48 kHz stereo
+- **Captions:** burned-in plus sidecar SRT/VTT
+- **Color:** Rec.709, loudness -14 LUFS integrated for social""",
+        "versions": f"## 📱 Platform Versions\n\n{markdown_table(PLATFORM_VIDEO_SPECS)}",
+        "schedule": f"""## 🗓️ Timeline
+
+- **Pre-production:** 1 day (script lock, shot list, assets)
+- **Production:** {max(1, math.ceil(len(shots) / 15))} day(s)
+- **Edit and graphics:** {edit_days} day(s)
+- **Review and platform cuts:** 1 day"""
+    }
+    package = f"# 🎯 Video Production Package - {export_format}\n\n" + "\n\n".join(parts[name] for name in sections)
+    task = "give visual reference ideas (shots, mood, lighting) for the storyboard and 3 thumbnail concepts."
+    return package, creative_request(script_text, task)
+
+def script_scene_prompt(timeline):
+    """Scene description for clip generators, taken from the script's visual cues or its opening line"""
+    visuals = [text for segment in timeline.segments for text in segment.cues_of("visual")]
+    if visuals:
+        return "; ".join(visuals[:2])
+    opening = next((line for segment in timeline.segments for line in segment.lines), "")
+    return f"Professional law office scene illustrating: {opening}" if opening else "Modern immigration law office, attorney at work"
+
+def build_provider_packages(providers, script_text, settings, brand):
+    """{provider: (local package, creative request)} for one script; every creative request has the script as prefix"""
+    timeline = script_scenes(script_text, title=f"{brand} video")
+    scene = script_scene_prompt(timeline)
+    builders = {
+        "HeyGen": lambda: build_heygen_package(
+            script_text, settings["avatar"], settings["voice"], settings["length"], settings["background"], True, True, brand
+        ),
+        "Runway": lambda: build_runway_package(
+            scene, settings["clip_duration"], settings["style"], settings["motion"], brand, script_text
+        ),
+        "Pika": lambda: build_pika_package(scene, settings["aspect"], 3, 12, script_text)
+    }
+    return {provider: builders[provider]() for provider in providers}
+
+def finish_video_package(package, creative, api_key, tier, want_creative):
+    """Append the creative extras from one short API call and count calls per package"""
+    telemetry = get_telemetry()
+    telemetry.increment("video_packages_built")
+    if not (creative and want_creative and api_key):
+        return package
+    prefix, task = creative
+    telemetry.increment("video_package_api_calls")
+    extras = get_claude_response(task, api_key, tier, max_tokens=CREATIVE_EXTRAS_MAX_TOKENS, cached_prefix=prefix)
+    if extras.startswith("ERROR"):
+        return f"{package}\n\n---\n\n{CREATIVE_EXTRAS_FAILED}{extras}_"
+    return f"{package}\n\n---\n\n## ✨ Creative Extras\n\n{extras}"
+
+def creative_extras_error(package_text):
+    """The API error a finished package's creative extras failed with, or None"""
+    if CREATIVE_EXTRAS_FAILED not in package_text:
+        return None
+    return package_text.rsplit(CREATIVE_EXTRAS_FAILED, 1)[1].rstrip("_")
+
+# Bulk history export - rows and files are streamed to disk one item at a time, and the finished file is
+# served by Streamlit's static file handler (enableStaticServing) instead of being loaded into memory. That
+# handler refuses files over 200 MB, so an export that grows past EXPORT_PART_BYTES continues in a new part file.
+EXPORT_DIR = Path(__file__).parent / "static" / "exports"
+EXPORT_URL = "app/static/exports"
+EXPORT_TTL_SECONDS = 3600
+EXPORT_PART_BYTES = 180 * 2**20  # headroom for the last Parquet row group and a ZIP central directory (~100 bytes/item)
+EXPORT_PARQUET_BATCH_ROWS = 1000
+EXPORT_FIELDS = ["number", "timestamp", "type", "platform", "persona", "goal", "topic", "content"]
+# Format label -> file extension
+EXPORT_FORMATS = {
+    "ZIP (one Markdown file per item)": "zip",
+    "JSONL": "jsonl",
+    "CSV": "csv",
+    "Parquet": "parquet"
+}
+
+def filter_history(items, types=None, platforms=None, personas=None, start=None, end=None, store=None):
+    """Yield export records for the history items matching every given filter (dates inclusive)"""
+    for number, item in enumerate(items, start=1):
+        day = item["timestamp"][:10]
+        if ((types and item["type"] not in types) or (platforms and item["platform"] not in platforms)
+                or (personas and item.get("persona") not in personas)
+                or (start and day < start.isoformat()) or (end and day > end.isoformat())):
+            continue
+        yield {"number": number, **{name: item.get(name, "") for name in EXPORT_FIELDS[1:-1]}, "content": history_content(item, store)}
+
+def history_item_markdown(record):
+    """One history item as a Markdown file with its settings as a front-matter style header"""
+    header = "\n".join(f"- **{name.title()}:** {record[name]}" for name in EXPORT_FIELDS[1:-1] if record[name])
+    return f"# {record['topic']}\n\n{header}\n\n---\n\n{record['content']}\n"
+
+def write_history_zip(records, path):
+    """ZIP with one Markdown file per record; yields each record once it's written"""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for record in records:
+            name = f"{record['number']:05d}_{file_slug(record['type'])}_{file_slug(record['topic'])}.md"
+            # Each entry is compressed straight into the archive file as it's written
+            with archive.open(name, "w") as entry:
+                entry.write(history_item_markdown(record).encode("utf-8"))
+            yield record
+
+def write_history_jsonl(records, path):
+    """One JSON object per line; yields each record once it's written"""
+    with open(path, "w", encoding="utf-8") as out:
+        for record in records:
+            out.write(json.dumps({name: record[name] for name in EXPORT_FIELDS}, ensure_ascii=False) + "\n")
+            yield record
+
+def write_history_csv(records, path):
+    """CSV with a header row; yields each record once it's written"""
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            yield record
+
+def write_history_parquet(records, path):
+    """Parquet written in row groups of EXPORT_PARQUET_BATCH_ROWS; yields each record as it's buffered"""
+    # pyarrow ships with Streamlit; imported here so only Parquet exports pay for it
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([("number", pa.int64())] + [(name, pa.string()) for name in EXPORT_FIELDS[1:]])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        batch = []
+        for record in records:
+            batch.append(record)
+            yield record
+            if len(batch) == EXPORT_PARQUET_BATCH_ROWS:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+
+HISTORY_EXPORT_WRITERS = {
+    "zip": write_history_zip,
+    "jsonl": write_history_jsonl,
+    "csv": write_history_csv,
+    "parquet": write_history_parquet
+}
+
+def remove_stale_exports(previous=None):
+    """Delete export folders older than the TTL, and the session's previous export"""
+    if not EXPORT_DIR.exists():
+        return
+    cutoff = time.time() - EXPORT_TTL_SECONDS
+    for folder in EXPORT_DIR.iterdir():
+        if folder.is_dir() and (folder.stat().st_mtime < cutoff or folder.name == previous):
+            for path in folder.iterdir():
+                path.unlink()
+            folder.rmdir()
+
+def export_history(items, extension, on_progress=None, **filters):
+    """Stream the matching history items to new files under EXPORT_DIR; returns the export's details
+
+    Each part file is complete on its own (a valid ZIP, CSV with header, JSONL or Parquet file). Folder names
+    are random tokens, so a download URL can't be guessed from another session.
+    """
+    remove_stale_exports(previous=st.session_state.get("history_export", {}).get("token"))
+    token = secrets.token_urlsafe(16)
+    stem = f"content_history_{datetime.now().strftime('%Y%m%d_%H%M')}"
+    folder = EXPORT_DIR / token
+    folder.mkdir(parents=True)
+    started = time.perf_counter()
+    records = filter_history(items, **filters)
+    state = {"next": next(records, None), "count": 0}
+
+    def part_records(path):
+        # Ends the part once its file has reached the size limit; the writer then closes it cleanly
+        while state["next"] is not None:
+            record, state["next"] = state["next"], None
+            yield record
+            state["count"] += 1
+            if on_progress and state["count"] % 500 == 0:
+                on_progress(state["count"])
+            state["next"] = next(records, None)
+            if state["next"] is not None and path.exists() and path.stat().st_size >= EXPORT_PART_BYTES:
+                return
+
+    paths = []
+    while not paths or state["next"] is not None:
+        paths.append(folder / f"{stem}_part{len(paths) + 1}.{extension}")
+        for _ in HISTORY_EXPORT_WRITERS[extension](part_records(paths[-1]), paths[-1]):
+            pass
+    if len(paths) == 1:
+        paths[0] = paths[0].rename(folder / f"{stem}.{extension}")
+    files = [{"file_name": path.name, "bytes": path.stat().st_size, "url": f"{EXPORT_URL}/{token}/{path.name}"}
+             for path in paths]
+    size = sum(file["bytes"] for file in files)
+    get_telemetry().record_event("history_export", format=extension, items=state["count"], bytes=size,
+                                 parts=len(files), seconds=time.perf_counter() - started)
+    return {"token": token, "items": state["count"], "bytes": size, "files": files}
+
+# Prompt size profiling
+PROMPT_TOKEN_BUDGET = 3000
+PROFILER_SAMPLE_TOPIC = "How to streamline H-1B processing with case management software"
+
+def calibrated_tokens(text):
+    """Local token estimate scaled by the last calibration against the token-counting endpoint"""
+    return round(estimate_tokens(text) * st.session_state.get("token_calibration", 1.0))
+
+def count_tokens_with_api(prompt, api_key, tier=DEFAULT_MODEL_TIER):
+    """Exact input token count from the token-counting endpoint (no generation)"""
+    if api_key == KEY_POOL:
+        pooled_key = get_key_pool().checkout(reserve=False)
+        api_key = pooled_key["key"] if pooled_key else ""
+    client = anthropic_sdk().Anthropic(api_key=api_key)
+    result = client.messages.count_tokens(
+        model=MODEL_TIERS[tier]["model"],
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return result.input_tokens
+
+@st.cache_data(show_spinner=False)
+def profile_social_prompt_grid(company_info, top_k, token_budget):
+    """Local token counts per named section over every platform x persona x content type prompt"""
+    section_tokens = {}
+    prompt_rows = []
+    for platform in PLATFORM_GUIDELINES:
+        for persona, persona_details in TARGET_PERSONAS.items():
+            for content_type in CONTENT_TYPES:
+                company_context, _ = select_company_context(
+                    company_info,
+                    " ".join([PROFILER_SAMPLE_TOPIC, content_type, persona_details['content_focus']]),
+                    top_k,
+                    token_budget
+                )
+                sections = build_social_prompt_sections(
+                    company_context, platform, "Generate Leads & Demo Requests", persona, content_type,
+                    PROFILER_SAMPLE_TOPIC, "Professional & Authoritative", "Book a Demo", "Auto-Generate Best Hook",
+                    [], [], ""
+                )
+                total = 0
+                for name, text in sections:
+                    tokens = estimate_tokens(text)
+                    section_tokens.setdefault(name, []).append(tokens)
+                    total += tokens
+                prompt_rows.append({"Platform": platform, "Persona": persona, "Content Type": content_type, "Tokens": total})
+
+    grand_total = sum(row["Tokens"] for row in prompt_rows) or 1
+    section_rows = [
+        {
+            "Section": name,
+            "Prompts": len(counts),
+            "Avg tokens": round(sum(counts) / len(counts)),
+            "Max tokens": max(counts),
+            "Share of grid (%)": round(100 * sum(counts) / grand_total, 1)
+        }
+        for name, counts in section_tokens.items()
+    ]
+    section_rows.sort(key=lambda row: row["Share of grid (%)"], reverse=True)
+    prompt_rows.sort(key=lambda row: row["Tokens"], reverse=True)
+    return section_rows, prompt_rows
+
+def warn_if_prompt_over_budget(prompt, sections=None):
+    """Show a warning before sending a prompt estimated above the configured budget"""
+    budget = st.session_state.get("prompt_token_budget", PROMPT_TOKEN_BUDGET)
+    tokens = calibrated_tokens(prompt)
+    if tokens > budget:
+        message = f"⚠️ This prompt is ~{tokens:,} input tokens, over the {budget:,}-token budget."
+        if sections:
+            heaviest = sorted(sections, key=lambda section: len(section[1]), reverse=True)[:3]
+            message += " Heaviest sections: " + ", ".join(f"{name} (~{calibrated_tokens(text):,})" for name, text in heaviest)
+        st.warning(message)
+    return tokens
+
+def active_company():
+    """Company knowledge text and display name for the profile selected in the sidebar"""
+    if st.session_state.get("use_default_profile", True):
+        return LAWTRAX_KNOWLEDGE, "LawTrax"
+    profile = st.session_state.get("company_profile")
+    if not profile:
+        return "No company profile configured. Please set up in sidebar.", "Your Company"
+    company_info = f"""
+COMPANY: {profile.get('name', 'N/A')}
+WEBSITE: {profile.get('website', 'N/A')}
+DESCRIPTION: {profile.get('description', 'N/A')}
+TARGET MARKET: {profile.get('target_market', 'N/A')}
+KEY FEATURES: {profile.get('features', 'N/A')}
+"""
+    return company_info, profile.get('name', 'Your Company')